@@ -3,8 +3,10 @@ from dotenv import load_dotenv
 import json
 import jwt
 import os
+import time
 
-from models.user_dal_functions import get_user_by_email
+from models.user_dal_functions import (get_user_by_email,
+                                       update_user_password)
 from db import DB_RECORD_NOT_FOUND
 
 load_dotenv()
@@ -19,9 +21,72 @@ INVALID_PASSWORD = "Invalid password"
 JSON_TOKEN_DIRNAME = "tokens/"
 JSON_TOKEN_FILENAME = JSON_TOKEN_DIRNAME + 'tokens.json'
 
+# where the tokens of the session are kept : memory or file
+TOKEN_STORE_MEMORY = 'memory'
+TOKEN_STORE_FILE = 'file'
+TOKEN_STORE = os.getenv("TOKEN_STORE", TOKEN_STORE_MEMORY)
+
+
+class MemoryTokenStore():
+    """ keep the tokens in the running process (default) """
+
+    def __init__(self):
+        self.tokens = {'access': None, 'refresh': None}
+
+    def save(self, tokens):
+        self.tokens = {'access': tokens['access'],
+                       'refresh': tokens['refresh']}
+
+    def load(self):
+        return dict(self.tokens)
+
+
+class FileTokenStore():
+    """ keep the tokens in the tokens.json file,
+    they are kept when the application is restarted
+    """
+
+    def __init__(self, filename=JSON_TOKEN_FILENAME):
+        self.filename = filename
+
+    def save(self, tokens):
+        dirname = os.path.dirname(self.filename)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname)
+
+        with open(self.filename, "w") as file_json:
+            json.dump({'access': tokens['access'],
+                       'refresh': tokens['refresh']}, file_json)
+
+    def load(self):
+        with open(self.filename, "r") as file_json:
+            tokens = json.load(file_json)
+
+        return tokens
+
+
+def create_token_store(store_type=TOKEN_STORE):
+    """ create the token store set up in the .env file
+    param :
+    store_type : memory or file
+    """
+    if store_type == TOKEN_STORE_FILE:
+        return FileTokenStore()
+    elif store_type == TOKEN_STORE_MEMORY:
+        return MemoryTokenStore()
+    else:
+        raise ValueError(f"Invalid token store {store_type}")
+
 
 class AuthenticationManager():
 
+    def __init__(self, token_store=None):
+        if token_store is None:
+            token_store = create_token_store()
+        self.token_store = token_store
+        # claims of the tokens already decoded, kept until they expire
+        self.claims_cache = {}
+
     def create_tokens(self, user_id):
         """ create access token and refresh token for a user
         param :
@@ -59,6 +124,7 @@ class AuthenticationManager():
 
     def password_authentication(self, email, password):
         """ check if password and email match
+        rehash the password if the hashing parameters changed
         create access token and refresh token for the user
         param :
         email
@@ -75,6 +141,10 @@ class AuthenticationManager():
         if get_user_result['status'] == 'ok':
             user = get_user_result['user']
             if user.is_password_correct(password):
+                if user.password_needs_rehash():
+                    # hash upgraded to the current cost parameters
+                    update_user_password({'id': user.id,
+                                          'password': password})
                 tokens = self.create_tokens(user.id)
                 result = tokens
                 result['status'] = "ok"
@@ -104,9 +174,7 @@ class AuthenticationManager():
         """
 
         try:
-            decoded_token = jwt.decode(jwt=refresh_token,
-                                       key=SECRET_KEY,
-                                       algorithms=["HS256"])
+            decoded_token = self.decode_token(refresh_token)
 
             if decoded_token['type'] == 'refresh':
                 # if the token is a valid refresh token
@@ -139,9 +207,7 @@ class AuthenticationManager():
         result = {}
         result['status'] = 'ok'
         try:
-            decoded_token = jwt.decode(jwt=token,
-                                       key=SECRET_KEY,
-                                       algorithms=["HS256"])
+            decoded_token = self.decode_token(token)
 
             if decoded_token['type'] in ['access', 'refresh']:
                 # if the token is valid access token retrieve data in payload
@@ -157,17 +223,33 @@ class AuthenticationManager():
 
         return result
 
-    def save_tokens_to_file(self, tokens):
-        """ save the token passed to a tokens.json file"""
-        if not os.path.exists(JSON_TOKEN_DIRNAME):
-            os.makedirs(JSON_TOKEN_DIRNAME)
-
-        with open(JSON_TOKEN_FILENAME, "w") as file_json:
-            json.dump(tokens, file_json)
-
-    def get_tokens_from_file(self):
-        """ get the tokens from the tokens.json file"""
-        with open(JSON_TOKEN_FILENAME, "r") as file_json:
-            tokens = json.load(file_json)
-
-        return tokens
+    def decode_token(self, token):
+        """ decode a token, the claims of a valid token are cached
+        until its expiration so it is verified only once
+        raise jwt.ExpiredSignatureError if the token is expired
+        """
+        now = time.time()
+        claims = self.claims_cache.get(token)
+        if claims is not None:
+            if claims['exp'] > now:
+                return claims
+            del self.claims_cache[token]
+
+        claims = jwt.decode(jwt=token,
+                            key=SECRET_KEY,
+                            algorithms=["HS256"])
+
+        # drop the expired claims before adding the new ones
+        self.claims_cache = {key: value
+                             for key, value in self.claims_cache.items()
+                             if value['exp'] > now}
+        self.claims_cache[token] = claims
+        return claims
+
+    def save_tokens(self, tokens):
+        """ save the tokens passed in the token store """
+        self.token_store.save(tokens)
+
+    def get_tokens(self):
+        """ get the tokens from the token store """
+        return self.token_store.load()
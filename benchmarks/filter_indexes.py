@@ -0,0 +1,211 @@
+# benchmark of the list filter queries with and without the indexes
+# of the filter_indexes migration (ee4f96b40b84)
+#
+# python -m benchmarks.filter_indexes --contracts 100000
+#
+# a sqlite database is filled with generated data, then each filter query
+# is run with the indexes and after dropping them, the query plan and the
+# mean duration are displayed
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, insert, select, text
+
+from db import Base
+from models.user_models import User, Team, Role
+from models.client_models import Client, Contract, Event, CONTRACT_STATUS
+
+# indexes created by the migration
+FILTER_INDEXES = ['ix_clients_commercial_contact_id',
+                  'ix_contracts_client_id',
+                  'ix_events_contract_id',
+                  'ix_events_support_contact_id',
+                  'ix_contracts_unsigned',
+                  'ix_contracts_unpaid',
+                  'ix_contracts_status',
+                  'ix_contracts_amount_unpaid',
+                  ]
+
+PAGE_SIZE = 50
+RUNS = 20
+
+
+def fill_database(engine, contract_count, ratio):
+    """ insert users, clients, contracts (one event each) in the database
+    the ratio of the contracts are unsigned, unpaid or without support
+    """
+    random.seed(12)
+    user_count = max(contract_count // 1000, 10)
+    client_count = max(contract_count // 10, 10)
+    now = datetime.now()
+
+    with engine.begin() as connection:
+        connection.execute(insert(Role), [{'id': 1, 'name': 'commercial',
+                                           'active': True}])
+        connection.execute(insert(Team), [{'id': 1, 'name': 'commercial',
+                                           'role_id': 1, 'active': True}])
+        connection.execute(insert(User), [
+            {'id': number,
+             'employee_number': number,
+             'first_name': f"first name {number}",
+             'last_name': f"last name {number}",
+             'email': f"user{number}@email.com",
+             'password': 'not hashed',
+             'team_id': 1,
+             'active': True}
+            for number in range(1, user_count + 1)])
+        connection.execute(insert(Client), [
+            {'id': number,
+             'first_name': f"first name {number}",
+             'last_name': f"last name {number}",
+             'email': f"client{number}@email.com",
+             'telephone': '0102030405',
+             'enterprise': f"enterprise {number}",
+             'creation_date': now,
+             'commercial_contact_id': random.randint(1, user_count),
+             'active': True}
+            for number in range(1, client_count + 1)])
+        connection.execute(insert(Contract), [
+            {'id': number,
+             'client_id': random.randint(1, client_count),
+             'total_amount': 1000,
+             'amount_unpaid': 1000 if random.random() < ratio else 0,
+             'creation_date': now,
+             'status': (CONTRACT_STATUS[1] if random.random() < ratio
+                        else CONTRACT_STATUS[0]),
+             'active': True}
+            for number in range(1, contract_count + 1)])
+        connection.execute(insert(Event), [
+            {'id': number,
+             'title': f"event {number}",
+             'contract_id': number,
+             'start_date': now,
+             'end_date': now,
+             'support_contact_id': (None if random.random() < ratio
+                                    else random.randint(1, user_count)),
+             'location': 'Paris',
+             'attendees': 10,
+             'creation_date': now,
+             'active': True}
+            for number in range(1, contract_count + 1)])
+        connection.execute(text("ANALYZE"))
+
+    return user_count, client_count
+
+
+def filter_queries(user_count, client_count, contract_count):
+    """ the filters of the DAL list functions, on a page in the middle
+    of the table for the paginated ones
+    """
+    user_id = user_count // 2
+    middle_id = contract_count // 2
+
+    return {
+        'clients of a commercial (get_client_list_for_user)':
+            select(Client).where(Client.commercial_contact_id == user_id),
+        'contracts of a client':
+            select(Contract).where(Contract.client_id == client_count // 2),
+        'events of a contract':
+            select(Event).where(Event.contract_id == middle_id),
+        'supported events (get_supported_event)':
+            (select(Event)
+             .where(Event.support_contact_id == user_id)
+             .where(Event.id > middle_id)
+             .order_by(Event.id)
+             .limit(PAGE_SIZE + 1)),
+        'unassigned events (get_event_unassigned)':
+            (select(Event)
+             .where(Event.support_contact_id == None)  # noqa: E711
+             .where(Event.id > middle_id)
+             .order_by(Event.id)
+             .limit(PAGE_SIZE + 1)),
+        'unsigned contracts (get_unsigned_contracts)':
+            (select(Contract)
+             .where(Contract.status == CONTRACT_STATUS[1])
+             .where(Contract.id > middle_id)
+             .order_by(Contract.id)
+             .limit(PAGE_SIZE + 1)),
+        'unpaid contracts (get_unpaid_contracts)':
+            (select(Contract)
+             .where(Contract.amount_unpaid != 0)
+             .where(Contract.id > middle_id)
+             .order_by(Contract.id)
+             .limit(PAGE_SIZE + 1)),
+    }
+
+
+def query_plan(connection, query):
+    """ plan of the query, as given by the database """
+    compiled = query.compile(connection, compile_kwargs={
+        'literal_binds': True})
+    if connection.dialect.name == 'sqlite':
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return ' / '.join(row[-1] for row in rows)
+    else:
+        rows = connection.execute(text(f"EXPLAIN {compiled}"))
+        return ' / '.join(str(tuple(row)) for row in rows)
+
+
+def measure(engine, queries):
+    """ plan and mean duration in ms of each query """
+    measures = {}
+    with engine.connect() as connection:
+        for name, query in queries.items():
+            plan = query_plan(connection, query)
+            start = time.perf_counter()
+            for run in range(RUNS):
+                connection.execute(query).all()
+            duration = (time.perf_counter() - start) / RUNS * 1000
+            measures[name] = (plan, duration)
+
+    return measures
+
+
+def drop_filter_indexes(engine):
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in FILTER_INDEXES:
+                index.drop(engine, checkfirst=True)
+    # new connections, the statements prepared with the indexes are dropped
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="benchmark of the list filter queries indexes")
+    parser.add_argument('--contracts', type=int, default=100000,
+                        help="number of contracts and events generated")
+    parser.add_argument('--ratio', type=float, default=0.01,
+                        help="ratio of unsigned, unpaid, unassigned rows")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dirname:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(dirname, 'benchmark.db')}")
+        Base.metadata.create_all(engine)
+        user_count, client_count = fill_database(engine,
+                                                 args.contracts,
+                                                 args.ratio)
+        queries = filter_queries(user_count, client_count, args.contracts)
+
+        with_indexes = measure(engine, queries)
+        drop_filter_indexes(engine)
+        without_indexes = measure(engine, queries)
+        engine.dispose()
+
+    for name in queries:
+        plan_with, duration_with = with_indexes[name]
+        plan_without, duration_without = without_indexes[name]
+        print(name)
+        print(f"    without indexes {duration_without:8.3f} ms"
+              f"  {plan_without}")
+        print(f"    with indexes    {duration_with:8.3f} ms"
+              f"  {plan_with}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# benchmark of the event list loaded as ORM entities (get_all_events)
+# or as EventRow tuples (get_event_rows)
+#
+# python -m benchmarks.list_rows --events 100000
+#
+# a sqlite database is filled with generated data, then the whole event
+# list is loaded both ways, the mean duration and the memory allocated
+# (peak during the load and kept by the loaded rows) are displayed
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from db import Base
+from models.client_models import Event
+from models.dal_tools import paginate, paginate_rows
+from models.event_dal_functions import EventRow
+from benchmarks.filter_indexes import fill_database
+
+RUNS = 5
+
+
+def load_entities(session):
+    """ the query of get_all_events(), every column and one Event object
+    by row
+    """
+    events, page = paginate(session.query(Event), Event.id)
+    return events
+
+
+def load_rows(session):
+    """ the query of get_event_rows(), the displayed columns only """
+    events, page = paginate_rows(session, Event, EventRow)
+    return events
+
+
+def duration(session_maker, load):
+    """ mean duration in ms of the load of the whole list """
+    start = time.perf_counter()
+    for run in range(RUNS):
+        with session_maker() as session:
+            load(session)
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+def memory(session_maker, load):
+    """ memory in MB allocated during the load (peak)
+    and still allocated while the rows are kept (kept)
+    """
+    gc.collect()
+    tracemalloc.start()
+    with session_maker() as session:
+        rows = load(session)
+        kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return peak / 2**20, kept / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="benchmark of the event list projection rows")
+    parser.add_argument('--events', type=int, default=100000,
+                        help="number of contracts and events generated")
+    parser.add_argument('--notes', type=int, default=200,
+                        help="length of the notes of each event")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dirname:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(dirname, 'benchmark.db')}")
+        Base.metadata.create_all(engine)
+        fill_database(engine, args.events, 0.01)
+        with engine.begin() as connection:
+            connection.execute(update(Event).values(notes='n' * args.notes))
+        session_maker = sessionmaker(bind=engine)
+
+        measures = {}
+        for name, load in [('entities (get_all_events)', load_entities),
+                           ('rows (get_event_rows)', load_rows)]:
+            load_duration = duration(session_maker, load)
+            peak, kept = memory(session_maker, load)
+            measures[name] = (load_duration, peak, kept)
+        engine.dispose()
+
+    print(f"{args.events} events")
+    for name, (load_duration, peak, kept) in measures.items():
+        print(f"    {name:28} {load_duration:9.1f} ms"
+              f"  peak {peak:7.1f} MB  kept {kept:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,81 @@
-from models.client_dal_functions import get_client_by_id
-from models.contract_dal_functions import get_contract_by_id
-from models.event_dal_functions import get_event_by_id
+from models.general_dal_functions import get_owned_ids, to_ids
 
 MANAGEMENT_ROLE = 'gestion'
 COMMERCIAL_ROLE = 'commercial'
 SUPPORT_ROLE = 'support'
 
 
-def owns_client(user_id, client_id):
-    """ check that a user is the commercial of a client
+def owned_ids(user_id, client_ids=(), contract_ids=(), event_ids=()):
+    """ check with one query which clients, contracts and events
+        of the lists are owned by a user
+        returns dictionnary with keys 'client_ids', 'contract_ids' and
+        'event_ids', sets of the owned ids (empty on database error)
     """
-    result = get_client_by_id(client_id)
+    result = get_owned_ids(user_id, client_ids, contract_ids, event_ids)
     if result['status'] == 'ok':
-        client = result['client']
+        return {'client_ids': result['client_ids'],
+                'contract_ids': result['contract_ids'],
+                'event_ids': result['event_ids']}
     else:
-        return False
+        return {'client_ids': set(),
+                'contract_ids': set(),
+                'event_ids': set()}
 
-    if client.commercial_contact_id == user_id:
-        return True
-    else:
+
+def is_in(record_id, ids):
+    """ check that an id given as number or string is in a set of ids """
+    try:
+        return int(record_id) in ids
+    except (TypeError, ValueError):
         return False
 
 
+def owns_client(user_id, client_id):
+    """ check that a user is the commercial of a client
+    """
+    owned = owned_ids(user_id, client_ids=[client_id])
+    return is_in(client_id, owned['client_ids'])
+
+
+def owns_contract(user_id, contract_id):
+    """ check that a user is the commercial of the client of a contract
+    """
+    owned = owned_ids(user_id, contract_ids=[contract_id])
+    return is_in(contract_id, owned['contract_ids'])
+
+
 def owns_event(user_id, event_id):
     """ check that a user is the support of an event
         or the commercial of the client of the event
     """
-    result = get_event_by_id(event_id)
-    if result['status'] == 'ok':
-        event = result['event']
-    else:
-        return False
-
-    if event.support_contact_id == user_id:
-        return True
+    owned = owned_ids(user_id, event_ids=[event_id])
+    return is_in(event_id, owned['event_ids'])
+
+
+def update_authorized_ids(user_id,
+                          user_role,
+                          client_ids=(),
+                          contract_ids=(),
+                          event_ids=()):
+    """ batched version of the is_*_update_authorized functions,
+        the rows of a list screen are checked with one query
+        returns dictionnary with keys 'client_ids', 'contract_ids' and
+        'event_ids', sets of the ids the user is authorized to update
+    """
+    # Rules : see is_client_update_authorized, is_contract_update_authorized
+    # and is_event_update_authorized
+    if user_role == MANAGEMENT_ROLE:
+        return {'client_ids': set(),
+                'contract_ids': to_ids(contract_ids),
+                'event_ids': to_ids(event_ids)}
+    elif user_role == COMMERCIAL_ROLE:
+        return owned_ids(user_id, client_ids, contract_ids, event_ids)
+    elif user_role == SUPPORT_ROLE:
+        return owned_ids(user_id, event_ids=event_ids)
     else:
-        result = get_contract_by_id(event.contract_id)
-        if result['status'] == 'ok':
-            contract = result['contract']
-        else:
-            return False
-
-        if owns_client(user_id, contract.client_id):
-            return True
-        else:
-            return False
+        return {'client_ids': set(),
+                'contract_ids': set(),
+                'event_ids': set()}
 
 
 def is_client_create_authorized(user_id, user_role):
@@ -89,13 +120,8 @@ def is_contract_update_authorized(user_id, user_role, contract_id):
     if user_role == MANAGEMENT_ROLE:
         return True
     elif user_role == COMMERCIAL_ROLE:
-        result = get_contract_by_id(contract_id)
-        if result['status'] == 'ok':
-            client_id = result['contract'].client_id
-            if owns_client(user_id, client_id):
-                return True
-            else:
-                return False
+        if owns_contract(user_id, contract_id):
+            return True
         else:
             return False
     else:
@@ -127,12 +153,7 @@ def is_event_update_authorized(user_id, user_role, event_id):
     if user_role == MANAGEMENT_ROLE:
         return True
     elif user_role == COMMERCIAL_ROLE:
-        result_event = get_event_by_id(event_id)
-
-        result_contract = get_contract_by_id(result_event['event'].contract_id)
-        client_id = result_contract['contract'].client_id
-
-        if owns_client(user_id, client_id):
+        if owns_event(user_id, event_id):
             return True
         else:
             return False
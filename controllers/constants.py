@@ -30,6 +30,8 @@ MSG_WRONG_AUTHORIZATION = ("Vous n'avez pas l'autorisation d'effectuer"
                            "cette action")
 MSG_WRONG_CLIENT = "Le client est inexistant ou ne vous appartient pas"
 MSG_EXPIRED_SESSION = "Votre session a expiré merci de vous reconnecter"
+MSG_EXPORT_DONE = "lignes exportées dans le fichier"
+MSG_EXPORT_WRONG_FORMAT = "Le fichier doit être un fichier .csv ou .jsonl"
 
 # menu items
 MENU_CLIENTS_LIST_KEYS = 'c'
@@ -53,6 +55,8 @@ MENU_CONTRACT_FILTER_UNPAID_KEYS = 'fop'
 MENU_CONTRACT_FILTER_UNPAID_LABEL = 'Contrats non payés'
 MENU_CONTRACT_FILTER_UNSIGNED_KEYS = 'fos'
 MENU_CONTRACT_FILTER_UNSIGNED_LABEL = 'Contrats non signés'
+MENU_CONTRACT_FILTER_OWNED_KEYS = 'fov'
+MENU_CONTRACT_FILTER_OWNED_LABEL = 'Vos contrats'
 
 MENU_EVENTS_LIST_KEYS = 'e'
 MENU_EVENTS_LIST_LABEL = 'Liste Evènement'
@@ -66,6 +70,8 @@ MENU_EVENT_FILTER_OWNED_KEYS = 'fev'
 MENU_EVENT_FILTER_OWNED_LABEL = 'Vos évènements'
 MENU_EVENT_FILTER_UNASSIGNED_KEYS = 'fes'
 MENU_EVENT_FILTER_UNASSIGNED_LABEL = 'Evènements sans support'
+MENU_EVENT_FILTER_FOLLOWED_KEYS = 'fef'
+MENU_EVENT_FILTER_FOLLOWED_LABEL = 'Evènements de vos clients ou supportés'
 
 MENU_ADMINISTRATION_KEYS = 'a'
 MENU_ADMINISTRATION_LABEL = 'Administration'
@@ -76,6 +82,14 @@ MENU_USER_UPDATE_LABEL = 'Modifier utilisateur'
 MENU_USER_CREATE_KEYS = 'cu'
 MENU_USER_CREATE_LABEL = 'Créer utilisateur'
 
+MENU_NEXT_PAGE_KEYS = 'n'
+MENU_NEXT_PAGE_LABEL = 'Page suivante'
+MENU_PREVIOUS_PAGE_KEYS = 'p'
+MENU_PREVIOUS_PAGE_LABEL = 'Page précédente'
+
+MENU_EXPORT_KEYS = 'x'
+MENU_EXPORT_LABEL = 'Exporter la liste'
+
 MENU_EXIT_KEYS = 's'
 MENU_EXIT_LABEL = 'Sortir'
 MENU_RETURN_KEYS = 'r'
@@ -118,6 +132,7 @@ PRPT_USER_PASSWORD = "Entrer le mot de passe"
 PRPT_USER_CREATION = "Voulez-vous créer l'utilisateur ?"
 
 PRPT_ACTIONS = "Quel est votre choix ?"
+PRPT_EXPORT_PATH = "Entrer le nom du fichier (.csv ou .jsonl)"
 PRPT_NEW_DATA = "Quelle est la nouvelle valeur?"
 
 YES_NO_CHOICE = ['o', 'n']
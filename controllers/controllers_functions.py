@@ -1,16 +1,26 @@
 import datetime
 import re
+from functools import partial
 
-from models.user_dal_functions import (get_client_list_for_user,
-                                       get_user_by_id,
-                                       get_user_by_employee_id
+from models.user_dal_functions import (get_user_by_id,
+                                       get_user_by_employee_id,
+                                       get_users_by_ids,
                                        )
 from models.client_models import CONTRACT_STATUS
-from models.client_dal_functions import get_client_by_id
-from models.contract_dal_functions import get_contract_by_id
+from models.client_dal_functions import (get_client_by_id,
+                                         get_existing_client_ids,
+                                         )
+from models.contract_dal_functions import (get_contract_by_id,
+                                           get_existing_contract_ids,
+                                           )
 from models.team_dal_functions import get_team_by_id
 
-from controllers.constants import DATE_FORMAT
+from controllers.constants import (DATE_FORMAT,
+                                   MENU_NEXT_PAGE_KEYS,
+                                   MENU_NEXT_PAGE_LABEL,
+                                   MENU_PREVIOUS_PAGE_KEYS,
+                                   MENU_PREVIOUS_PAGE_LABEL,
+                                   )
 
 # menu choices
 MC_CLIENT_LIST = 'client_list'
@@ -24,6 +34,7 @@ MC_CONTRACT_UPDATE = 'contrat_update'
 MC_CONTRACT_CREATE = 'contrat_create'
 MC_CONTRACT_UNPAID_FILTER = 'contrat_unpaid_filter'
 MC_CONTRACT_UNSIGNED_FILTER = 'contrat_unsigned_filter'
+MC_CONTRACT_OWNED_FILTER = 'contrat_owned_filter'
 
 MC_EVENT_LIST = 'events_list'
 MC_EVENT_DETAILS = 'event_details'
@@ -31,128 +42,210 @@ MC_EVENT_UPDATE = 'event_update'
 MC_EVENT_CREATE = 'event_create'
 MC_EVENT_OWNED_FILTER = 'event_owned_filter'
 MC_EVENT_UNASSIGNED_FILTER = 'event_unassigned_filter'
+MC_EVENT_FOLLOWED_FILTER = 'event_followed_filter'
 
 MC_ADMINISTRATION = 'administration'
 MC_USER_DETAILS = 'user_details'
 MC_USER_UPDATE = 'user_update'
 MC_USER_CREATE = 'user_create'
 
+MC_NEXT_PAGE = 'next_page'
+MC_PREVIOUS_PAGE = 'previous_page'
+MC_EXPORT = 'export'
+
 MC_EXIT = 'exit'
 MC_RETURN = 'return'
 MC_INVALID = 'invalid'
 MC_ABORT = 'abort'
 
+# teams created by db_initialization.py
+COMMERCIAL_TEAM_ID = 2
+SUPPORT_TEAM_ID = 3
+
 
 def navigation_handler(controller,
                        choice,
                        connected_user,
                        connected_user_role,
                        token,
-                       list_type=None):
+                       list_type=None,
+                       page=None):
+    """ decode the menu choice into the next screen
+    returns the controller method to be called next with its arguments
+    (functools.partial), None when the navigation is over
+    """
     if choice[0] == MC_EXIT:
-        controller.exit()
+        return partial(controller.exit)
 
     if choice[0] == MC_RETURN:
-        controller.control_start(connected_user, connected_user_role)
+        return partial(controller.control_start,
+                       connected_user,
+                       connected_user_role)
 
     elif choice[0] == MC_CLIENT_LIST:
-        controller.control_client_list(connected_user,
-                                       connected_user_role)
+        return partial(controller.control_client_list,
+                       connected_user,
+                       connected_user_role)
     elif choice[0] == MC_CLIENT_DETAILS:
-        controller.control_client_details(choice[1],
-                                          connected_user,
-                                          connected_user_role)
+        return partial(controller.control_client_details,
+                       choice[1],
+                       connected_user,
+                       connected_user_role)
     elif choice[0] == MC_CLIENT_UPDATE:
-        controller.control_client_update(choice[1],
-                                         choice[2],
-                                         choice[3],
-                                         connected_user,
-                                         connected_user_role,
-                                         token)
+        return partial(controller.control_client_update,
+                       choice[1],
+                       choice[2],
+                       choice[3],
+                       connected_user,
+                       connected_user_role,
+                       token)
     elif choice[0] == MC_CLIENT_CREATE:
-        controller.control_client_create(connected_user,
-                                         connected_user_role)
+        return partial(controller.control_client_create,
+                       connected_user,
+                       connected_user_role)
 
     elif choice[0] == MC_CONTRACT_LIST:
-        controller.control_contract_list(connected_user,
-                                         connected_user_role,
-                                         MC_CONTRACT_LIST)
+        return partial(controller.control_contract_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_CONTRACT_LIST)
     elif choice[0] == MC_CONTRACT_DETAILS:
-        controller.control_contract_details(choice[1],
-                                            connected_user,
-                                            connected_user_role,
-                                            list_type)
+        return partial(controller.control_contract_details,
+                       choice[1],
+                       connected_user,
+                       connected_user_role,
+                       list_type)
     elif choice[0] == MC_CONTRACT_UPDATE:
-        controller.control_contract_update(choice[1],
-                                           choice[2],
-                                           choice[3],
-                                           connected_user,
-                                           connected_user_role,
-                                           token)
+        return partial(controller.control_contract_update,
+                       choice[1],
+                       choice[2],
+                       choice[3],
+                       connected_user,
+                       connected_user_role,
+                       token)
     elif choice[0] == MC_CONTRACT_CREATE:
-        controller.control_contract_create(connected_user,
-                                           connected_user_role)
+        return partial(controller.control_contract_create,
+                       connected_user,
+                       connected_user_role)
     elif choice[0] == MC_CONTRACT_UNPAID_FILTER:
-        controller.control_contract_list(connected_user,
-                                         connected_user_role,
-                                         MC_CONTRACT_UNPAID_FILTER)
+        return partial(controller.control_contract_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_CONTRACT_UNPAID_FILTER)
     elif choice[0] == MC_CONTRACT_UNSIGNED_FILTER:
-        controller.control_contract_list(connected_user,
-                                         connected_user_role,
-                                         MC_CONTRACT_UNSIGNED_FILTER)
+        return partial(controller.control_contract_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_CONTRACT_UNSIGNED_FILTER)
+    elif choice[0] == MC_CONTRACT_OWNED_FILTER:
+        return partial(controller.control_contract_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_CONTRACT_OWNED_FILTER)
 
     elif choice[0] == MC_EVENT_LIST:
-        controller.control_event_list(connected_user,
-                                      connected_user_role,
-                                      MC_EVENT_LIST)
+        return partial(controller.control_event_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_EVENT_LIST)
     elif choice[0] == MC_EVENT_DETAILS:
-        controller.control_event_details(choice[1],
-                                         connected_user,
-                                         connected_user_role,
-                                         list_type)
+        return partial(controller.control_event_details,
+                       choice[1],
+                       connected_user,
+                       connected_user_role,
+                       list_type)
     elif choice[0] == MC_EVENT_UPDATE:
-        controller.control_event_update(choice[1],
-                                        choice[2],
-                                        choice[3],
-                                        connected_user,
-                                        connected_user_role,
-                                        token)
+        return partial(controller.control_event_update,
+                       choice[1],
+                       choice[2],
+                       choice[3],
+                       connected_user,
+                       connected_user_role,
+                       token)
     elif choice[0] == MC_EVENT_CREATE:
-        controller.control_event_create(connected_user, connected_user_role)
+        return partial(controller.control_event_create,
+                       connected_user,
+                       connected_user_role)
     elif choice[0] == MC_EVENT_OWNED_FILTER:
-        controller.control_event_list(connected_user,
-                                      connected_user_role,
-                                      MC_EVENT_OWNED_FILTER)
+        return partial(controller.control_event_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_EVENT_OWNED_FILTER)
     elif choice[0] == MC_EVENT_UNASSIGNED_FILTER:
-        controller.control_event_list(connected_user,
-                                      connected_user_role,
-                                      MC_EVENT_UNASSIGNED_FILTER)
+        return partial(controller.control_event_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_EVENT_UNASSIGNED_FILTER)
+    elif choice[0] == MC_EVENT_FOLLOWED_FILTER:
+        return partial(controller.control_event_list,
+                       connected_user,
+                       connected_user_role,
+                       MC_EVENT_FOLLOWED_FILTER)
 
     elif choice[0] == MC_ADMINISTRATION:
-        controller.control_user_administration(connected_user,
-                                               connected_user_role)
+        return partial(controller.control_user_administration,
+                       connected_user,
+                       connected_user_role)
     elif choice[0] == MC_USER_DETAILS:
-        controller.control_user_details(choice[1],
-                                        connected_user,
-                                        connected_user_role)
+        return partial(controller.control_user_details,
+                       choice[1],
+                       connected_user,
+                       connected_user_role)
     elif choice[0] == MC_USER_UPDATE:
-        controller.control_user_update(choice[1],
-                                       choice[2],
-                                       choice[3],
-                                       connected_user,
-                                       connected_user_role,
-                                       token)
+        return partial(controller.control_user_update,
+                       choice[1],
+                       choice[2],
+                       choice[3],
+                       connected_user,
+                       connected_user_role,
+                       token)
     elif choice[0] == MC_USER_CREATE:
-        controller.control_user_create(connected_user,
-                                       connected_user_role)
-
+        return partial(controller.control_user_create,
+                       connected_user,
+                       connected_user_role)
 
-def client_list(user_id):
+    elif choice[0] == MC_EXPORT:
+        return partial(controller.control_export,
+                       choice[1],
+                       connected_user,
+                       connected_user_role,
+                       list_type)
 
-    result = get_client_list_for_user(user_id)
-    if result['status'] == 'ok':
-        data = result['data']
-    return data
+    elif choice[0] in [MC_NEXT_PAGE, MC_PREVIOUS_PAGE]:
+        # the list screen is displayed again from the page cursor
+        if choice[0] == MC_NEXT_PAGE:
+            cursor = {'after_id': page['last_id']}
+        else:
+            cursor = {'before_id': page['first_id']}
+
+        if list_type == MC_CLIENT_LIST:
+            return partial(controller.control_client_list,
+                           connected_user,
+                           connected_user_role,
+                           **cursor)
+        elif list_type in [MC_CONTRACT_LIST,
+                           MC_CONTRACT_UNPAID_FILTER,
+                           MC_CONTRACT_UNSIGNED_FILTER,
+                           MC_CONTRACT_OWNED_FILTER]:
+            return partial(controller.control_contract_list,
+                           connected_user,
+                           connected_user_role,
+                           list_type,
+                           **cursor)
+        elif list_type in [MC_EVENT_LIST,
+                           MC_EVENT_OWNED_FILTER,
+                           MC_EVENT_UNASSIGNED_FILTER,
+                           MC_EVENT_FOLLOWED_FILTER]:
+            return partial(controller.control_event_list,
+                           connected_user,
+                           connected_user_role,
+                           list_type,
+                           **cursor)
+        elif list_type == MC_ADMINISTRATION:
+            return partial(controller.control_user_administration,
+                           connected_user,
+                           connected_user_role,
+                           **cursor)
 
 
 def validate_email(email):
@@ -180,12 +273,23 @@ def validate_commercial_user(user_id):
     """
     result = get_user_by_id(user_id)
     if (result['status'] == 'ok'
-       and result['user'].team_id == 2):
+       and result['user'].team_id == COMMERCIAL_TEAM_ID):
         return True
     else:
         return False
 
 
+def validate_commercial_user_ids(user_ids):
+    """
+    validate_commercial_user for a list of users, with one query
+    parameter :
+    list of user ids
+    return :
+    set of the ids of the users in the commercial team
+    """
+    return validate_team_user_ids(user_ids, COMMERCIAL_TEAM_ID)
+
+
 def validate_support_user(user_id):
     """
     validate that a user is in the support team
@@ -196,12 +300,34 @@ def validate_support_user(user_id):
     """
     result = get_user_by_id(user_id)
     if (result['status'] == 'ok'
-       and result['user'].team_id == 3):
+       and result['user'].team_id == SUPPORT_TEAM_ID):
         return True
     else:
         return False
 
 
+def validate_support_user_ids(user_ids):
+    """
+    validate_support_user for a list of users, with one query
+    parameter :
+    list of user ids
+    return :
+    set of the ids of the users in the support team
+    """
+    return validate_team_user_ids(user_ids, SUPPORT_TEAM_ID)
+
+
+def validate_team_user_ids(user_ids, team_id):
+    """
+    ids of the users of the list in the team, read with one query
+    """
+    result = get_users_by_ids(user_ids)
+    if result['status'] != 'ok':
+        return set()
+    return {user_id for user_id, user in result['users'].items()
+            if user.team_id == team_id}
+
+
 def validate_employee_number(employee_number):
     """
     validate that an employee number is not already used
@@ -232,6 +358,34 @@ def validate_client(client_id):
         return False
 
 
+def validate_client_ids(client_ids):
+    """
+    validate_client for a list of clients, with one query
+    parameter :
+    list of client ids
+    return :
+    set of the ids of the existing clients
+    """
+    result = get_existing_client_ids(client_ids)
+    if result['status'] != 'ok':
+        return set()
+    return result['client_ids']
+
+
+def validate_contract_ids(contract_ids):
+    """
+    validate that contracts exist, with one query
+    parameter :
+    list of contract ids
+    return :
+    set of the ids of the existing contracts
+    """
+    result = get_existing_contract_ids(contract_ids)
+    if result['status'] != 'ok':
+        return set()
+    return result['contract_ids']
+
+
 def validate_contract(contract_id, user_id):
     """
     validate that a contract:
@@ -280,7 +434,7 @@ def is_float(num):
     try:
         float(num)
         return True
-    except ValueError:
+    except (TypeError, ValueError):
         return False
 
 
@@ -288,10 +442,23 @@ def is_date(date):
     try:
         datetime.datetime.strptime(date, DATE_FORMAT)
         return True
-    except ValueError:
+    except (TypeError, ValueError):
         return False
 
 
+def add_page_actions(actions, page):
+    """ add the previous / next page menu items
+    when the displayed list has other pages
+    """
+    if page is None:
+        return
+
+    if page['has_previous']:
+        actions.append((MENU_PREVIOUS_PAGE_KEYS, MENU_PREVIOUS_PAGE_LABEL))
+    if page['has_next']:
+        actions.append((MENU_NEXT_PAGE_KEYS, MENU_NEXT_PAGE_LABEL))
+
+
 def prompt_choices_creation(menu_list):
     choices = []
     for menu_item in menu_list:
@@ -0,0 +1,166 @@
+# export of the client, contract and event lists to csv or jsonl files
+#
+# the rows are streamed from the database to the file, only one batch of
+# rows is in memory whatever the size of the list
+# the columns and the date format are the ones of the import, an exported
+# file can be imported again
+import csv
+import datetime
+import json
+import os
+import time
+
+from sqlalchemy import exc
+
+from models.client_dal_functions import stream_clients, CLIENT_EXPORT_FIELDS
+from models.contract_dal_functions import (stream_contracts,
+                                           CONTRACT_EXPORT_FIELDS,
+                                           )
+from models.event_dal_functions import stream_events, EVENT_EXPORT_FIELDS
+from controllers.constants import DATE_FORMAT
+from controllers.import_functions import file_format
+from controllers.controllers_functions import (MC_CLIENT_LIST,
+                                               MC_CONTRACT_LIST,
+                                               MC_CONTRACT_UNPAID_FILTER,
+                                               MC_CONTRACT_UNSIGNED_FILTER,
+                                               MC_CONTRACT_OWNED_FILTER,
+                                               MC_EVENT_LIST,
+                                               MC_EVENT_OWNED_FILTER,
+                                               MC_EVENT_UNASSIGNED_FILTER,
+                                               MC_EVENT_FOLLOWED_FILTER,
+                                               )
+
+# lists of the export command, with the list screen they come from
+EXPORT_LISTS = {
+    'clients': MC_CLIENT_LIST,
+    'contracts': MC_CONTRACT_LIST,
+    'unpaid-contracts': MC_CONTRACT_UNPAID_FILTER,
+    'unsigned-contracts': MC_CONTRACT_UNSIGNED_FILTER,
+    'owned-contracts': MC_CONTRACT_OWNED_FILTER,
+    'events': MC_EVENT_LIST,
+    'supported-events': MC_EVENT_OWNED_FILTER,
+    'unassigned-events': MC_EVENT_UNASSIGNED_FILTER,
+    'owned-events': MC_EVENT_FOLLOWED_FILTER,
+}
+
+# lists filtered on the connected user, a user_id is required
+USER_LISTS = [MC_CONTRACT_OWNED_FILTER,
+              MC_EVENT_OWNED_FILTER,
+              MC_EVENT_FOLLOWED_FILTER,
+              ]
+
+
+def list_rows(list_type, user_id=None):
+    """ stream of the rows of a list screen, with the filter of the screen
+    parameters :
+    list_type : menu choice of the list screen (MC_CLIENT_LIST, ...)
+    user_id : connected user, for the events he supports or follows
+              and the contracts of his clients
+    returns tuple (column names, generator of rows)
+    raises ValueError for a list of USER_LISTS without user_id, the whole
+    table would be exported otherwise
+    """
+    if list_type in USER_LISTS and user_id is None:
+        raise ValueError(f"a user id is required for the list : {list_type}")
+
+    if list_type == MC_CLIENT_LIST:
+        return CLIENT_EXPORT_FIELDS, stream_clients()
+    elif list_type == MC_CONTRACT_LIST:
+        return CONTRACT_EXPORT_FIELDS, stream_contracts()
+    elif list_type == MC_CONTRACT_UNPAID_FILTER:
+        return CONTRACT_EXPORT_FIELDS, stream_contracts(unpaid=True)
+    elif list_type == MC_CONTRACT_UNSIGNED_FILTER:
+        return CONTRACT_EXPORT_FIELDS, stream_contracts(unsigned=True)
+    elif list_type == MC_CONTRACT_OWNED_FILTER:
+        return CONTRACT_EXPORT_FIELDS, stream_contracts(owner_id=user_id)
+    elif list_type == MC_EVENT_LIST:
+        return EVENT_EXPORT_FIELDS, stream_events()
+    elif list_type == MC_EVENT_OWNED_FILTER:
+        return EVENT_EXPORT_FIELDS, stream_events(support_user_id=user_id)
+    elif list_type == MC_EVENT_UNASSIGNED_FILTER:
+        return EVENT_EXPORT_FIELDS, stream_events(unassigned=True)
+    elif list_type == MC_EVENT_FOLLOWED_FILTER:
+        return EVENT_EXPORT_FIELDS, stream_events(owner_id=user_id)
+    raise ValueError(f"unknown list : {list_type}")
+
+
+def export_value(value):
+    """ value written in the file, dates in the DATE_FORMAT """
+    if isinstance(value, datetime.datetime):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def write_csv(file, columns, rows):
+    writer = csv.writer(file)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(['' if value is None else export_value(value)
+                         for value in row])
+        count += 1
+    return count
+
+
+def write_jsonl(file, columns, rows):
+    count = 0
+    for row in rows:
+        file.write(json.dumps({column: export_value(value)
+                               for column, value in zip(columns, row)},
+                              ensure_ascii=False))
+        file.write('\n')
+        count += 1
+    return count
+
+
+def export_list(list_type, path, row_format=None, user_id=None):
+    """ write the rows of a list screen in a csv or jsonl file,
+    the file is written in a temporary file renamed at the end,
+    an existing file is only replaced by a complete export
+    parameters :
+    list_type : menu choice of the list screen (MC_CLIENT_LIST, ...)
+    path : path of the file
+    row_format : csv or jsonl, from the file extension by default
+    user_id : connected user, for the events he supports
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'written': number of rows written (if status == ok)
+    'duration': duration of the export in seconds (if status == ok)
+    'rows_per_second': written rows by second (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    temporary_path = path + '.tmp'
+    start = time.perf_counter()
+    try:
+        row_format = row_format or file_format(path)
+        columns, rows = list_rows(list_type, user_id)
+        with open(temporary_path, 'w', newline='', encoding='utf-8') as file:
+            if row_format == 'csv':
+                result['written'] = write_csv(file, columns, rows)
+            else:
+                result['written'] = write_jsonl(file, columns, rows)
+        os.replace(temporary_path, path)
+
+    except (exc.SQLAlchemyError, OSError, ValueError) as e:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        result['status'] = "ko"
+        result['error'] = e
+        return result
+
+    result['duration'] = time.perf_counter() - start
+    result['rows_per_second'] = (result['written'] / result['duration']
+                                 if result['duration'] else 0)
+    return result
+
+
+def print_export_report(result):
+    """ display the counters and the throughput of an export """
+    if result['status'] == "ko":
+        print(f"error        : {result['error']}")
+        return
+    print(f"written      : {result['written']}")
+    print(f"duration     : {result['duration']:.2f} s"
+          f" ({result['rows_per_second']:.0f} rows/s)")
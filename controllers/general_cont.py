@@ -1,6 +1,10 @@
 import datetime
 import time
-from sentry_sdk import capture_exception, capture_message, set_user
+from functools import partial, wraps
+from sentry_sdk import (capture_exception,
+                        capture_message,
+                        set_user,
+                        )
 
 
 from controllers.constants import (MSG_ERROR,
@@ -19,6 +23,8 @@ from controllers.constants import (MSG_ERROR,
                                    MSG_WRONG_TEAM,
                                    MSG_WRONG_EMPLOYEE_NUMBER,
                                    MSG_EXPIRED_SESSION,
+                                   MSG_EXPORT_DONE,
+                                   MSG_EXPORT_WRONG_FORMAT,
                                    MENU_CLIENTS_LIST_KEYS,
                                    MENU_CLIENTS_LIST_LABEL,
                                    MENU_CLIENTS_DETAILS_KEYS,
@@ -39,6 +45,8 @@ from controllers.constants import (MSG_ERROR,
                                    MENU_CONTRACT_FILTER_UNPAID_LABEL,
                                    MENU_CONTRACT_FILTER_UNSIGNED_KEYS,
                                    MENU_CONTRACT_FILTER_UNSIGNED_LABEL,
+                                   MENU_CONTRACT_FILTER_OWNED_KEYS,
+                                   MENU_CONTRACT_FILTER_OWNED_LABEL,
                                    MENU_EVENTS_LIST_KEYS,
                                    MENU_EVENTS_LIST_LABEL,
                                    MENU_EVENTS_DETAILS_KEYS,
@@ -51,6 +59,8 @@ from controllers.constants import (MSG_ERROR,
                                    MENU_EVENT_FILTER_OWNED_LABEL,
                                    MENU_EVENT_FILTER_UNASSIGNED_KEYS,
                                    MENU_EVENT_FILTER_UNASSIGNED_LABEL,
+                                   MENU_EVENT_FILTER_FOLLOWED_KEYS,
+                                   MENU_EVENT_FILTER_FOLLOWED_LABEL,
                                    MENU_ADMINISTRATION_KEYS,
                                    MENU_ADMINISTRATION_LABEL,
                                    MENU_USER_DETAILS_KEYS,
@@ -59,6 +69,8 @@ from controllers.constants import (MSG_ERROR,
                                    MENU_USER_UPDATE_LABEL,
                                    MENU_USER_CREATE_KEYS,
                                    MENU_USER_CREATE_LABEL,
+                                   MENU_EXPORT_KEYS,
+                                   MENU_EXPORT_LABEL,
                                    MENU_EXIT_KEYS,
                                    MENU_EXIT_LABEL,
                                    MENU_RETURN_KEYS,
@@ -108,8 +120,10 @@ from controllers.constants import (MSG_ERROR,
                                    )
 
 from views.view_functions import (console)
+from .export_functions import export_list
+from .import_functions import file_format
 from .controllers_functions import (navigation_handler,
-                                    client_list,
+                                    add_page_actions,
                                     validate_email,
                                     validate_contract,
                                     validate_client,
@@ -131,12 +145,14 @@ from .controllers_functions import (navigation_handler,
                                     MC_CONTRACT_CREATE,
                                     MC_CONTRACT_UNPAID_FILTER,
                                     MC_CONTRACT_UNSIGNED_FILTER,
+                                    MC_CONTRACT_OWNED_FILTER,
                                     MC_EVENT_LIST,
                                     MC_EVENT_DETAILS,
                                     MC_EVENT_UPDATE,
                                     MC_EVENT_CREATE,
                                     MC_EVENT_OWNED_FILTER,
                                     MC_EVENT_UNASSIGNED_FILTER,
+                                    MC_EVENT_FOLLOWED_FILTER,
                                     MC_ADMINISTRATION,
                                     MC_USER_DETAILS,
                                     MC_USER_UPDATE,
@@ -144,34 +160,33 @@ from .controllers_functions import (navigation_handler,
                                     )
 
 from models.client_dal_functions import (get_client_by_id,
-                                         get_all_clients,
+                                         get_client_rows,
                                          update_client,
                                          create_client
                                          )
 from models.contract_dal_functions import (get_contract_by_id,
-                                           get_all_contracts,
+                                           get_contract_rows,
                                            update_contract,
-                                           create_contract,
-                                           get_unsigned_contracts,
-                                           get_unpaid_contracts
+                                           create_contract
                                            )
 from models.event_dal_functions import (get_event_by_id,
-                                        get_all_events,
+                                        get_event_rows,
                                         update_event,
-                                        create_event,
-                                        get_event_unassigned,
-                                        get_supported_event
+                                        create_event
                                         )
 from models.client_models import CONTRACT_STATUS
 from models.user_dal_functions import (get_user_by_id,
                                        get_user_by_email,
-                                       get_all_users,
+                                       get_user_rows,
                                        update_user,
                                        create_user,
                                        )
 from models.team_dal_functions import (get_team_by_id,
                                        get_all_teams)
 from models.general_dal_functions import get_user_role
+from models.dal_tools import LIST_PAGE_SIZE
+from models.dashboard_dal_functions import get_dashboard_data
+from models.dal_metrics import action, dal_metrics
 
 from .authorization_functions import (is_client_create_authorized,
                                       is_client_update_authorized,
@@ -182,17 +197,43 @@ from .authorization_functions import (is_client_create_authorized,
                                       is_user_create_authorized,
                                       is_user_read_authorized,
                                       is_user_update_authorized,
+                                      COMMERCIAL_ROLE,
                                       SUPPORT_ROLE)
 
-from db import DB_RECORD_NOT_FOUND
+from db import DB_RECORD_NOT_FOUND, unit_of_work, unit_of_work_paused
+from tracing import ScreenTrace, screen_trace_paused, trace_sampler
+
+
+class PausedScreen:
+    """ view whose methods, waiting for the user inputs, are called
+    outside the unit of work and the sentry transaction of the screen
+    action : no connection is held, no loaded object goes stale and
+    the traced durations do not count the time taken by the user
+    """
+
+    def __init__(self, view):
+        self.view = view
+
+    def __getattr__(self, name):
+        attribute = getattr(self.view, name)
+        if not callable(attribute):
+            return attribute
+
+        @wraps(attribute)
+        def paused(*args, **kwargs):
+            with unit_of_work_paused(), screen_trace_paused():
+                return attribute(*args, **kwargs)
+        return paused
 
 
 class MainController:
 
     def __init__(self, view, authentication):
-        self.screen = view
+        self.screen = PausedScreen(view)
         self.auth = authentication
         self.no_tokens = {'access': None, 'refresh': None}
+        # screen controller and duration of the last navigation step
+        self.last_transition = None
 
     def control_start(self,
                       connected_user,
@@ -218,36 +259,19 @@ class MainController:
                                        tokens
                                        )
 
-        # retrieve clients followed by user
-        clients_data = client_list(connected_user.id)
-        body_data['clients'] = clients_data
-        body_data['clients_title'] = TITLE_CLIENTS_HOME
+        # retrieve clients, contracts and events followed by user
+        result = get_dashboard_data(connected_user.id,
+                                    connected_user_role == SUPPORT_ROLE)
+        if result['status'] == 'ko':
+            capture_exception(result['error'])
+            console.print(MSG_ERROR)
+            return
 
-        # retrieve contracts followed by user
-        contracts_data = []
-        for client in clients_data:
-            result = get_client_by_id(client.id)
-            for contract in result['client'].contracts:
-                contracts_data.append(contract)
-        body_data['contracts'] = contracts_data
+        body_data['clients'] = result['clients']
+        body_data['clients_title'] = TITLE_CLIENTS_HOME
+        body_data['contracts'] = result['contracts']
         body_data['contracts_title'] = TITLE_CONTRACTS_HOME
-
-        # retrieve events followed by user
-        events_data = []
-        if connected_user_role == SUPPORT_ROLE:
-            result = get_supported_event(connected_user.id)
-            if result['status'] == 'ok':
-                body_data['events'] = result['events']
-            elif (result['status'] == 'ko'
-                  and result['error'] == DB_RECORD_NOT_FOUND):
-                body_data['events'] = []
-        else:
-            for contract in contracts_data:
-                result = get_contract_by_id(contract.id)
-                for event in result['contract'].events:
-                    events_data.append(event)
-            body_data['events'] = events_data
-
+        body_data['events'] = result['events']
         body_data['events_title'] = TITLE_EVENTS_HOME
 
         # actions menu creation, taking role into account
@@ -275,14 +299,14 @@ class MainController:
         if check_token['status'] == 'ko':
             console.print(MSG_EXPIRED_SESSION)
             time.sleep(2)
-            self.login()
+            return partial(self.login)
         else:
 
-            navigation_handler(self,
-                               choice,
-                               connected_user,
-                               connected_user_role,
-                               token)
+            return navigation_handler(self,
+                                      choice,
+                                      connected_user,
+                                      connected_user_role,
+                                      token)
 
     #############################
     # clients screens controllers
@@ -290,8 +314,12 @@ class MainController:
 
     def control_client_list(self,
                             connected_user,
-                            connected_user_role):
-        """ client list control"""
+                            connected_user_role,
+                            after_id=None,
+                            before_id=None):
+        """ client list control
+        after_id / before_id : cursor of the page to be displayed
+        """
 
         set_user({"email": connected_user.email})
 
@@ -310,12 +338,14 @@ class MainController:
                                        prompt
                                        )
 
-        result = get_all_clients()
+        result = get_client_rows(LIST_PAGE_SIZE, after_id, before_id)
 
         process_ok = False
+        page = None
 
         if result['status'] == 'ok':
             body_data['clients'] = result['clients']
+            page = result['page']
             process_ok = True
         elif (result['status'] == 'ko'
               and result['error'] == DB_RECORD_NOT_FOUND):
@@ -339,6 +369,8 @@ class MainController:
                                            connected_user_role):
                 actions.append((MENU_CLIENT_CREATE_KEYS,
                                 MENU_CLIENT_CREATE_LABEL))
+            actions.append((MENU_EXPORT_KEYS, MENU_EXPORT_LABEL))
+            add_page_actions(actions, page)
             actions.append((MENU_RETURN_KEYS, MENU_RETURN_LABEL))
             actions.append((MENU_EXIT_KEYS, MENU_EXIT_LABEL))
 
@@ -354,13 +386,15 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token,
+                                          MC_CLIENT_LIST,
+                                          page)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -406,7 +440,9 @@ class MainController:
               and result['error'] == DB_RECORD_NOT_FOUND):
             console.print(MSG_CLIENT_NOT_FOUND)
             time.sleep(2)
-            self.control_client_list(connected_user, connected_user_role)
+            return partial(self.control_client_list,
+                           connected_user,
+                           connected_user_role)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -446,14 +482,14 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
                 choice.append(client_id)
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token)
 
     def control_client_update(self,
                               data_id,
@@ -534,13 +570,14 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_client(client_dict)
                     if result['status'] == 'ok':
-                        self.control_client_details(client_id,
-                                                    connected_user,
-                                                    connected_user_role)
+                        return partial(self.control_client_details,
+                                       client_id,
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -556,13 +593,14 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_client(client_dict)
                     if result['status'] == 'ok':
-                        self.control_client_details(client_id,
-                                                    connected_user,
-                                                    connected_user_role)
+                        return partial(self.control_client_details,
+                                       client_id,
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -584,13 +622,14 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_client(client_dict)
                     if result['status'] == 'ok':
-                        self.control_client_details(client_id,
-                                                    connected_user,
-                                                    connected_user_role)
+                        return partial(self.control_client_details,
+                                       client_id,
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -606,13 +645,14 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_client(client_dict)
                     if result['status'] == 'ok':
-                        self.control_client_details(client_id,
-                                                    connected_user,
-                                                    connected_user_role)
+                        return partial(self.control_client_details,
+                                       client_id,
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -628,13 +668,14 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_client(client_dict)
                     if result['status'] == 'ok':
-                        self.control_client_details(client_id,
-                                                    connected_user,
-                                                    connected_user_role)
+                        return partial(self.control_client_details,
+                                       client_id,
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -656,13 +697,14 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_client(client_dict)
                     if result['status'] == 'ok':
-                        self.control_client_details(client_id,
-                                                    connected_user,
-                                                    connected_user_role)
+                        return partial(self.control_client_details,
+                                       client_id,
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -738,19 +780,22 @@ class MainController:
         if check_token['status'] == 'ko':
             console.print(MSG_EXPIRED_SESSION)
             time.sleep(2)
-            self.login()
+            return partial(self.login)
         else:
             if input_data == YES_NO_CHOICE[1]:
-                self.control_client_list(connected_user, connected_user_role)
+                return partial(self.control_client_list,
+                               connected_user,
+                               connected_user_role)
             else:
                 client_dict['commercial_contact_id'] = connected_user.id
                 client_dict['active'] = True
                 result = create_client(client_dict)
 
                 if result['status'] == 'ok':
-                    self.control_client_details(result['client_id'],
-                                                connected_user,
-                                                connected_user_role)
+                    return partial(self.control_client_details,
+                                   result['client_id'],
+                                   connected_user,
+                                   connected_user_role)
                 else:
                     capture_exception(result['error'])
                     console.print(MSG_ERROR)
@@ -762,8 +807,13 @@ class MainController:
     def control_contract_list(self,
                               connected_user,
                               connected_user_role,
-                              list_type):
-        """ contract list control"""
+                              list_type,
+                              after_id=None,
+                              before_id=None):
+        """ contract list control
+        list_type : full list or filter to be applied
+        after_id / before_id : cursor of the page to be displayed
+        """
 
         set_user({"email": connected_user.email})
 
@@ -783,17 +833,25 @@ class MainController:
                                        )
 
         # check the type of list in case of filter
-        if list_type == MC_CONTRACT_LIST:
-            result = get_all_contracts()
-        elif list_type == MC_CONTRACT_UNPAID_FILTER:
-            result = get_unpaid_contracts()
+        # only the displayed columns are read
+        filters = {}
+        if list_type == MC_CONTRACT_UNPAID_FILTER:
+            filters['unpaid'] = True
         elif list_type == MC_CONTRACT_UNSIGNED_FILTER:
-            result = get_unsigned_contracts()
+            filters['unsigned'] = True
+        elif list_type == MC_CONTRACT_OWNED_FILTER:
+            filters['owner_id'] = connected_user.id
+        result = get_contract_rows(page_size=LIST_PAGE_SIZE,
+                                   after_id=after_id,
+                                   before_id=before_id,
+                                   **filters)
 
         process_ok = False
+        page = None
 
         if result['status'] == 'ok':
             body_data['contracts'] = result['contracts']
+            page = result['page']
             process_ok = True
         elif (result['status'] == 'ko'
               and result['error'] == DB_RECORD_NOT_FOUND):
@@ -820,6 +878,11 @@ class MainController:
                             MENU_CONTRACT_FILTER_UNPAID_LABEL))
             actions.append((MENU_CONTRACT_FILTER_UNSIGNED_KEYS,
                             MENU_CONTRACT_FILTER_UNSIGNED_LABEL))
+            if connected_user_role == COMMERCIAL_ROLE:
+                actions.append((MENU_CONTRACT_FILTER_OWNED_KEYS,
+                                MENU_CONTRACT_FILTER_OWNED_LABEL))
+            actions.append((MENU_EXPORT_KEYS, MENU_EXPORT_LABEL))
+            add_page_actions(actions, page)
             actions.append((MENU_RETURN_KEYS, MENU_RETURN_LABEL))
             actions.append((MENU_EXIT_KEYS, MENU_EXIT_LABEL))
 
@@ -835,14 +898,15 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token,
-                                   list_type)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token,
+                                          list_type,
+                                          page)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -947,25 +1011,27 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
                 choice.append(contract_id)
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token)
         elif (result['status'] == 'ko'
               and result['error'] == DB_RECORD_NOT_FOUND):
             console.print(MSG_CONTRACT_NOT_FOUND)
             time.sleep(2)
             if list_type is None:
-                self.control_start(connected_user,
-                                   connected_user_role)
+                return partial(self.control_start,
+                               connected_user,
+                               connected_user_role)
             else:
-                self.control_contract_list(connected_user,
-                                           connected_user_role,
-                                           list_type)
+                return partial(self.control_contract_list,
+                               connected_user,
+                               connected_user_role,
+                               list_type)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -1085,14 +1151,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_contract(contract_dict)
                     if result['status'] == 'ok':
-                        self.control_contract_details(contract_id,
-                                                      connected_user,
-                                                      connected_user_role,
-                                                      MC_CONTRACT_LIST)
+                        return partial(self.control_contract_details,
+                                       contract_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_CONTRACT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1113,14 +1180,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_contract(contract_dict)
                     if result['status'] == 'ok':
-                        self.control_contract_details(contract_id,
-                                                      connected_user,
-                                                      connected_user_role,
-                                                      MC_CONTRACT_LIST)
+                        return partial(self.control_contract_details,
+                                       contract_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_CONTRACT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1141,14 +1209,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_contract(contract_dict)
                     if result['status'] == 'ok':
-                        self.control_contract_details(contract_id,
-                                                      connected_user,
-                                                      connected_user_role,
-                                                      MC_CONTRACT_LIST)
+                        return partial(self.control_contract_details,
+                                       contract_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_CONTRACT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1169,7 +1238,7 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_contract(contract_dict)
                     if result['status'] == 'ok':
@@ -1177,10 +1246,11 @@ class MainController:
                                    .format(contract_dict['id'],
                                            contract_dict['status']))
                         capture_message(message)
-                        self.control_contract_details(contract_id,
-                                                      connected_user,
-                                                      connected_user_role,
-                                                      MC_CONTRACT_LIST)
+                        return partial(self.control_contract_details,
+                                       contract_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_CONTRACT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1260,21 +1330,23 @@ class MainController:
         if check_token['status'] == 'ko':
             console.print(MSG_EXPIRED_SESSION)
             time.sleep(2)
-            self.login()
+            return partial(self.login)
         else:
             if input_data == YES_NO_CHOICE[1]:
-                self.control_contract_list(connected_user,
-                                           connected_user_role,
-                                           MC_CONTRACT_LIST)
+                return partial(self.control_contract_list,
+                               connected_user,
+                               connected_user_role,
+                               MC_CONTRACT_LIST)
             else:
                 contract_dict['active'] = True
                 result = create_contract(contract_dict)
 
                 if result['status'] == 'ok':
-                    self.control_contract_details(result['contract_id'],
-                                                  connected_user,
-                                                  connected_user_role,
-                                                  MC_CONTRACT_LIST)
+                    return partial(self.control_contract_details,
+                                   result['contract_id'],
+                                   connected_user,
+                                   connected_user_role,
+                                   MC_CONTRACT_LIST)
                 else:
                     capture_exception(result['error'])
                     console.print(MSG_ERROR)
@@ -1285,8 +1357,13 @@ class MainController:
     def control_event_list(self,
                            connected_user,
                            connected_user_role,
-                           list_type):
-        """ event list control"""
+                           list_type,
+                           after_id=None,
+                           before_id=None):
+        """ event list control
+        list_type : full list or filter to be applied
+        after_id / before_id : cursor of the page to be displayed
+        """
 
         set_user({"email": connected_user.email})
 
@@ -1306,16 +1383,24 @@ class MainController:
                                        )
 
         # check the type of list in case of filter
-        if list_type == MC_EVENT_LIST:
-            result = get_all_events()
-        elif list_type == MC_EVENT_OWNED_FILTER:
-            result = get_supported_event(connected_user.id)
+        # only the displayed columns are read
+        filters = {}
+        if list_type == MC_EVENT_OWNED_FILTER:
+            filters['support_user_id'] = connected_user.id
         elif list_type == MC_EVENT_UNASSIGNED_FILTER:
-            result = get_event_unassigned()
+            filters['unassigned'] = True
+        elif list_type == MC_EVENT_FOLLOWED_FILTER:
+            filters['owner_id'] = connected_user.id
+        result = get_event_rows(page_size=LIST_PAGE_SIZE,
+                                after_id=after_id,
+                                before_id=before_id,
+                                **filters)
         process_ok = False
+        page = None
 
         if result['status'] == 'ok':
             body_data['events'] = result['events']
+            page = result['page']
             process_ok = True
         elif (result['status'] == 'ko'
               and result['error'] == DB_RECORD_NOT_FOUND):
@@ -1345,6 +1430,11 @@ class MainController:
                                 MENU_EVENT_FILTER_OWNED_LABEL))
             actions.append((MENU_EVENT_FILTER_UNASSIGNED_KEYS,
                             MENU_EVENT_FILTER_UNASSIGNED_LABEL))
+            if connected_user_role == COMMERCIAL_ROLE:
+                actions.append((MENU_EVENT_FILTER_FOLLOWED_KEYS,
+                                MENU_EVENT_FILTER_FOLLOWED_LABEL))
+            actions.append((MENU_EXPORT_KEYS, MENU_EXPORT_LABEL))
+            add_page_actions(actions, page)
             actions.append((MENU_RETURN_KEYS, MENU_RETURN_LABEL))
             actions.append((MENU_EXIT_KEYS, MENU_EXIT_LABEL))
 
@@ -1361,14 +1451,15 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token,
-                                   list_type)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token,
+                                          list_type,
+                                          page)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -1448,25 +1539,27 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
                 choice.append(event_id)
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token)
         elif (result['status'] == 'ko'
               and result['error'] == DB_RECORD_NOT_FOUND):
             console.print(MSG_EVENT_NOT_FOUND)
             time.sleep(2)
             if list_type is None:
-                self.control_start(connected_user,
-                                   connected_user_role)
+                return partial(self.control_start,
+                               connected_user,
+                               connected_user_role)
             else:
-                self.control_event_list(connected_user,
-                                        connected_user_role,
-                                        list_type)
+                return partial(self.control_event_list,
+                               connected_user,
+                               connected_user_role,
+                               list_type)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -1555,14 +1648,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1582,14 +1676,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1610,14 +1705,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1638,14 +1734,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1660,14 +1757,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1687,14 +1785,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1709,14 +1808,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1736,14 +1836,15 @@ class MainController:
                 if check_token['status'] == 'ko':
                     console.print(MSG_EXPIRED_SESSION)
                     time.sleep(2)
-                    self.login()
+                    return partial(self.login)
                 else:
                     result = update_event(event_dict)
                     if result['status'] == 'ok':
-                        self.control_event_details(event_id,
-                                                   connected_user,
-                                                   connected_user_role,
-                                                   MC_EVENT_LIST)
+                        return partial(self.control_event_details,
+                                       event_id,
+                                       connected_user,
+                                       connected_user_role,
+                                       MC_EVENT_LIST)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -1851,32 +1952,83 @@ class MainController:
         if check_token['status'] == 'ko':
             console.print(MSG_EXPIRED_SESSION)
             time.sleep(2)
-            self.login()
+            return partial(self.login)
         else:
             if input_data == YES_NO_CHOICE[1]:
-                self.control_event_list(connected_user,
-                                        connected_user_role,
-                                        MC_EVENT_LIST)
+                return partial(self.control_event_list,
+                               connected_user,
+                               connected_user_role,
+                               MC_EVENT_LIST)
             else:
                 event_dict['active'] = True
                 event_dict['support_contact_id'] = None
                 result = create_event(event_dict)
                 if result['status'] == 'ok':
-                    self.control_event_details(result['event_id'],
-                                               connected_user,
-                                               connected_user_role,
-                                               MC_EVENT_LIST)
+                    return partial(self.control_event_details,
+                                   result['event_id'],
+                                   connected_user,
+                                   connected_user_role,
+                                   MC_EVENT_LIST)
                 else:
                     capture_exception(result['error'])
                     console.print(MSG_ERROR)
 
+    ###############################
+    # list export screen controller
+    ###############################
+    def control_export(self,
+                       path,
+                       connected_user,
+                       connected_user_role,
+                       list_type):
+        """ export of the rows of a list screen to a csv or jsonl file,
+        with the filter of the screen, then back to the list
+        """
+
+        set_user({"email": connected_user.email})
+
+        try:
+            file_format(path)
+        except ValueError:
+            console.print(MSG_EXPORT_WRONG_FORMAT)
+        else:
+            result = export_list(list_type, path, user_id=connected_user.id)
+            if result['status'] == 'ok':
+                console.print(f"{result['written']} {MSG_EXPORT_DONE} {path}")
+            else:
+                capture_exception(result['error'])
+                console.print(MSG_ERROR)
+        time.sleep(2)
+
+        if list_type == MC_CLIENT_LIST:
+            return partial(self.control_client_list,
+                           connected_user,
+                           connected_user_role)
+        elif list_type in [MC_CONTRACT_LIST,
+                           MC_CONTRACT_UNPAID_FILTER,
+                           MC_CONTRACT_UNSIGNED_FILTER,
+                           MC_CONTRACT_OWNED_FILTER]:
+            return partial(self.control_contract_list,
+                           connected_user,
+                           connected_user_role,
+                           list_type)
+        else:
+            return partial(self.control_event_list,
+                           connected_user,
+                           connected_user_role,
+                           list_type)
+
     ################################################
     # user administration events screens controllers
     ################################################
     def control_user_administration(self,
                                     connected_user,
-                                    connected_user_role):
-        """ user administration homepage """
+                                    connected_user_role,
+                                    after_id=None,
+                                    before_id=None):
+        """ user administration homepage
+        after_id / before_id : cursor of the page to be displayed
+        """
 
         set_user({"email": connected_user.email})
 
@@ -1895,18 +2047,15 @@ class MainController:
                                        prompt
                                        )
 
-        result = get_all_users()
+        # users with their team and role names, in one query
+        result = get_user_rows(LIST_PAGE_SIZE, after_id, before_id)
 
         process_ok = False
+        page = None
 
         if result['status'] == 'ok':
-            list_of_users = []
-            for user in result['users']:
-                result = get_team_by_id(user.team_id)
-                team = result['team']
-                user_data = [user, team.name]
-                list_of_users.append(user_data)
-            body_data['users'] = list_of_users
+            body_data['users'] = result['users']
+            page = result['page']
             process_ok = True
         elif (result['status'] == 'ko'
               and result['error'] == DB_RECORD_NOT_FOUND):
@@ -1929,6 +2078,7 @@ class MainController:
                                          connected_user_role):
                 actions.append((MENU_USER_CREATE_KEYS,
                                 MENU_USER_CREATE_LABEL))
+            add_page_actions(actions, page)
             actions.append((MENU_RETURN_KEYS, MENU_RETURN_LABEL))
             actions.append((MENU_EXIT_KEYS, MENU_EXIT_LABEL))
 
@@ -1945,13 +2095,15 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token,
+                                          MC_ADMINISTRATION,
+                                          page)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -2021,14 +2173,14 @@ class MainController:
             if check_token['status'] == 'ko':
                 console.print(MSG_EXPIRED_SESSION)
                 time.sleep(2)
-                self.login()
+                return partial(self.login)
             else:
                 choice.append(user_id)
-                navigation_handler(self,
-                                   choice,
-                                   connected_user,
-                                   connected_user_role,
-                                   token)
+                return navigation_handler(self,
+                                          choice,
+                                          connected_user,
+                                          connected_user_role,
+                                          token)
         else:
             capture_exception(result['error'])
             console.print(MSG_ERROR)
@@ -2113,7 +2265,7 @@ class MainController:
                     if check_token['status'] == 'ko':
                         console.print(MSG_EXPIRED_SESSION)
                         time.sleep(2)
-                        self.login()
+                        return partial(self.login)
                     else:
                         result = update_user(user_dict)
                         if result['status'] == 'ok':
@@ -2122,9 +2274,10 @@ class MainController:
                                                user_dict['employee_number']))
                             capture_message(message)
 
-                            self.control_user_details(user_id,
-                                                      connected_user,
-                                                      connected_user_role)
+                            return partial(self.control_user_details,
+                                           user_id,
+                                           connected_user,
+                                           connected_user_role)
                         else:
                             capture_exception(result['error'])
                             console.print(MSG_ERROR)
@@ -2139,7 +2292,7 @@ class MainController:
                     if check_token['status'] == 'ko':
                         console.print(MSG_EXPIRED_SESSION)
                         time.sleep(2)
-                        self.login()
+                        return partial(self.login)
                     else:
                         result = update_user(user_dict)
                         if result['status'] == 'ok':
@@ -2148,9 +2301,10 @@ class MainController:
                                                user_dict['first_name']))
                             capture_message(message)
 
-                            self.control_user_details(user_id,
-                                                      connected_user,
-                                                      connected_user_role)
+                            return partial(self.control_user_details,
+                                           user_id,
+                                           connected_user,
+                                           connected_user_role)
                         else:
                             capture_exception(result['error'])
                             console.print(MSG_ERROR)
@@ -2165,7 +2319,7 @@ class MainController:
                     if check_token['status'] == 'ko':
                         console.print(MSG_EXPIRED_SESSION)
                         time.sleep(2)
-                        self.login()
+                        return partial(self.login)
                     else:
                         result = update_user(user_dict)
                         if result['status'] == 'ok':
@@ -2174,9 +2328,10 @@ class MainController:
                                                user_dict['last_name']))
                             capture_message(message)
 
-                            self.control_user_details(user_id,
-                                                      connected_user,
-                                                      connected_user_role)
+                            return partial(self.control_user_details,
+                                           user_id,
+                                           connected_user,
+                                           connected_user_role)
                         else:
                             capture_exception(result['error'])
                             console.print(MSG_ERROR)
@@ -2196,7 +2351,7 @@ class MainController:
                     if check_token['status'] == 'ko':
                         console.print(MSG_EXPIRED_SESSION)
                         time.sleep(2)
-                        self.login()
+                        return partial(self.login)
                     else:
                         result = update_user(user_dict)
                         if result['status'] == 'ok':
@@ -2205,9 +2360,10 @@ class MainController:
                                                user_dict['email']))
                             capture_message(message)
 
-                            self.control_user_details(user_id,
-                                                      connected_user,
-                                                      connected_user_role)
+                            return partial(self.control_user_details,
+                                           user_id,
+                                           connected_user,
+                                           connected_user_role)
                         else:
                             capture_exception(result['error'])
                             console.print(MSG_ERROR)
@@ -2227,7 +2383,7 @@ class MainController:
                     if check_token['status'] == 'ko':
                         console.print(MSG_EXPIRED_SESSION)
                         time.sleep(2)
-                        self.login()
+                        return partial(self.login)
                     else:
                         result = update_user(user_dict)
                         if result['status'] == 'ok':
@@ -2236,9 +2392,10 @@ class MainController:
                                                user_dict['team_id']))
                             capture_message(message)
 
-                            self.control_user_details(user_id,
-                                                      connected_user,
-                                                      connected_user_role)
+                            return partial(self.control_user_details,
+                                           user_id,
+                                           connected_user,
+                                           connected_user_role)
                         else:
                             capture_exception(result['error'])
                             console.print(MSG_ERROR)
@@ -2345,11 +2502,12 @@ class MainController:
         if check_token['status'] == 'ko':
             console.print(MSG_EXPIRED_SESSION)
             time.sleep(2)
-            self.login()
+            return partial(self.login)
         else:
             if input_data == YES_NO_CHOICE[1]:
-                self.control_user_administration(connected_user,
-                                                 connected_user_role)
+                return partial(self.control_user_administration,
+                               connected_user,
+                               connected_user_role)
             else:
                 user_dict['active'] = True
                 if is_user_create_authorized(connected_user.id,
@@ -2360,9 +2518,10 @@ class MainController:
                                    .format(result['user_id'],
                                            user_dict['last_name']))
                         capture_message(message)
-                        self.control_user_details(result['user_id'],
-                                                  connected_user,
-                                                  connected_user_role)
+                        return partial(self.control_user_details,
+                                       result['user_id'],
+                                       connected_user,
+                                       connected_user_role)
                     else:
                         capture_exception(result['error'])
                         console.print(MSG_ERROR)
@@ -2391,17 +2550,18 @@ class MainController:
             result_role = get_user_role(user.id)
             if result_role['status'] == 'ok':
                 user_role = result_role['user_role']
-                self.control_start(user,
-                                   user_role,
-                                   access_token,
-                                   refresh_token)
+                return partial(self.control_start,
+                               user,
+                               user_role,
+                               access_token,
+                               refresh_token)
             else:
                 capture_exception(result_role['error'])
                 console.print(MSG_ERROR)
         else:
             console.print(MSG_ERROR_LOGIN)
             time.sleep(2)
-            self.login()
+            return partial(self.login)
 
     def exit(self):
         self.screen.exit()
@@ -2410,4 +2570,28 @@ class MainController:
     # controller start
     ##################
     def run(self):
-        self.login()
+        """ navigation loop
+        each screen controller returns the next screen to be displayed
+        instead of calling it, the call stack keeps the same depth
+        whatever the length of the session
+        """
+        next_screen = partial(self.login)
+
+        while next_screen is not None:
+            start = time.perf_counter()
+            screen = next_screen.func.__name__
+            # one session and one connection for the whole screen action,
+            # traced as sentry transactions with a span by DAL function,
+            # both paused while the screen waits for the user (PausedScreen)
+            with (ScreenTrace(screen),
+                  action(screen) as statistics,
+                  unit_of_work()):
+                next_screen = next_screen()
+            trace_sampler.observe(screen,
+                                  statistics.database_time * 1000,
+                                  statistics.errors)
+            self.last_transition = {'screen': screen,
+                                    'duration': time.perf_counter() - start}
+            dal_metrics.periodic_dump()
+
+        dal_metrics.periodic_dump(force=True)
@@ -0,0 +1,381 @@
+# non interactive import of clients, contracts and events
+# from csv or jsonl files
+#
+# the file is read as a stream : rows are validated and written by chunks,
+# only one chunk is kept in memory whatever the size of the file
+import csv
+import datetime
+import json
+import os
+import time
+
+from models.client_models import CONTRACT_STATUS
+from models.dal_tools import batched, BULK_BATCH_SIZE
+from models.client_dal_functions import (bulk_create_clients,
+                                         bulk_upsert_clients,
+                                         )
+from models.contract_dal_functions import (bulk_create_contracts,
+                                           bulk_upsert_contracts,
+                                           )
+from models.event_dal_functions import (bulk_create_events,
+                                        bulk_upsert_events,
+                                        )
+from controllers.constants import (DATE_FORMAT,
+                                   MSG_CLIENT_NOT_FOUND,
+                                   MSG_WRONG_COMMERCIAL_USER,
+                                   MSG_WRONG_DATE_FORMAT,
+                                   MSG_WRONG_EMAIL_FORMAT,
+                                   MSG_WRONG_NUMBER_FORMAT,
+                                   MSG_WRONG_STATUS,
+                                   MSG_WRONG_SUPPORT_USER,
+                                   )
+from controllers.controllers_functions import (is_date,
+                                               is_float,
+                                               validate_client_ids,
+                                               validate_commercial_user_ids,
+                                               validate_contract_ids,
+                                               validate_email,
+                                               validate_support_user_ids,
+                                               )
+
+IMPORT_ENTITIES = ['clients', 'contracts', 'events']
+IMPORT_FORMATS = ['csv', 'jsonl']
+
+MSG_IMPORT_MISSING_FIELD = "Donnée obligatoire manquante : "
+MSG_IMPORT_CONTRACT_NOT_FOUND = "Le contrat est inexistant"
+MSG_IMPORT_ID_REQUIRED = "L'id est obligatoire pour une mise à jour"
+MSG_IMPORT_WRONG_LINE = "La ligne n'est pas un objet json valide"
+
+# mandatory fields of each entity, the other fields are optional
+REQUIRED_FIELDS = {
+    'clients': ['first_name', 'last_name', 'email', 'telephone',
+                'enterprise', 'commercial_contact_id'],
+    'contracts': ['client_id', 'total_amount', 'amount_unpaid', 'status'],
+    'events': ['title', 'contract_id', 'start_date', 'end_date',
+               'location'],
+}
+
+BULK_FUNCTIONS = {
+    'clients': (bulk_create_clients, bulk_upsert_clients),
+    'contracts': (bulk_create_contracts, bulk_upsert_contracts),
+    'events': (bulk_create_events, bulk_upsert_events),
+}
+
+
+def file_format(path):
+    """ format of the file from its extension, csv or jsonl """
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension == 'json':
+        extension = 'jsonl'
+    if extension not in IMPORT_FORMATS:
+        raise ValueError(f"unknown import format : {extension}")
+    return extension
+
+
+def read_rows(path, row_format=None):
+    """ read a csv (with a header line) or jsonl file one row at a time
+    parameters :
+    path : path of the file
+    row_format : csv or jsonl, from the file extension by default
+    yields tuples (line number, row dictionnary),
+    every value of a csv row is a string, a jsonl line which is not
+    a json object is yielded with None as row
+    """
+    row_format = row_format or file_format(path)
+    with open(path, newline='', encoding='utf-8') as file:
+        if row_format == 'csv':
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    row = None
+                if not isinstance(row, dict):
+                    row = None
+                yield line_number, row
+
+
+def is_empty(value):
+    return value is None or str(value).strip() == ''
+
+
+def to_int(value):
+    """ int value of a number or of a string, None if empty """
+    if is_empty(value):
+        return None
+    return int(value)
+
+
+def to_bool(value):
+    """ boolean value of a csv or json field, True if empty """
+    if is_empty(value):
+        return True
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ['1', 'true', 'yes', 'oui']
+
+
+def to_date(value):
+    return datetime.datetime.strptime(value, DATE_FORMAT)
+
+
+def is_int(value):
+    try:
+        to_int(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def check_required(entity, row, upsert):
+    """ list of the errors on the missing mandatory fields """
+    errors = [MSG_IMPORT_MISSING_FIELD + field
+              for field in REQUIRED_FIELDS[entity]
+              if is_empty(row.get(field))]
+    if upsert and entity != 'clients' and is_empty(row.get('id')):
+        errors.append(MSG_IMPORT_ID_REQUIRED)
+    if not is_empty(row.get('id')) and not is_int(row.get('id')):
+        errors.append(MSG_WRONG_NUMBER_FORMAT + ' : id')
+    return errors
+
+
+def check_client(row):
+    errors = []
+    if (not isinstance(row['email'], str)
+            or not validate_email(row['email'])):
+        errors.append(MSG_WRONG_EMAIL_FORMAT)
+    if not is_int(row['commercial_contact_id']):
+        errors.append(MSG_WRONG_NUMBER_FORMAT + ' : commercial_contact_id')
+    return errors
+
+
+def check_contract(row):
+    errors = []
+    for field in ['total_amount', 'amount_unpaid']:
+        if not is_float(row[field]):
+            errors.append(MSG_WRONG_NUMBER_FORMAT + ' : ' + field)
+    if not is_int(row['client_id']):
+        errors.append(MSG_WRONG_NUMBER_FORMAT + ' : client_id')
+    if row['status'] not in CONTRACT_STATUS:
+        errors.append(MSG_WRONG_STATUS)
+    return errors
+
+
+def check_event(row):
+    errors = []
+    for field in ['start_date', 'end_date']:
+        if not isinstance(row[field], str) or not is_date(row[field]):
+            errors.append(MSG_WRONG_DATE_FORMAT + ' : ' + field)
+    for field in ['contract_id', 'support_contact_id', 'attendees']:
+        if not is_int(row.get(field)):
+            errors.append(MSG_WRONG_NUMBER_FORMAT + ' : ' + field)
+    return errors
+
+
+CHECK_FUNCTIONS = {
+    'clients': check_client,
+    'contracts': check_contract,
+    'events': check_event,
+}
+
+
+def convert_row(entity, row):
+    """ dictionnary expected by the DAL create functions,
+    from a checked row of the file
+    """
+    if entity == 'clients':
+        data = {field: str(row[field]).strip()
+                for field in ['first_name', 'last_name', 'email',
+                              'telephone', 'enterprise']}
+        data['commercial_contact_id'] = to_int(row['commercial_contact_id'])
+    elif entity == 'contracts':
+        data = {'client_id': to_int(row['client_id']),
+                'total_amount': float(row['total_amount']),
+                'amount_unpaid': float(row['amount_unpaid']),
+                'status': row['status'],
+                }
+    else:
+        data = {'title': str(row['title']).strip(),
+                'contract_id': to_int(row['contract_id']),
+                'start_date': to_date(row['start_date']),
+                'end_date': to_date(row['end_date']),
+                'support_contact_id': to_int(row.get('support_contact_id')),
+                'location': str(row['location']).strip(),
+                'attendees': to_int(row.get('attendees')) or 0,
+                'notes': row.get('notes') or None,
+                }
+    data['active'] = to_bool(row.get('active'))
+    if not is_empty(row.get('id')):
+        data['id'] = to_int(row['id'])
+    return data
+
+
+def check_references(entity, rows):
+    """ check the users, clients and contracts referenced by a chunk
+    of converted rows, with one query by referenced table
+    returns list of the errors of each row, in the order of the rows
+    """
+    errors = [[] for row in rows]
+
+    if entity == 'clients':
+        commercial_ids = validate_commercial_user_ids(
+            [row['commercial_contact_id'] for row in rows])
+        for row, row_errors in zip(rows, errors):
+            if row['commercial_contact_id'] not in commercial_ids:
+                row_errors.append(MSG_WRONG_COMMERCIAL_USER)
+
+    elif entity == 'contracts':
+        client_ids = validate_client_ids([row['client_id'] for row in rows])
+        for row, row_errors in zip(rows, errors):
+            if row['client_id'] not in client_ids:
+                row_errors.append(MSG_CLIENT_NOT_FOUND)
+
+    else:
+        contract_ids = validate_contract_ids(
+            [row['contract_id'] for row in rows])
+        support_ids = validate_support_user_ids(
+            [row['support_contact_id'] for row in rows
+             if row['support_contact_id'] is not None])
+        for row, row_errors in zip(rows, errors):
+            if row['contract_id'] not in contract_ids:
+                row_errors.append(MSG_IMPORT_CONTRACT_NOT_FOUND)
+            if (row['support_contact_id'] is not None
+                    and row['support_contact_id'] not in support_ids):
+                row_errors.append(MSG_WRONG_SUPPORT_USER)
+
+    return errors
+
+
+def validated_chunks(entity, numbered_rows, chunk_size, upsert, report):
+    """ check the rows of the file by chunks
+    parameters :
+    entity : clients, contracts or events
+    numbered_rows : iterable of (line number, row) as read by read_rows
+    chunk_size : number of rows by chunk
+    upsert : True if the rows are created or updated
+    report : function called with (line number, errors) for a refused row
+    yields lists of the valid rows of each chunk, converted for the DAL
+    """
+    check_row = CHECK_FUNCTIONS[entity]
+
+    for chunk in batched(numbered_rows, chunk_size):
+        numbers = []
+        rows = []
+        for line_number, row in chunk:
+            if row is None:
+                report(line_number, [MSG_IMPORT_WRONG_LINE])
+                continue
+            errors = check_required(entity, row, upsert)
+            if not errors:
+                errors = check_row(row)
+            if errors:
+                report(line_number, errors)
+            else:
+                numbers.append(line_number)
+                rows.append(convert_row(entity, row))
+
+        valid_rows = []
+        for line_number, row, errors in zip(
+                numbers, rows, check_references(entity, rows)):
+            if errors:
+                report(line_number, errors)
+            else:
+                valid_rows.append(row)
+
+        yield valid_rows
+
+
+def print_rejected(line_number, errors):
+    print(f"line {line_number} refused : {', '.join(errors)}")
+
+
+def import_file(entity,
+                path,
+                row_format=None,
+                chunk_size=None,
+                upsert=False,
+                report=print_rejected):
+    """ import clients, contracts or events from a csv or jsonl file,
+    the rows are validated and written by chunks of chunk_size rows,
+    one transaction by chunk
+    parameters :
+    entity : clients, contracts or events
+    path : path of the file
+    row_format : csv or jsonl, from the file extension by default
+    chunk_size : number of rows by chunk, BULK_BATCH_SIZE by default
+    upsert : True to update the rows already in database
+             (same email for the clients, same id for the others)
+    report : function called with (line number, errors) for a refused row
+    returns result dictionnary with keys :
+    'status': ok or ko (ko if a chunk could not be written)
+    'read': number of rows read
+    'written': number of rows written in database
+    'refused': number of rows refused by the validation
+    'failed': number of valid rows of the chunks not written
+    'duration': duration of the import in seconds
+    'rows_per_second': read rows by second
+    'error': error details of the first chunk not written, or of the file
+             which could not be read (if status == ko)
+    """
+    chunk_size = chunk_size or BULK_BATCH_SIZE
+    bulk_function = BULK_FUNCTIONS[entity][1 if upsert else 0]
+
+    result = {'status': "ok", 'read': 0, 'written': 0,
+              'refused': 0, 'failed': 0}
+
+    def count_read(numbered_rows):
+        for numbered_row in numbered_rows:
+            result['read'] += 1
+            yield numbered_row
+
+    def count_refused(line_number, errors):
+        result['refused'] += 1
+        report(line_number, errors)
+
+    start = time.perf_counter()
+    numbered_rows = count_read(read_rows(path, row_format))
+
+    try:
+        for rows in validated_chunks(entity,
+                                     numbered_rows,
+                                     chunk_size,
+                                     upsert,
+                                     count_refused):
+            if not rows:
+                continue
+            result_bulk = bulk_function(rows, batch_size=len(rows))
+            if result_bulk['status'] == "ok":
+                result['written'] += result_bulk['row_count']
+            else:
+                result['failed'] += len(rows)
+                if result['status'] == "ok":
+                    result['status'] = "ko"
+                    result['error'] = result_bulk['error']
+    except (OSError, ValueError) as e:
+        # missing file, unknown format or file not encoded in utf-8,
+        # the chunks already written are kept
+        if result['status'] == "ok":
+            result['status'] = "ko"
+            result['error'] = e
+
+    result['duration'] = time.perf_counter() - start
+    result['rows_per_second'] = (result['read'] / result['duration']
+                                 if result['duration'] else 0)
+    return result
+
+
+def print_import_report(result):
+    """ display the counters and the throughput of an import """
+    print(f"rows read    : {result['read']}")
+    print(f"written      : {result['written']}")
+    print(f"refused      : {result['refused']}")
+    print(f"not written  : {result['failed']}")
+    print(f"duration     : {result['duration']:.2f} s"
+          f" ({result['rows_per_second']:.0f} rows/s)")
+    if result['status'] == "ko":
+        print(f"error        : {result['error']}")
@@ -1,8 +1,16 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from logging.handlers import RotatingFileHandler
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.orm import declarative_base
+import json
+import logging
 import os
+import sys
+import time
 
 
 Base = declarative_base()
@@ -16,6 +24,39 @@ db_name = os.getenv("DB_NAME")
 db_engine = os.getenv("DB_ENGINE")
 # print(db_engine)
 
+# connection pool setup (mysql, postgresql and sqlite files)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# recycle must stay below the mysql wait_timeout (8 hours by default)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true") == "true"
+
+# sqlite setup, applied on each new connection
+DB_SQLITE_JOURNAL_MODE = os.getenv("DB_SQLITE_JOURNAL_MODE", "WAL").upper()
+DB_SQLITE_SYNCHRONOUS = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+DB_SQLITE_CACHE_SIZE = int(os.getenv("DB_SQLITE_CACHE_SIZE", "-20000"))
+
+SQLITE_JOURNAL_MODES = ['DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL',
+                        'OFF']
+SQLITE_SYNCHRONOUS_MODES = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+
+# checked once, the values are inserted in the pragmas of each connection
+if DB_SQLITE_JOURNAL_MODE not in SQLITE_JOURNAL_MODES:
+    raise ValueError(f"Invalid sqlite journal mode {DB_SQLITE_JOURNAL_MODE}")
+if DB_SQLITE_SYNCHRONOUS not in SQLITE_SYNCHRONOUS_MODES:
+    raise ValueError(f"Invalid sqlite synchronous mode "
+                     f"{DB_SQLITE_SYNCHRONOUS}")
+
+# slow query log : statements longer than SLOW_QUERY_THRESHOLD ms
+# (0 to disable the log) are written in a rotating jsonl file
+SLOW_QUERY_THRESHOLD = int(os.getenv("SLOW_QUERY_THRESHOLD", "0"))
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true") == "true"
+SLOW_QUERY_PARAMETERS = os.getenv("SLOW_QUERY_PARAMETERS", "true") == "true"
+SLOW_QUERY_PATH = os.getenv("SLOW_QUERY_PATH", "slow_queries.jsonl")
+SLOW_QUERY_MAX_BYTES = int(os.getenv("SLOW_QUERY_MAX_BYTES", "10485760"))
+SLOW_QUERY_BACKUP_COUNT = int(os.getenv("SLOW_QUERY_BACKUP_COUNT", "5"))
+
 if db_engine == "mysql":
     db_url = f"mysql+pymysql://{db_user}:{db_pass}@{db_host}/{db_name}"
 elif db_engine == "sqlite":
@@ -27,9 +68,318 @@ elif db_engine == "test":
 
 # print(db_url)
 
-engine = create_engine(db_url)
+
+def engine_options(db_engine):
+    """ build the create_engine keyword arguments from the .env setup
+    parameters :
+    db_engine : mysql, sqlite, postgresql or test
+    returns dictionnary of create_engine keyword arguments
+    """
+    options = {
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_recycle': DB_POOL_RECYCLE,
+        'pool_pre_ping': DB_POOL_PRE_PING,
+    }
+    if db_engine in ['sqlite', 'test']:
+        # a sqlite file does not drop idle connections
+        options['pool_recycle'] = -1
+        options['pool_pre_ping'] = False
+
+    return options
+
+
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """ apply journal mode, synchronous and cache size pragmas
+    to each new sqlite connection
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={DB_SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={DB_SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA cache_size={DB_SQLITE_CACHE_SIZE}")
+    cursor.close()
+
+
+pool_statistics = {
+    'connections': 0,
+    'checkouts': 0,
+    'checkins': 0,
+    'invalidations': 0,
+}
+
+
+def count_pool_event(statistic):
+    """ create a pool event listener incrementing a statistic """
+    def listener(*args):
+        pool_statistics[statistic] += 1
+
+    return listener
+
+
+def get_pool_statistics():
+    """ report the connection pool activity
+    returns dictionnary with keys :
+    'connections': connections opened to the database
+    'checkouts': connections handed to a session
+    'checkins': connections given back to the pool
+    'invalidations': connections discarded (stale or in error)
+    'checked_out': connections currently in use
+    'pool_size': connections kept in the pool
+    'overflow': connections opened over the pool size
+    """
+    statistics = dict(pool_statistics)
+    pool = engine.pool
+    statistics['checked_out'] = (statistics['checkouts']
+                                 - statistics['checkins'])
+    statistics['pool_size'] = (pool.size()
+                               if hasattr(pool, 'size') else None)
+    statistics['overflow'] = (pool.overflow()
+                              if hasattr(pool, 'overflow') else None)
+    return statistics
+
+
+engine = create_engine(db_url, **engine_options(db_engine))
+
+if engine.dialect.name == 'sqlite':
+    event.listen(engine, 'connect', set_sqlite_pragma)
+
+event.listen(engine, 'connect', count_pool_event('connections'))
+event.listen(engine, 'checkout', count_pool_event('checkouts'))
+event.listen(engine, 'checkin', count_pool_event('checkins'))
+event.listen(engine, 'invalidate', count_pool_event('invalidations'))
+
+
+def calling_dal_function():
+    """ name of the DAL function running the statement ('module.function'),
+    the innermost function of a *_dal_functions module or else
+    of the models package (streamed rows), None if not found
+    """
+    models_function = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('models.'):
+            name = f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+            if module.endswith('_dal_functions'):
+                return name
+            if models_function is None:
+                models_function = name
+        frame = frame.f_back
+    return models_function
+
+
+class SlowQueryRecorder():
+    """ engine listener writing the statements longer than threshold ms
+    in a rotating jsonl file, one json object by statement with keys :
+    'time': end of the statement (iso format)
+    'duration_ms': duration of the statement
+    'function': calling DAL function (see calling_dal_function)
+    'statement': sql text
+    'parameters': parameters of the statement (if parameters is True)
+    'executemany': True for a statement run on several parameter sets
+    'plan': rows of the EXPLAIN of a select statement (if explain is True
+            and the rows of the statement are not streamed)
+    'plan_error': error of the EXPLAIN (if it failed)
+    """
+
+    def __init__(self, path, threshold, explain=True, parameters=True,
+                 max_bytes=SLOW_QUERY_MAX_BYTES,
+                 backup_count=SLOW_QUERY_BACKUP_COUNT):
+        self.threshold = threshold
+        self.explain = explain
+        self.parameters = parameters
+        self.logger = logging.getLogger(f"{__name__}.slow_queries.{path}")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = RotatingFileHandler(path,
+                                           maxBytes=max_bytes,
+                                           backupCount=backup_count,
+                                           encoding='utf-8',
+                                           delay=True)
+        self.handler.setFormatter(logging.Formatter("%(message)s"))
+        self.logger.addHandler(self.handler)
+
+    def attach(self, engine):
+        event.listen(engine, 'before_cursor_execute', self.before_execute)
+        event.listen(engine, 'after_cursor_execute', self.after_execute)
+        event.listen(engine, 'handle_error', self.handle_error)
+
+    def detach(self, engine):
+        event.remove(engine, 'before_cursor_execute', self.before_execute)
+        event.remove(engine, 'after_cursor_execute', self.after_execute)
+        event.remove(engine, 'handle_error', self.handle_error)
+        self.logger.removeHandler(self.handler)
+        self.handler.close()
+
+    def before_execute(self, conn, cursor, statement, parameters, context,
+                       executemany):
+        conn.info.setdefault('slow_query_start', []).append(
+            time.perf_counter())
+
+    def after_execute(self, conn, cursor, statement, parameters, context,
+                      executemany):
+        start = conn.info['slow_query_start'].pop()
+        duration = (time.perf_counter() - start) * 1000
+        if duration < self.threshold:
+            return
+
+        record = {'time': datetime.now().isoformat(),
+                  'duration_ms': round(duration, 3),
+                  'function': calling_dal_function(),
+                  'statement': statement,
+                  'executemany': executemany}
+        if self.parameters:
+            record['parameters'] = parameters
+        # the rows of a streamed statement are still pending on the cursor,
+        # a new command on the connection would discard them (pymysql)
+        streamed = (context is not None
+                    and context.execution_options.get('stream_results'))
+        if (self.explain and not executemany and not streamed
+                and statement.lstrip().upper().startswith('SELECT')):
+            try:
+                record['plan'] = self.explain_plan(conn, statement,
+                                                   parameters)
+            except Exception as e:
+                record['plan_error'] = str(e)
+        self.logger.info(json.dumps(record, default=str))
+
+    def handle_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get(
+                'slow_query_start'):
+            connection.info['slow_query_start'].pop()
+
+    def explain_plan(self, conn, statement, parameters):
+        """ run the EXPLAIN of a statement on a raw cursor of the same
+        connection (the statement is not run again and no event is sent)
+        returns list of the plan rows
+        """
+        if conn.dialect.name == 'sqlite':
+            explain = f"EXPLAIN QUERY PLAN {statement}"
+        else:
+            explain = f"EXPLAIN {statement}"
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(explain, parameters)
+            return [list(row) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+
+slow_query_recorder = None
+if SLOW_QUERY_THRESHOLD > 0:
+    slow_query_recorder = SlowQueryRecorder(SLOW_QUERY_PATH,
+                                            SLOW_QUERY_THRESHOLD,
+                                            SLOW_QUERY_EXPLAIN,
+                                            SLOW_QUERY_PARAMETERS)
+    slow_query_recorder.attach(engine)
 
 session_maker = sessionmaker(bind=engine)
 
+
+class UnitOfWorkSession(Session):
+    """ session shared by the DAL functions called during a unit of work,
+    the objects are detached at the end of each write transaction,
+    they keep their loaded values and the next reads get fresh rows
+    (the UPDATE and DELETE statements do not synchronize the session)
+    """
+
+    def commit(self):
+        super().commit()
+        self.expunge_all()
+
+    def rollback(self):
+        # detached before the rollback would expire them
+        self.expunge_all()
+        super().rollback()
+
+    def release(self):
+        """ end the read transaction, the loaded objects stay
+        in the identity map
+        """
+        super().commit()
+
+
+# session of the unit of work of the running controller action
+current_session = ContextVar('current_session', default=None)
+
+
+def open_unit_of_work_session():
+    """ session of a unit of work, bound to its own connection """
+    return UnitOfWorkSession(bind=engine.connect(), expire_on_commit=False)
+
+
+def close_unit_of_work_session(session):
+    """ close the session of a unit of work and give back its connection
+    """
+    connection = session.bind
+    session.close()
+    connection.close()
+
+
+@contextmanager
+def unit_of_work():
+    """ share one session and one connection between the DAL functions
+    called in the block, nested blocks use the outer unit of work
+    yields the session
+    """
+    session = current_session.get()
+    if session is not None:
+        yield session
+        return
+
+    token = current_session.set(open_unit_of_work_session())
+    try:
+        yield current_session.get()
+    finally:
+        close_unit_of_work_session(current_session.get())
+        current_session.reset(token)
+
+
+@contextmanager
+def unit_of_work_paused():
+    """ give back the connection of the running unit of work and detach
+    its objects during the block (waiting for a user input), the DAL
+    functions called after the block share a new session and connection
+    """
+    session = current_session.get()
+    if session is None:
+        yield
+        return
+
+    close_unit_of_work_session(session)
+    current_session.set(None)
+    try:
+        yield
+    finally:
+        current_session.set(open_unit_of_work_session())
+
+
+@contextmanager
+def get_session():
+    """ session of a DAL function, the session of the running unit of work
+    or a new session closed at the end of the block
+    the transaction of the unit of work is rolled back on error and
+    ended at the end of the block, the connection stays checked out
+    until the end of the unit of work
+    """
+    session = current_session.get()
+    if session is None:
+        with session_maker() as session:
+            yield session
+        return
+
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    session.release()
+
+
 DB_RECORD_NOT_FOUND = "Record not Found"
 DB_TEAM_NOT_EMPTY = "The team is not empty"
+DB_DUPLICATE_USER = "Email or employee number already used"
+DB_MISSING_USER_FIELD = "Missing user data : "
+DB_TEAM_NOT_FOUND = "The team does not exist"
@@ -1,25 +1,100 @@
 # Epic events CRM launching script
+#
+# python epicevents.py                    interactive CRM
+# python epicevents.py import clients clients.csv
+#                                         import of a csv or jsonl file
+# python epicevents.py export unpaid-contracts contracts.csv
+#                                         export of a list to a file
+import argparse
 from dotenv import load_dotenv
 import os
 import sentry_sdk
 
 from controllers.general_cont import MainController
+from controllers.export_functions import (export_list,
+                                          print_export_report,
+                                          EXPORT_LISTS,
+                                          USER_LISTS,
+                                          )
+from controllers.import_functions import (import_file,
+                                          print_import_report,
+                                          IMPORT_ENTITIES,
+                                          IMPORT_FORMATS,
+                                          )
+from models.dal_metrics import dal_metrics
+from tracing import sentry_options
 from views.general_view import Screen
 from authentication.auth_models import AuthenticationManager
 
 
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Epic Events CRM")
+    subparsers = parser.add_subparsers(dest='command')
+
+    import_parser = subparsers.add_parser(
+        'import', help="import clients, contracts or events from a file")
+    import_parser.add_argument('entity', choices=IMPORT_ENTITIES)
+    import_parser.add_argument('path', help="csv or jsonl file")
+    import_parser.add_argument('--format', choices=IMPORT_FORMATS,
+                               help="file format, from the extension"
+                               " by default")
+    import_parser.add_argument('--chunk-size', type=int,
+                               help="rows validated and written together"
+                               " (BULK_BATCH_SIZE by default)")
+    import_parser.add_argument('--upsert', action='store_true',
+                               help="update the rows already in database"
+                               " (same email for clients, same id for"
+                               " contracts and events)")
+
+    export_parser = subparsers.add_parser(
+        'export', help="export a list of clients, contracts or events")
+    export_parser.add_argument('list', choices=list(EXPORT_LISTS))
+    export_parser.add_argument('path', help="csv or jsonl file")
+    export_parser.add_argument('--format', choices=IMPORT_FORMATS,
+                               help="file format, from the extension"
+                               " by default")
+    export_parser.add_argument('--user-id', type=int,
+                               help="user of the supported-events,"
+                               " owned-contracts and owned-events lists")
+
+    arguments = parser.parse_args()
+    if (arguments.command == 'export'
+            and EXPORT_LISTS[arguments.list] in USER_LISTS
+            and arguments.user_id is None):
+        parser.error(f"--user-id is required for the {arguments.list} list")
+    return arguments
+
+
 def main():
 
+    arguments = parse_arguments()
+
     load_dotenv()
 
     sentry_dsn = os.getenv("SENTRY_DSN")
     
-    sentry_sdk.init(
-        dsn=sentry_dsn,
-        # Set traces_sample_rate to 1.0 to capture 100%
-        # of transactions for performance monitoring.
-        traces_sample_rate=1.0,
-    )
+    # the screen actions are sampled by trace_sampler (see tracing.py)
+    sentry_sdk.init(**sentry_options(sentry_dsn))
+
+    if arguments.command == 'import':
+        result = import_file(arguments.entity,
+                             arguments.path,
+                             row_format=arguments.format,
+                             chunk_size=arguments.chunk_size,
+                             upsert=arguments.upsert)
+        print_import_report(result)
+        dal_metrics.periodic_dump(force=True)
+        return
+
+    if arguments.command == 'export':
+        result = export_list(EXPORT_LISTS[arguments.list],
+                             arguments.path,
+                             row_format=arguments.format,
+                             user_id=arguments.user_id)
+        print_export_report(result)
+        dal_metrics.periodic_dump(force=True)
+        return
+
     authentication = AuthenticationManager()
     screen = Screen(authentication)
 
@@ -25,9 +25,18 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 from models.user_models import User, Team, Role
-from models.client_models import Client, Event, Contract
+from models.client_models import Client, Event, Contract, is_index_created
 target_metadata = Base.metadata
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    """ skip the indexes of the models which are not created on the
+    dialect of the database (ddl_if), autogenerate would add them
+    """
+    if type_ == 'index' and not reflected:
+        return is_index_created(name, context.get_context().dialect)
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -85,6 +94,7 @@ def run_migrations_online() -> None:
             connection=connection, target_metadata=target_metadata,
             compare_type=True,
             compare_server_default=True,
+            include_object=include_object,
         )
 
         with context.begin_transaction():
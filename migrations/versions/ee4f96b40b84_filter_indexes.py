@@ -0,0 +1,90 @@
+"""filter indexes
+
+Revision ID: ee4f96b40b84
+Revises: 348689f3d004
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ee4f96b40b84'
+down_revision: Union[str, None] = '348689f3d004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# dialects able to create an index on a part of the rows of a table
+PARTIAL_INDEX_DIALECTS = ['postgresql', 'sqlite']
+
+UNSIGNED_WHERE = sa.text("status = 'non signé'")
+UNPAID_WHERE = sa.text("amount_unpaid != 0")
+
+# indexes of the foreign key columns : name, table, columns,
+# the first column is the foreign key
+FOREIGN_KEY_INDEXES = [
+    ('ix_clients_commercial_contact_id', 'clients',
+     ['commercial_contact_id']),
+    ('ix_contracts_client_id', 'contracts', ['client_id']),
+    ('ix_events_contract_id', 'events', ['contract_id']),
+    # supported and unassigned events, sorted on id for the pagination
+    ('ix_events_support_contact_id', 'events', ['support_contact_id', 'id']),
+]
+
+
+def index_names(table):
+    """ names of the indexes of a table, none when the migration is
+    written as a sql script (the database is not read)
+    """
+    if op.get_context().as_sql:
+        return []
+    return [index['name']
+            for index in sa.inspect(op.get_bind()).get_indexes(table)]
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+
+    for name, table, columns in FOREIGN_KEY_INDEXES:
+        op.create_index(name, table, columns)
+        # mysql drops the index it created for the foreign key when
+        # another index can be used, not the one of a previous downgrade
+        # (named after the column, as the implicit one)
+        if dialect == 'mysql' and columns[0] in index_names(table):
+            op.drop_index(columns[0], table_name=table)
+
+    # unsigned and unpaid contracts
+    if dialect in PARTIAL_INDEX_DIALECTS:
+        op.create_index('ix_contracts_unsigned', 'contracts', ['id'],
+                        postgresql_where=UNSIGNED_WHERE,
+                        sqlite_where=UNSIGNED_WHERE)
+        op.create_index('ix_contracts_unpaid', 'contracts', ['id'],
+                        postgresql_where=UNPAID_WHERE,
+                        sqlite_where=UNPAID_WHERE)
+    else:
+        op.create_index('ix_contracts_status', 'contracts',
+                        ['status', 'id'])
+        op.create_index('ix_contracts_amount_unpaid', 'contracts',
+                        ['amount_unpaid'])
+
+
+def downgrade() -> None:
+    dialect = op.get_context().dialect.name
+
+    if dialect in PARTIAL_INDEX_DIALECTS:
+        op.drop_index('ix_contracts_unpaid', table_name='contracts')
+        op.drop_index('ix_contracts_unsigned', table_name='contracts')
+    else:
+        op.drop_index('ix_contracts_amount_unpaid', table_name='contracts')
+        op.drop_index('ix_contracts_status', table_name='contracts')
+
+    for name, table, columns in reversed(FOREIGN_KEY_INDEXES):
+        # mysql needs an index on each foreign key column, the index of
+        # the foreign key (named after the column) is created again
+        # before the one which took its place is dropped
+        if dialect == 'mysql':
+            op.create_index(columns[0], table, [columns[0]])
+        op.drop_index(name, table_name=table)
@@ -1,14 +1,47 @@
 # define Data Layer Access functions for the Client class
 # created in the client_models package
 
-from sqlalchemy import exc
+from collections import namedtuple
+
+from sqlalchemy import exc, select
 from sqlalchemy.orm import subqueryload
 
-from db import (session_maker,
+from db import (get_session,
                 DB_RECORD_NOT_FOUND,
                 )
-from models.client_models import Client
-from models.contract_dal_functions import delete_contract
+from models.dal_tools import (bulk_insert,
+                              cached_by_id,
+                              entity_cache,
+                              ownership_index,
+                              paginate,
+                              paginate_rows,
+                              stream_rows,
+                              update_by_id,
+                              )
+from models.client_models import Client, Contract, Event
+from models.dal_metrics import instrument_module
+
+# columns modified by update_client, active is modified by
+# activate_client / deactivate_client
+CLIENT_UPDATE_FIELDS = ['first_name',
+                        'last_name',
+                        'email',
+                        'telephone',
+                        'enterprise',
+                        'commercial_contact_id',
+                        ]
+# columns given to create_client and to the bulk functions
+CLIENT_CREATE_FIELDS = CLIENT_UPDATE_FIELDS + ['active']
+# columns of the exported client lists
+CLIENT_EXPORT_FIELDS = ['id'] + CLIENT_CREATE_FIELDS
+# row of the client list screen, with the displayed columns only
+ClientRow = namedtuple('ClientRow',
+                       ['id', 'first_name', 'last_name', 'enterprise'])
+
+
+def owned_clients(user_id):
+    """ filter expression of the clients followed by a commercial user """
+    return Client.commercial_contact_id == user_id
 
 
 def create_client(client_dict):
@@ -33,7 +66,7 @@ def create_client(client_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             session.add(client)
             session.commit()
             result['client_id'] = client.id
@@ -45,6 +78,54 @@ def create_client(client_dict):
     return result
 
 
+def bulk_create_clients(client_dicts, batch_size=None):
+    """ create clients in database by batches of batch_size rows,
+    one INSERT statement and one transaction by batch
+    parameters :
+    client_dicts : iterable of dictionnaries with data for clients to be
+                 created, same keys as for create_client
+    batch_size : number of clients by batch, BULK_BATCH_SIZE by default
+    returns result dictionnary with keys :
+    'status': ok or ko (ko if a batch failed)
+    'row_count': number of clients created
+    'batches': one dictionnary per batch with keys 'status',
+               'row_count' and 'error' (if status == ko)
+    'error': error details of the first failed batch (if status == ko)
+    """
+    rows = ({field: client_dict[field] for field in CLIENT_CREATE_FIELDS}
+            for client_dict in client_dicts)
+
+    result = bulk_insert(Client, rows, batch_size)
+    entity_cache.invalidate_model(Client)
+
+    return result
+
+
+def bulk_upsert_clients(client_dicts, batch_size=None):
+    """ create or update clients in database by batches of batch_size rows,
+    the clients whose email is already in database are updated
+    parameters :
+    client_dicts : iterable of dictionnaries with data for clients,
+                 same keys as for create_client
+    batch_size : number of clients by batch, BULK_BATCH_SIZE by default
+    returns result dictionnary, same keys as for bulk_create_clients
+    """
+    rows = ({field: client_dict[field] for field in CLIENT_CREATE_FIELDS}
+            for client_dict in client_dicts)
+    update_columns = [field for field in CLIENT_CREATE_FIELDS
+                      if field != 'email']
+
+    result = bulk_insert(Client,
+                         rows,
+                         batch_size,
+                         key_columns=['email'],
+                         update_columns=update_columns)
+    entity_cache.invalidate_model(Client)
+    ownership_index.invalidate()
+
+    return result
+
+
 def update_client(client_dict):
     """ update client in database
     parameters :
@@ -60,33 +141,23 @@ def update_client(client_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-
-            client = (session.query(Client)
-                      .filter(Client.id == client_dict['id'])
-                      .first())
+        with get_session() as session:
 
-            if client is not None:
-                if 'first_name' in client_dict:
-                    client.first_name = client_dict['first_name']
-                if 'last_name' in client_dict:
-                    client.last_name = client_dict['last_name']
-                if 'email' in client_dict:
-                    client.email = client_dict['email']
-                if 'telephone' in client_dict:
-                    client.telephone = client_dict['telephone']
-                if 'enterprise' in client_dict:
-                    client.enterprise = client_dict['enterprise']
-                if 'commercial_contact_id' in client_dict:
-                    client.commercial_contact_id = client_dict[
-                        'commercial_contact_id']
-
-                session.commit()
+            values = {field: client_dict[field]
+                      for field in CLIENT_UPDATE_FIELDS
+                      if field in client_dict}
+            rows_affected = update_by_id(session, Client, client_dict['id'],
+                                         values)
 
-                result['client_id'] = client.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Client, client_dict['id'])
+                if 'commercial_contact_id' in values:
+                    ownership_index.invalidate()
+                result['client_id'] = client_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -107,18 +178,19 @@ def deactivate_client(client_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            client = (session.query(Client)
-                      .filter(Client.id == client_id)
-                      .first())
-            if client is not None:
-                client.deactivate()
-                session.commit()
-                result['client_id'] = client.id
-            else:
+            values = {'active': False}
+            rows_affected = update_by_id(session, Client, client_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Client, client_id)
+                result['client_id'] = client_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -138,18 +210,19 @@ def activate_client(client_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            client = (session.query(Client)
-                      .filter(Client.id == client_id)
-                      .first())
-            if client is not None:
-                client.activate()
-                session.commit()
-                result['client_id'] = client.id
-            else:
+            values = {'active': True}
+            rows_affected = update_by_id(session, Client, client_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Client, client_id)
+                result['client_id'] = client_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -157,6 +230,7 @@ def activate_client(client_id):
     return result
 
 
+@cached_by_id(Client, 'client')
 def get_client_by_id(client_id):
     """ retrieve a client in database by id
     parameters :
@@ -169,7 +243,7 @@ def get_client_by_id(client_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             client = (session.query(Client)
                       .options(subqueryload(Client.contracts))
                       .filter(Client.id == client_id)
@@ -186,23 +260,89 @@ def get_client_by_id(client_id):
     return result
 
 
-def get_all_clients():
-    """ retrieve all clients in database
+def get_clients_by_ids(client_ids):
+    """ retrieve clients in database from a list of ids with one query
     parameters :
-
+    client_ids : list of client ids
     returns result dictionnary with keys :
     'status': ok or ko
-    'clients': clients objects (if status == ok)
+    'clients': dictionnary of client objects keyed by id (if status == ok),
+              ids not found in database are not in the dictionnary
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
+    ids = set(client_ids)
+    if not ids:
+        result['clients'] = {}
+        return result
+
     try:
-        with session_maker() as session:
+        with get_session() as session:
             clients = (session.query(Client)
+                       .options(subqueryload(Client.contracts))
+                       .filter(Client.id.in_(ids))
                        .all())
+            result['clients'] = {client.id: client for client in clients}
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def get_existing_client_ids(client_ids):
+    """ ids of the clients found in database from a list of ids,
+    with one query reading the ids only (existence check of the imports)
+    parameters :
+    client_ids : list of client ids
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'client_ids': set of the ids found in database (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    ids = set(client_ids)
+    if not ids:
+        result['client_ids'] = set()
+        return result
+
+    try:
+        with get_session() as session:
+            result['client_ids'] = set(session.scalars(
+                select(Client.id).where(Client.id.in_(ids))))
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def get_all_clients(page_size=None, after_id=None, before_id=None):
+    """ retrieve all clients in database
+    parameters :
+    page_size : number of clients in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'clients': clients objects (if status == ok)
+    'page': page cursor data (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            query = session.query(Client)
+            clients, page = paginate(query,
+                                     Client.id,
+                                     page_size,
+                                     after_id,
+                                     before_id)
             if clients is not None:
                 result['clients'] = clients
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -213,47 +353,95 @@ def get_all_clients():
     return result
 
 
+def get_client_rows(page_size=None, after_id=None, before_id=None):
+    """ retrieve a page of the client list screen as ClientRow tuples,
+    only the displayed columns are read
+    parameters :
+    page_size : number of clients in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'clients': ClientRow tuples (if status == ok)
+    'page': page cursor data (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            result['clients'], result['page'] = paginate_rows(session,
+                                                              Client,
+                                                              ClientRow,
+                                                              None,
+                                                              page_size,
+                                                              after_id,
+                                                              before_id)
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def stream_clients(batch_size=None):
+    """ read all the clients of the database as a stream of rows,
+    for exports of any size (see dal_tools.stream_rows)
+    parameters :
+    batch_size : number of rows by fetch, BULK_BATCH_SIZE by default
+    yields rows with the CLIENT_EXPORT_FIELDS columns, sorted on id
+    """
+    return stream_rows(Client, CLIENT_EXPORT_FIELDS, None, batch_size)
+
+
 def delete_client(client_id):
     """ delete client in database and all linked contract
+    contracts and events are deleted with one statement each,
+    in the same transaction : the ON DELETE CASCADE of the foreign keys
+    is not run by sqlite (foreign_keys pragma off) and the counts of the
+    deleted rows are returned
     parameters :
     client_id
     returns :
     'status': ok or ko
     'client_id': id from deleted client (if status == ok)
+    'contracts_deleted': number of contracts deleted (if status == ok)
+    'events_deleted': number of events deleted (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            client = (session.query(Client)
-                      .filter(Client.id == client_id)
-                      .first())
-            if client:
-                if client.contracts:
-                    for contract in client.contracts:
-                        result_del_co = delete_contract(contract.id)
-                        if result_del_co['status'] == 'ko':
-                            result['status'] = 'ko'
-                            result['error'] = result_del_co['error']
-                            return result
-
-                rows_affected = (session.query(Client)
-                                 .filter(Client.id == client_id)
-                                 .delete())
-                session.commit()
-
-                if rows_affected == 0:
-                    result['status'] = "ko"
-                    result['error'] = DB_RECORD_NOT_FOUND
-                else:
-                    result['client_id'] = client_id
-            else:
+        with get_session() as session:
+            contract_ids = (select(Contract.id)
+                            .where(Contract.client_id == client_id))
+            events_deleted = (session.query(Event)
+                              .filter(Event.contract_id.in_(contract_ids))
+                              .delete(synchronize_session=False))
+            contracts_deleted = (session.query(Contract)
+                                 .filter(Contract.client_id == client_id)
+                                 .delete(synchronize_session=False))
+            rows_affected = (session.query(Client)
+                             .filter(Client.id == client_id)
+                             .delete(synchronize_session=False))
+
+            if rows_affected == 0:
+                session.rollback()
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Client, client_id)
+                entity_cache.invalidate_model(Contract, Event)
+                ownership_index.invalidate()
+                result['client_id'] = client_id
+                result['contracts_deleted'] = contracts_deleted
+                result['events_deleted'] = events_deleted
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
 
     return result
+
+
+instrument_module(__name__)
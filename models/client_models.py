@@ -1,6 +1,7 @@
 from sqlalchemy import (Column,
                         ForeignKey,
                         CheckConstraint,
+                        Index,
                         Integer,
                         String,
                         Boolean,
@@ -15,6 +16,9 @@ from db import Base
 
 CONTRACT_STATUS = ['signé', 'non signé']
 
+# dialects able to create an index on a part of the rows of a table
+PARTIAL_INDEX_DIALECTS = ['postgresql', 'sqlite']
+
 
 class Client(Base):
     __tablename__ = 'clients'
@@ -29,7 +33,8 @@ class Client(Base):
     last_update = Column(DateTime, onupdate=datetime.now)
     commercial_contact_id = Column(Integer,
                                    ForeignKey('users.id'),
-                                   nullable=False)
+                                   nullable=False,
+                                   index=True)
     active = Column(Boolean, default=True, nullable=False)
     contracts = relationship('Contract',
                              cascade='save-update, merge, delete',
@@ -53,7 +58,8 @@ class Contract(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     client_id = Column(Integer,
                        ForeignKey('clients.id', ondelete='CASCADE'),
-                       nullable=False)
+                       nullable=False,
+                       index=True)
     total_amount = Column(Float, nullable=False)
     amount_unpaid = Column(Float, nullable=False)
     creation_date = Column(DateTime, nullable=False, default=datetime.now)
@@ -79,7 +85,8 @@ class Event(Base):
     title = Column(String(100), nullable=False)
     contract_id = Column(Integer,
                          ForeignKey('contracts.id', ondelete='CASCADE'),
-                         nullable=False)
+                         nullable=False,
+                         index=True)
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=False)
     support_contact_id = Column(Integer, ForeignKey('users.id'))
@@ -95,3 +102,55 @@ class Event(Base):
 
     def activate(self):
         self.active = True
+
+
+def partial_index_supported(ddl, target, bind, dialect, **kwargs):
+    return dialect.name in PARTIAL_INDEX_DIALECTS
+
+
+def partial_index_unsupported(ddl, target, bind, dialect, **kwargs):
+    return dialect.name not in PARTIAL_INDEX_DIALECTS
+
+
+# indexes of the list filters, sorted on id for the pagination
+# supported and unassigned events
+Index('ix_events_support_contact_id', Event.support_contact_id, Event.id)
+
+# indexes created by ddl_if on some dialects only, with their condition,
+# the alembic autogenerate ignores ddl_if and checks them (migrations/env.py)
+CONDITIONAL_INDEXES = {}
+
+
+def conditional_index(index, condition):
+    """ create the index only when condition(ddl, target, bind, dialect)
+    is True
+    """
+    CONDITIONAL_INDEXES[index.name] = condition
+    return index.ddl_if(callable_=condition)
+
+
+def is_index_created(name, dialect):
+    """ True if the index of the models exists on the dialect """
+    condition = CONDITIONAL_INDEXES.get(name)
+    return condition is None or condition(None, None, None, dialect)
+
+
+# unsigned and unpaid contracts : partial indexes of the matching rows,
+# plain indexes on the filtered column otherwise
+conditional_index(Index('ix_contracts_unsigned',
+                        Contract.id,
+                        postgresql_where=Contract.status == CONTRACT_STATUS[1],
+                        sqlite_where=Contract.status == CONTRACT_STATUS[1]),
+                  partial_index_supported)
+conditional_index(Index('ix_contracts_unpaid',
+                        Contract.id,
+                        postgresql_where=Contract.amount_unpaid != 0,
+                        sqlite_where=Contract.amount_unpaid != 0),
+                  partial_index_supported)
+conditional_index(Index('ix_contracts_status',
+                        Contract.status,
+                        Contract.id),
+                  partial_index_unsupported)
+conditional_index(Index('ix_contracts_amount_unpaid',
+                        Contract.amount_unpaid),
+                  partial_index_unsupported)
@@ -1,14 +1,55 @@
 # define Data Layer Access functions for the Contract class
 # created in the client_models package
 
-from sqlalchemy import exc
+from collections import namedtuple
+
+from sqlalchemy import exc, select
 from sqlalchemy.orm import subqueryload
 
-from db import (session_maker,
+from db import (get_session,
                 DB_RECORD_NOT_FOUND,
                 )
-from models.client_models import Contract, CONTRACT_STATUS
-from models.event_dal_functions import delete_event
+from models.dal_tools import (bulk_insert,
+                              cached_by_id,
+                              entity_cache,
+                              ownership_index,
+                              paginate,
+                              paginate_rows,
+                              stream_rows,
+                              update_by_id,
+                              )
+from models.client_models import Client, Contract, Event, CONTRACT_STATUS
+from models.dal_metrics import instrument_module
+
+# columns modified by update_contract, active is modified by
+# activate_contract / deactivate_contract
+CONTRACT_UPDATE_FIELDS = ['client_id',
+                          'total_amount',
+                          'amount_unpaid',
+                          'status',
+                          ]
+# columns given to create_contract and to the bulk functions
+CONTRACT_CREATE_FIELDS = CONTRACT_UPDATE_FIELDS + ['active']
+# columns of the exported contract lists
+CONTRACT_EXPORT_FIELDS = ['id'] + CONTRACT_CREATE_FIELDS
+# row of the contract list screens, with the displayed columns only
+ContractRow = namedtuple('ContractRow',
+                         ['id', 'client_id', 'total_amount',
+                          'amount_unpaid', 'status'])
+
+# filters of the contract lists, shared by the list screens and the exports
+UNSIGNED_CONTRACTS = Contract.status == CONTRACT_STATUS[1]
+UNPAID_CONTRACTS = Contract.amount_unpaid != 0
+
+
+def owned_contracts(user_id):
+    """ filter expression of the contracts of the clients followed by
+    a commercial user, the client ids are selected with the index
+    on clients.commercial_contact_id and the contracts with the index
+    on contracts.client_id
+    """
+    return Contract.client_id.in_(
+        select(Client.id).where(Client.commercial_contact_id == user_id))
 
 
 def create_contract(contract_dict):
@@ -31,9 +72,10 @@ def create_contract(contract_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             session.add(contract)
             session.commit()
+            entity_cache.invalidate_entity(Client, contract_dict['client_id'])
             result['contract_id'] = contract.id
 
     except exc.SQLAlchemyError as e:
@@ -43,6 +85,55 @@ def create_contract(contract_dict):
     return result
 
 
+def bulk_create_contracts(contract_dicts, batch_size=None):
+    """ create contracts in database by batches of batch_size rows,
+    one INSERT statement and one transaction by batch
+    parameters :
+    contract_dicts : iterable of dictionnaries with data for contracts to be
+                 created, same keys as for create_contract
+    batch_size : number of contracts by batch, BULK_BATCH_SIZE by default
+    returns result dictionnary with keys :
+    'status': ok or ko (ko if a batch failed)
+    'row_count': number of contracts created
+    'batches': one dictionnary per batch with keys 'status',
+               'row_count' and 'error' (if status == ko)
+    'error': error details of the first failed batch (if status == ko)
+    """
+    rows = ({field: contract_dict[field] for field in CONTRACT_CREATE_FIELDS}
+            for contract_dict in contract_dicts)
+
+    result = bulk_insert(Contract, rows, batch_size)
+    entity_cache.invalidate_model(Contract, Client)
+
+    return result
+
+
+def bulk_upsert_contracts(contract_dicts, batch_size=None):
+    """ create or update contracts in database by batches of batch_size rows,
+    the contracts whose id is already in database are updated
+    parameters :
+    contract_dicts : iterable of dictionnaries with data for contracts,
+                 same keys as for create_contract
+                 and the 'id' key (the row is created with this id
+                 if it does not exist)
+    batch_size : number of contracts by batch, BULK_BATCH_SIZE by default
+    returns result dictionnary, same keys as for bulk_create_contracts
+    """
+    fields = ['id'] + CONTRACT_CREATE_FIELDS
+    rows = ({field: contract_dict[field] for field in fields}
+            for contract_dict in contract_dicts)
+
+    result = bulk_insert(Contract,
+                         rows,
+                         batch_size,
+                         key_columns=['id'],
+                         update_columns=CONTRACT_CREATE_FIELDS)
+    entity_cache.invalidate_model(Contract, Client)
+    ownership_index.invalidate()
+
+    return result
+
+
 def update_contract(contract_dict):
     """ update contract in database
     parameters :
@@ -58,28 +149,26 @@ def update_contract(contract_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-
-            contract = (session.query(Contract)
-                        .filter(Contract.id == contract_dict['id'])
-                        .first())
+        with get_session() as session:
 
-            if contract is not None:
-                if 'client_id' in contract_dict:
-                    contract.client_id = contract_dict['client_id']
-                if 'total_amount' in contract_dict:
-                    contract.total_amount = contract_dict['total_amount']
-                if 'amount_unpaid' in contract_dict:
-                    contract.amount_unpaid = contract_dict['amount_unpaid']
-                if 'status' in contract_dict:
-                    contract.status = contract_dict['status']
-
-                session.commit()
+            values = {field: contract_dict[field]
+                      for field in CONTRACT_UPDATE_FIELDS
+                      if field in contract_dict}
+            rows_affected = update_by_id(session,
+                                         Contract,
+                                         contract_dict['id'],
+                                         values)
 
-                result['contract_id'] = contract.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Contract, contract_dict['id'])
+                entity_cache.invalidate_model(Client)
+                if 'client_id' in values:
+                    ownership_index.invalidate()
+                result['contract_id'] = contract_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -100,18 +189,21 @@ def deactivate_contract(contract_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            contract = (session.query(Contract)
-                        .filter(Contract.id == contract_id)
-                        .first())
-            if contract is not None:
-                contract.deactivate()
-                session.commit()
-                result['contract_id'] = contract.id
-            else:
+            values = {'active': False}
+            rows_affected = update_by_id(session, Contract, contract_id,
+                                         values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Contract, contract_id)
+                entity_cache.invalidate_model(Client)
+                result['contract_id'] = contract_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -131,18 +223,21 @@ def activate_contract(contract_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            contract = (session.query(Contract)
-                        .filter(Contract.id == contract_id)
-                        .first())
-            if contract is not None:
-                contract.activate()
-                session.commit()
-                result['contract_id'] = contract.id
-            else:
+            values = {'active': True}
+            rows_affected = update_by_id(session, Contract, contract_id,
+                                         values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Contract, contract_id)
+                entity_cache.invalidate_model(Client)
+                result['contract_id'] = contract_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -150,6 +245,7 @@ def activate_contract(contract_id):
     return result
 
 
+@cached_by_id(Contract, 'contract')
 def get_contract_by_id(contract_id):
     """ retrieve a contract in database by id
     parameters :
@@ -162,7 +258,7 @@ def get_contract_by_id(contract_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             contract = (session.query(Contract)
                         .options(subqueryload(Contract.events))
                         .filter(Contract.id == contract_id)
@@ -179,23 +275,90 @@ def get_contract_by_id(contract_id):
     return result
 
 
-def get_all_contracts():
-    """ retrieve all contracts in database
+def get_contracts_by_ids(contract_ids):
+    """ retrieve contracts in database from a list of ids with one query
     parameters :
-
+    contract_ids : list of contract ids
     returns result dictionnary with keys :
     'status': ok or ko
-    'contracts': contracts objects (if status == ok)
+    'contracts': dictionnary of contract objects keyed by id (if status == ok),
+              ids not found in database are not in the dictionnary
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
+    ids = set(contract_ids)
+    if not ids:
+        result['contracts'] = {}
+        return result
+
     try:
-        with session_maker() as session:
+        with get_session() as session:
             contracts = (session.query(Contract)
+                         .options(subqueryload(Contract.events))
+                         .filter(Contract.id.in_(ids))
                          .all())
+            result['contracts'] = {contract.id: contract
+                                   for contract in contracts}
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def get_existing_contract_ids(contract_ids):
+    """ ids of the contracts found in database from a list of ids,
+    with one query reading the ids only (existence check of the imports)
+    parameters :
+    contract_ids : list of contract ids
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'contract_ids': set of the ids found in database (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    ids = set(contract_ids)
+    if not ids:
+        result['contract_ids'] = set()
+        return result
+
+    try:
+        with get_session() as session:
+            result['contract_ids'] = set(session.scalars(
+                select(Contract.id).where(Contract.id.in_(ids))))
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def get_all_contracts(page_size=None, after_id=None, before_id=None):
+    """ retrieve all contracts in database
+    parameters :
+    page_size : number of contracts in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'contracts': contracts objects (if status == ok)
+    'page': page cursor data (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            query = session.query(Contract)
+            contracts, page = paginate(query,
+                                       Contract.id,
+                                       page_size,
+                                       after_id,
+                                       before_id)
             if contracts is not None:
                 result['contracts'] = contracts
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -206,24 +369,30 @@ def get_all_contracts():
     return result
 
 
-def get_unsigned_contracts():
+def get_unsigned_contracts(page_size=None, after_id=None, before_id=None):
     """ retrieve all contracts in database wtih status unsigned
     parameters :
-
+    page_size : number of contracts in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
     returns result dictionnary with keys :
     'status': ok or ko
     'contracts': contracts objects (if status == ok)
+    'page': page cursor data (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            contracts = (session.query(Contract)
-                         .filter(Contract.status == CONTRACT_STATUS[1])
-                         .all())
+        with get_session() as session:
+            query = session.query(Contract).filter(UNSIGNED_CONTRACTS)
+            contracts, page = paginate(query,
+                                       Contract.id,
+                                       page_size,
+                                       after_id,
+                                       before_id)
             if contracts is not None:
                 result['contracts'] = contracts
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -234,24 +403,30 @@ def get_unsigned_contracts():
     return result
 
 
-def get_unpaid_contracts():
+def get_unpaid_contracts(page_size=None, after_id=None, before_id=None):
     """ retrieve all contracts in database with unpaid_amound != 0
     parameters :
-
+    page_size : number of contracts in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
     returns result dictionnary with keys :
     'status': ok or ko
     'contracts': contracts objects (if status == ok)
+    'page': page cursor data (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            contracts = (session.query(Contract)
-                         .filter(Contract.amount_unpaid != 0)
-                         .all())
+        with get_session() as session:
+            query = session.query(Contract).filter(UNPAID_CONTRACTS)
+            contracts, page = paginate(query,
+                                       Contract.id,
+                                       page_size,
+                                       after_id,
+                                       before_id)
             if contracts is not None:
                 result['contracts'] = contracts
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -262,46 +437,121 @@ def get_unpaid_contracts():
     return result
 
 
+def contract_criteria(unsigned=False, unpaid=False, owner_id=None):
+    """ filter expressions of the contract lists
+    parameters :
+    unsigned : True for the unsigned contracts only
+    unpaid : True for the unpaid contracts only
+    owner_id : id of a commercial user, for the contracts of his clients
+    returns list of filter expressions
+    """
+    criteria = []
+    if unsigned:
+        criteria.append(UNSIGNED_CONTRACTS)
+    if unpaid:
+        criteria.append(UNPAID_CONTRACTS)
+    if owner_id is not None:
+        criteria.append(owned_contracts(owner_id))
+    return criteria
+
+
+def get_contract_rows(unsigned=False,
+                      unpaid=False,
+                      owner_id=None,
+                      page_size=None,
+                      after_id=None,
+                      before_id=None):
+    """ retrieve a page of a contract list screen as ContractRow tuples,
+    only the displayed columns are read
+    parameters :
+    unsigned, unpaid, owner_id : filters (see contract_criteria)
+    page_size : number of contracts in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'contracts': ContractRow tuples (if status == ok)
+    'page': page cursor data (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            result['contracts'], result['page'] = paginate_rows(
+                session,
+                Contract,
+                ContractRow,
+                contract_criteria(unsigned, unpaid, owner_id),
+                page_size,
+                after_id,
+                before_id)
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def stream_contracts(unsigned=False,
+                     unpaid=False,
+                     owner_id=None,
+                     batch_size=None):
+    """ read the contracts of the database as a stream of rows,
+    with the filters of get_unsigned_contracts / get_unpaid_contracts /
+    get_contract_rows(owner_id), for exports of any size
+    (see dal_tools.stream_rows)
+    parameters :
+    unsigned : True for the unsigned contracts only
+    unpaid : True for the unpaid contracts only
+    owner_id : id of a commercial user, for the contracts of his clients
+    batch_size : number of rows by fetch, BULK_BATCH_SIZE by default
+    yields rows with the CONTRACT_EXPORT_FIELDS columns, sorted on id
+    """
+    return stream_rows(Contract,
+                       CONTRACT_EXPORT_FIELDS,
+                       contract_criteria(unsigned, unpaid, owner_id),
+                       batch_size)
+
+
 def delete_contract(contract_id):
     """ delete contract in database and all linked event
+    events are deleted with one statement, in the same transaction
+    (see delete_client for the ON DELETE CASCADE of the foreign key)
     parameters :
     contract_id
     returns :
     'status': ok or ko
     'contract_id': id from deleted contract (if status == ok)
+    'events_deleted': number of events deleted (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            contract = (session.query(Contract)
-                        .filter(Contract.id == contract_id)
-                        .first())
-            if contract:
-                if contract.events:
-                    for event in contract.events:
-                        result_del_ev = delete_event(event.id)
-                        if result_del_ev['status'] == 'ko':
-                            result['status'] = 'ko'
-                            result['error'] = result_del_ev['error']
-                            return result
-
-                rows_affected = (session.query(Contract)
-                                 .filter(Contract.id == contract_id)
-                                 .delete())
-                session.commit()
-
-                if rows_affected == 0:
-                    result['status'] = "ko"
-                    result['error'] = DB_RECORD_NOT_FOUND
-                else:
-                    result['contract_id'] = contract_id
-            else:
+        with get_session() as session:
+            events_deleted = (session.query(Event)
+                              .filter(Event.contract_id == contract_id)
+                              .delete(synchronize_session=False))
+            rows_affected = (session.query(Contract)
+                             .filter(Contract.id == contract_id)
+                             .delete(synchronize_session=False))
+
+            if rows_affected == 0:
+                session.rollback()
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Contract, contract_id)
+                entity_cache.invalidate_model(Client, Event)
+                ownership_index.invalidate()
+                result['contract_id'] = contract_id
+                result['events_deleted'] = events_deleted
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
 
     return result
+
+
+instrument_module(__name__)
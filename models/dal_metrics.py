@@ -0,0 +1,368 @@
+# query count and latency instrumentation of the Data Layer Access functions
+#
+# the statements sent to the database are counted by engine listeners and
+# attributed to the DAL function running (innermost one when a DAL function
+# calls another) and to the controller action running (see action())
+
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from functools import wraps
+import inspect
+import json
+import logging
+import os
+import sys
+import time
+
+from sentry_sdk import Hub
+from sqlalchemy import event
+
+from db import engine
+
+load_dotenv()
+
+# true to record the DAL functions and controller actions statistics
+DAL_METRICS = os.getenv("DAL_METRICS", "true") == "true"
+# json file written with the statistics every DAL_METRICS_INTERVAL seconds
+# (0 to disable the dump), a summary is appended to the log file
+DAL_METRICS_PATH = os.getenv("DAL_METRICS_PATH", "dal_metrics.json")
+DAL_METRICS_LOG = os.getenv("DAL_METRICS_LOG", "dal_metrics.log")
+DAL_METRICS_INTERVAL = int(os.getenv("DAL_METRICS_INTERVAL", "0"))
+
+# upper bounds in ms of the latency histogram buckets
+LATENCY_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+# prefixes of the instrumented functions of a DAL module, the other
+# functions build filters or statements and do not read the database
+DAL_FUNCTION_PREFIXES = ('get_', 'create_', 'update_', 'delete_',
+                         'activate_', 'deactivate_', 'bulk_', 'stream_')
+
+# keys of the DAL results which are not rows
+NOT_ROWS_KEYS = ('status', 'error', 'page')
+
+logger = logging.getLogger(__name__)
+
+if DAL_METRICS and DAL_METRICS_INTERVAL:
+    # the console is used by the screens, the summary goes to a file
+    handler = logging.FileHandler(DAL_METRICS_LOG, encoding='utf-8')
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+class Histogram():
+    """ latency histogram with the LATENCY_BUCKETS bounds, in ms """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, duration):
+        """ add a duration in ms """
+        self.counts[bisect_left(LATENCY_BUCKETS, duration)] += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def as_dict(self):
+        """ returns dictionnary with keys :
+        'count': number of durations
+        'total_ms', 'mean_ms', 'max_ms': sum, mean and max of the durations
+        'buckets': number of durations by bucket ('<=1', ... '>5000')
+        """
+        count = sum(self.counts)
+        buckets = {f"<={bound}": number
+                   for bound, number in zip(LATENCY_BUCKETS, self.counts)}
+        buckets[f">{LATENCY_BUCKETS[-1]}"] = self.counts[-1]
+        return {'count': count,
+                'total_ms': round(self.total, 3),
+                'mean_ms': round(self.total / count, 3) if count else 0,
+                'max_ms': round(self.max, 3),
+                'buckets': buckets}
+
+
+class Statistics():
+    """ statistics of a DAL function or of a controller action,
+    latency is the duration of the DAL function calls or the time spent
+    in the database by the action (user input excluded)
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.queries = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.latency = Histogram()
+
+    def record(self, call, duration):
+        """ add a finished call and its duration in ms """
+        self.calls += 1
+        self.errors += call.errors
+        self.queries += call.queries
+        self.rows_read += call.rows_read
+        self.rows_written += call.rows_written
+        self.latency.observe(duration)
+
+    def as_dict(self):
+        return {'calls': self.calls,
+                'errors': self.errors,
+                'queries': self.queries,
+                'rows_read': self.rows_read,
+                'rows_written': self.rows_written,
+                'latency': self.latency.as_dict()}
+
+
+class Call():
+    """ counters of a running DAL function or controller action """
+
+    def __init__(self):
+        self.errors = 0
+        self.queries = 0
+        self.rows_read = 0
+        self.rows_written = 0
+        self.database_time = 0.0
+
+
+class DalMetrics():
+    """ statistics by DAL function ('module.function') and by controller
+    action (screen controller name)
+    """
+
+    def __init__(self):
+        self.functions = {}
+        self.actions = {}
+        self.last_dump = time.monotonic()
+
+    def reset(self):
+        self.functions.clear()
+        self.actions.clear()
+
+    def function_statistics(self, name):
+        return self.functions.setdefault(name, Statistics())
+
+    def action_statistics(self, name):
+        return self.actions.setdefault(name, Statistics())
+
+    def snapshot(self):
+        """ returns dictionnary with keys :
+        'functions': statistics by DAL function
+        'actions': statistics by controller action
+        each one a dictionnary with keys calls, errors, queries,
+        rows_read, rows_written and latency (see Histogram.as_dict)
+        """
+        return {'functions': {name: statistics.as_dict()
+                              for name, statistics
+                              in sorted(self.functions.items())},
+                'actions': {name: statistics.as_dict()
+                            for name, statistics
+                            in sorted(self.actions.items())}}
+
+    def dump(self, path=None):
+        """ write the snapshot in a json file and log a summary,
+        the DAL functions with the most queries first
+        parameters :
+        path : json file, DAL_METRICS_PATH by default
+        """
+        snapshot = self.snapshot()
+        with open(path or DAL_METRICS_PATH, 'w', encoding='utf-8') as file:
+            json.dump(snapshot, file, indent=2)
+        self.last_dump = time.monotonic()
+
+        functions = sorted(snapshot['functions'].items(),
+                           key=lambda item: item[1]['queries'],
+                           reverse=True)
+        for name, statistics in functions[:10]:
+            logger.info("%s : %d calls, %d queries, %d rows read, "
+                        "mean %.1f ms, max %.1f ms",
+                        name,
+                        statistics['calls'],
+                        statistics['queries'],
+                        statistics['rows_read'],
+                        statistics['latency']['mean_ms'],
+                        statistics['latency']['max_ms'])
+        return snapshot
+
+    def periodic_dump(self, force=False):
+        """ dump the statistics if DAL_METRICS_INTERVAL seconds elapsed
+        since the last dump (or force is True), nothing is done when
+        DAL_METRICS_INTERVAL is 0
+        """
+        if not DAL_METRICS or not DAL_METRICS_INTERVAL:
+            return
+        elapsed = time.monotonic() - self.last_dump
+        if force or elapsed >= DAL_METRICS_INTERVAL:
+            try:
+                self.dump()
+            except OSError as e:
+                logger.warning("DAL metrics dump failed : %s", e)
+
+
+dal_metrics = DalMetrics()
+
+current_function = ContextVar('current_function', default=None)
+current_action = ContextVar('current_action', default=None)
+
+
+def running_calls():
+    return [call for call in (current_function.get(), current_action.get())
+            if call is not None]
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context,
+                         executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()
+    # rowcount is the number of rows modified, -1 for a select on most drivers
+    written = cursor.rowcount if cursor.rowcount > 0 else 0
+    for call in running_calls():
+        call.queries += 1
+        call.rows_written += written
+        call.database_time += duration
+
+
+def handle_error(exception_context):
+    # the start of a failed statement is left in the stack otherwise
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_start'):
+        connection.info['query_start'].pop()
+
+
+if DAL_METRICS:
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', after_cursor_execute)
+    event.listen(engine, 'handle_error', handle_error)
+
+
+def count_rows(result):
+    """ number of rows returned by a DAL function : length of the lists
+    and dictionnaries of its result, an object read by id counts for one
+    """
+    if not isinstance(result, dict):
+        return 0
+    rows = 0
+    for key, value in result.items():
+        if key in NOT_ROWS_KEYS or value is None:
+            continue
+        if isinstance(value, (list, tuple, set, dict)):
+            rows += len(value)
+        elif hasattr(value, '__table__'):
+            rows += 1
+    return rows
+
+
+def record_call(name, call, start):
+    duration = (time.perf_counter() - start) * 1000
+    dal_metrics.function_statistics(name).record(call, duration)
+    action = current_action.get()
+    # the rows of a DAL function called by another one are counted once
+    if action is not None and current_function.get() is None:
+        action.rows_read += call.rows_read
+        action.errors += call.errors
+
+
+def instrumented_stream(name, rows):
+    """ generator recording the queries of a streamed DAL function while its
+    rows are read, the call is recorded when the stream ends
+    """
+    call = Call()
+    start = time.perf_counter()
+    try:
+        while True:
+            token = current_function.set(call)
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            finally:
+                current_function.reset(token)
+            call.rows_read += 1
+            yield row
+    except Exception:
+        call.errors += 1
+        raise
+    finally:
+        record_call(name, call, start)
+
+
+def dal_span(name):
+    """ sentry span of a DAL function in the running transaction,
+    nothing is traced when the transaction is not sampled
+    """
+    parent = Hub.current.scope.span
+    if parent is None or not parent.sampled:
+        return nullcontext()
+    return parent.start_child(op='db.dal', description=name)
+
+
+def instrumented(name, function):
+    """ wrap a DAL function to record its statistics under name,
+    and trace it as a sentry span
+    """
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        call = Call()
+        start = time.perf_counter()
+        token = current_function.set(call)
+        try:
+            with dal_span(name) as span:
+                result = function(*args, **kwargs)
+                if (span is not None and isinstance(result, dict)
+                        and result.get('status') == "ko"):
+                    span.set_status('internal_error')
+        except Exception:
+            call.errors += 1
+            current_function.reset(token)
+            record_call(name, call, start)
+            raise
+        current_function.reset(token)
+
+        if inspect.isgenerator(result):
+            # the queries run while the rows are read
+            return instrumented_stream(name, result)
+        call.rows_read = count_rows(result)
+        if isinstance(result, dict) and result.get('status') == "ko":
+            call.errors += 1
+        record_call(name, call, start)
+        return result
+
+    return wrapper
+
+
+def instrument_module(module_name):
+    """ wrap the DAL functions (DAL_FUNCTION_PREFIXES) defined in a module,
+    to be called at the end of the module, nothing is done when
+    DAL_METRICS is false
+    """
+    if not DAL_METRICS:
+        return
+    module = sys.modules[module_name]
+    short_name = module_name.rsplit('.', 1)[-1]
+    for name, value in list(vars(module).items()):
+        if (inspect.isfunction(value)
+                and value.__module__ == module_name
+                and name.startswith(DAL_FUNCTION_PREFIXES)):
+            setattr(module, name,
+                    instrumented(f"{short_name}.{name}", value))
+
+
+@contextmanager
+def action(name):
+    """ record the statistics of a controller action : the DAL functions
+    and the statements run inside the block
+    """
+    call = Call()
+    token = current_action.set(call)
+    try:
+        yield call
+    finally:
+        current_action.reset(token)
+        if DAL_METRICS:
+            dal_metrics.action_statistics(name).record(
+                call, call.database_time * 1000)
@@ -0,0 +1,389 @@
+# tools shared by the Data Layer Access functions
+
+from collections import OrderedDict
+from datetime import datetime
+from dotenv import load_dotenv
+from functools import wraps
+from itertools import islice
+import os
+import time
+
+from sqlalchemy import exc, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from db import get_session
+
+load_dotenv()
+
+# number of rows displayed in a list screen
+LIST_PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "50"))
+
+# user role cache : number of users kept and lifetime in seconds
+ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", "1024"))
+ROLE_CACHE_TTL = int(os.getenv("ROLE_CACHE_TTL", "300"))
+
+# entity cache of the get_*_by_id functions : number of rows kept
+# (0 to disable the cache) and lifetime in seconds
+ENTITY_CACHE_SIZE = int(os.getenv("ENTITY_CACHE_SIZE", "0"))
+ENTITY_CACHE_TTL = int(os.getenv("ENTITY_CACHE_TTL", "30"))
+
+# ownership index of the authorization checks : number of (user, row)
+# answers kept and lifetime in seconds
+OWNERSHIP_CACHE_SIZE = int(os.getenv("OWNERSHIP_CACHE_SIZE", "4096"))
+OWNERSHIP_CACHE_TTL = int(os.getenv("OWNERSHIP_CACHE_TTL", "300"))
+
+# number of rows sent to the database in one statement by the bulk functions
+# and read from the database in one fetch by the streamed exports
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+
+
+def paginate(query, id_column, page_size=None, after_id=None, before_id=None):
+    """ apply a keyset pagination on the id column to a query
+    parameters :
+    query : query to be paginated
+    id_column : column used as cursor, rows are sorted on it
+    page_size : number of rows in a page, None for all the rows
+    after_id : last id of the previous page, to get the next page
+    before_id : first id of the next page, to get the previous page
+    returns tuple (rows, page), page is a dictionnary with keys :
+    'has_previous': True if rows exist before the page
+    'has_next': True if rows exist after the page
+    'first_id': id of the first row of the page (None if page empty)
+    'last_id': id of the last row of the page (None if page empty)
+    """
+    if page_size is None:
+        rows = query.order_by(id_column).all()
+        has_previous = False
+        has_next = False
+
+    elif before_id is not None:
+        # one row more than the page is read to know if a page remains
+        rows = (query.filter(id_column < before_id)
+                .order_by(id_column.desc())
+                .limit(page_size + 1)
+                .all())
+        has_previous = len(rows) > page_size
+        rows = rows[:page_size]
+        rows.reverse()
+        has_next = True
+
+    else:
+        if after_id is not None:
+            query = query.filter(id_column > after_id)
+        rows = (query.order_by(id_column)
+                .limit(page_size + 1)
+                .all())
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        has_previous = after_id is not None
+
+    page = {
+        'has_previous': has_previous,
+        'has_next': has_next,
+        'first_id': rows[0].id if rows else None,
+        'last_id': rows[-1].id if rows else None,
+    }
+    return rows, page
+
+
+def paginate_rows(session,
+                  model,
+                  row_type,
+                  criteria=None,
+                  page_size=None,
+                  after_id=None,
+                  before_id=None):
+    """ page of a list screen read as light rows : only the columns of
+    the row type are selected and no ORM object is built
+    parameters :
+    session : session in which the query is run
+    model : mapped class of the rows
+    row_type : named tuple class, its fields are the columns read
+    criteria : list of filter expressions, None for all the rows
+    page_size, after_id, before_id : page cursor (see paginate)
+    returns tuple (rows, page), rows are row_type named tuples
+    """
+    query = (session.query(*[getattr(model, field)
+                             for field in row_type._fields])
+             .filter(*(criteria or [])))
+    rows, page = paginate(query, model.id, page_size, after_id, before_id)
+    return [row_type._make(row) for row in rows], page
+
+
+def update_by_id(session, model, record_id, values):
+    """ update a row with a single UPDATE ... WHERE id = :id statement,
+    the row is not loaded, the onupdate columns (last_update) are set
+    by the statement
+    parameters :
+    session : session in which the statement is run, not committed
+    model : mapped class of the row
+    record_id : id of the row
+    values : dictionnary column name: new value
+    returns number of rows matched, 0 if the id does not exist
+    """
+    if not values:
+        # nothing to write, only the existence of the row is checked
+        return (session.query(model.id)
+                .filter(model.id == record_id)
+                .count())
+
+    return (session.query(model)
+            .filter(model.id == record_id)
+            .update(values, synchronize_session=False))
+
+
+def batched(rows, batch_size):
+    """ split an iterable in lists of batch_size rows (the last one
+    can be shorter), the iterable is read as the batches are consumed
+    """
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def upsert_statement(model, dialect_name, key_columns, update_columns):
+    """ INSERT statement updating the existing row when the row to be
+    inserted conflicts with it on the unique key_columns
+    (mysql uses every unique key of the table, key_columns is ignored)
+    parameters :
+    model : mapped class of the rows
+    dialect_name : name of the dialect of the database
+    key_columns : names of the unique columns identifying the rows
+    update_columns : names of the columns updated on the existing rows
+    returns statement, to be executed with a list of rows
+    """
+    if dialect_name == 'mysql':
+        statement = mysql.insert(model)
+        new_values = statement.inserted
+    elif dialect_name in ['postgresql', 'sqlite']:
+        dialect = postgresql if dialect_name == 'postgresql' else sqlite
+        statement = dialect.insert(model)
+        new_values = statement.excluded
+    else:
+        raise exc.ArgumentError(f"upsert not supported by {dialect_name}")
+
+    values = {column: new_values[column] for column in update_columns}
+    # the ORM onupdate is not applied to the rows updated by the database
+    if 'last_update' in model.__table__.columns:
+        values['last_update'] = datetime.now()
+
+    if dialect_name == 'mysql':
+        return statement.on_duplicate_key_update(values)
+    return statement.on_conflict_do_update(index_elements=key_columns,
+                                           set_=values)
+
+
+def bulk_insert(model,
+                rows,
+                batch_size=None,
+                key_columns=None,
+                update_columns=None):
+    """ insert rows by batches, each batch is sent in one executemany
+    and committed in its own transaction, a failed batch is rolled back
+    without stopping the next ones
+    parameters :
+    model : mapped class of the rows
+    rows : iterable of dictionnaries column name: value,
+           all the rows with the same keys
+    batch_size : number of rows by batch, BULK_BATCH_SIZE by default
+    key_columns : for an upsert, unique columns identifying the rows,
+                  the rows already in database are updated
+    update_columns : for an upsert, columns updated on the existing rows
+    returns result dictionnary with keys :
+    'status': ok if every batch is written, ko otherwise
+    'row_count': number of rows written
+    'batches': one dictionnary per batch with keys 'status',
+               'row_count' (rows in the batch), 'error' (if status == ko)
+    'error': error details of the first failed batch (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    result['row_count'] = 0
+    result['batches'] = []
+
+    for batch in batched(rows, batch_size or BULK_BATCH_SIZE):
+        batch_result = {'status': "ok", 'row_count': len(batch)}
+        try:
+            with get_session() as session:
+                if key_columns is None:
+                    statement = insert(model)
+                else:
+                    statement = upsert_statement(
+                        model,
+                        session.get_bind().dialect.name,
+                        key_columns,
+                        update_columns)
+                session.execute(statement, batch)
+                session.commit()
+            result['row_count'] += len(batch)
+
+        except exc.SQLAlchemyError as e:
+            batch_result['status'] = "ko"
+            batch_result['error'] = e
+            if result['status'] == "ok":
+                result['status'] = "ko"
+                result['error'] = e
+
+        result['batches'].append(batch_result)
+
+    return result
+
+
+def stream_rows(model, columns, criteria=None, batch_size=None):
+    """ read columns of the rows of a table, sorted on id, without
+    building ORM objects, the rows are fetched by batches with a server
+    side cursor (when the driver has one) so only one batch is in memory
+    generator, the session stays open until the last row is read
+    parameters :
+    model : mapped class of the rows
+    columns : names of the columns read
+    criteria : list of filter expressions, None for all the rows
+    batch_size : number of rows by fetch, BULK_BATCH_SIZE by default
+    yields rows as named tuples
+    """
+    statement = (select(*[getattr(model, column) for column in columns])
+                 .where(*(criteria or []))
+                 .order_by(model.id)
+                 .execution_options(yield_per=batch_size or BULK_BATCH_SIZE))
+
+    with get_session() as session:
+        for row in session.execute(statement):
+            yield row
+
+
+class TTLCache():
+    """ in process cache keeping at most max_size entries,
+    the least recently used entry is dropped first
+    and an entry expires ttl seconds after it was stored
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """ return the value stored for the key, None if absent or expired
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expiry = entry
+        if expiry <= time.monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (value, time.monotonic() + self.ttl)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """ remove the entry of the key, all the entries if key is None """
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+
+    def statistics(self):
+        """ counters of the cache, the hits and misses since its creation
+        """
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self.entries)}
+
+
+class EntityCache(TTLCache):
+    """ cache of the rows read by the get_*_by_id functions,
+    keyed by (model name, id), disabled when max_size is 0
+    the DAL write functions invalidate the rows they modify, and the rows
+    holding them in a loaded relationship (a client holds its contracts,
+    a contract holds its events)
+    """
+
+    @staticmethod
+    def entity_key(model, record_id):
+        """ key of a row, None if the id is not a number """
+        try:
+            return (model.__name__, int(record_id))
+        except (TypeError, ValueError):
+            return None
+
+    def get_entity(self, model, record_id):
+        key = self.entity_key(model, record_id)
+        if key is None or self.max_size == 0:
+            return None
+        return self.get(key)
+
+    def set_entity(self, model, record_id, entity):
+        key = self.entity_key(model, record_id)
+        if key is not None and self.max_size > 0:
+            self.set(key, entity)
+
+    def invalidate_entity(self, model, record_id):
+        key = self.entity_key(model, record_id)
+        if key is not None:
+            self.invalidate(key)
+
+    def invalidate_model(self, *models):
+        """ remove all the rows of the models """
+        names = [model.__name__ for model in models]
+        for key in [key for key in self.entries if key[0] in names]:
+            del self.entries[key]
+
+
+class OwnershipIndex(TTLCache):
+    """ answers of the ownership checks, keyed by (user id, model name, id),
+    True if the user owns the row, False otherwise
+    the whole index is invalidated by the DAL write functions able to
+    change an owner (commercial of a client, support of an event, client
+    of a contract, contract of an event) and by the deletes
+    """
+
+    def get_owned(self, user_id, model, record_id):
+        """ True or False if the answer is known, None otherwise """
+        return self.get((user_id, model.__name__, record_id))
+
+    def set_owned(self, user_id, model, record_id, owned):
+        self.set((user_id, model.__name__, record_id), owned)
+
+
+def cached_by_id(model, result_key):
+    """ decorator of a get_*_by_id DAL function, the row found
+    (result[result_key]) is kept in the entity cache and returned by the
+    next calls without query until it is invalidated or expired
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(record_id):
+            entity = entity_cache.get_entity(model, record_id)
+            if entity is not None:
+                return {'status': "ok", result_key: entity}
+
+            result = func(record_id)
+            if result['status'] == "ok":
+                entity_cache.set_entity(model, record_id, result[result_key])
+            return result
+        return wrapper
+    return decorator
+
+
+# role name of the users, by user id
+user_role_cache = TTLCache(ROLE_CACHE_SIZE, ROLE_CACHE_TTL)
+# rows read by the get_*_by_id functions, by (model name, id)
+entity_cache = EntityCache(ENTITY_CACHE_SIZE, ENTITY_CACHE_TTL)
+# clients, contracts and events owned by the users
+ownership_index = OwnershipIndex(OWNERSHIP_CACHE_SIZE, OWNERSHIP_CACHE_TTL)
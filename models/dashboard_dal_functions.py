@@ -0,0 +1,74 @@
+# define Data Layer Access functions for the home screen
+# clients, contracts and events followed by a user are loaded
+# with a fixed number of queries whatever the volume of data
+
+from sqlalchemy import exc, select
+
+from db import get_session
+from models.client_models import Client, Contract, Event
+from models.client_dal_functions import owned_clients
+from models.contract_dal_functions import owned_contracts
+from models.event_dal_functions import client_events
+from models.dal_metrics import instrument_module
+
+
+def get_dashboard_data(user_id, supported_events=False):
+    """ retrieve clients, contracts and events followed by a user
+    three queries are issued whatever the number of clients
+    parameters :
+    user_id
+    supported_events : if True the events returned are the ones supported
+                       by the user, else the events of the user's clients
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'clients': rows with id, first_name, last_name, enterprise
+               (if status == ok)
+    'contracts': rows with id, client_id, total_amount, amount_unpaid,
+                 status (if status == ok)
+    'events': rows with id, title, contract_id, start_date, end_date,
+              location, attendees (if status == ok)
+    'error': error details (if status == ko)
+    """
+    clients_query = (select(Client.id,
+                            Client.first_name,
+                            Client.last_name,
+                            Client.enterprise)
+                     .where(owned_clients(user_id))
+                     .order_by(Client.id))
+
+    contracts_query = (select(Contract.id,
+                              Contract.client_id,
+                              Contract.total_amount,
+                              Contract.amount_unpaid,
+                              Contract.status)
+                       .where(owned_contracts(user_id))
+                       .order_by(Contract.id))
+
+    events_query = select(Event.id,
+                          Event.title,
+                          Event.contract_id,
+                          Event.start_date,
+                          Event.end_date,
+                          Event.location,
+                          Event.attendees)
+    if supported_events:
+        events_query = events_query.where(Event.support_contact_id == user_id)
+    else:
+        events_query = events_query.where(client_events(user_id))
+    events_query = events_query.order_by(Event.id)
+
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            result['clients'] = session.execute(clients_query).all()
+            result['contracts'] = session.execute(contracts_query).all()
+            result['events'] = session.execute(events_query).all()
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+instrument_module(__name__)
@@ -1,12 +1,66 @@
 # define Data Layer Access functions for the Contract class
 # created in the client_models package
 
-from sqlalchemy import exc
+from collections import namedtuple
 
-from db import (session_maker,
+from sqlalchemy import exc, or_, select
+
+from db import (get_session,
                 DB_RECORD_NOT_FOUND,
                 )
-from models.client_models import Event
+from models.dal_tools import (bulk_insert,
+                              cached_by_id,
+                              entity_cache,
+                              ownership_index,
+                              paginate,
+                              paginate_rows,
+                              stream_rows,
+                              update_by_id,
+                              )
+from models.client_models import Client, Contract, Event
+from models.dal_metrics import instrument_module
+
+# columns modified by update_event, active is modified by
+# activate_event / deactivate_event
+EVENT_UPDATE_FIELDS = ['title',
+                       'contract_id',
+                       'start_date',
+                       'end_date',
+                       'support_contact_id',
+                       'location',
+                       'attendees',
+                       'notes',
+                       ]
+# columns given to create_event and to the bulk functions
+EVENT_CREATE_FIELDS = EVENT_UPDATE_FIELDS + ['active']
+# columns of the exported event lists
+EVENT_EXPORT_FIELDS = ['id'] + EVENT_CREATE_FIELDS
+# row of the event list screens, with the displayed columns only
+# (the notes are not read)
+EventRow = namedtuple('EventRow',
+                      ['id', 'title', 'contract_id', 'start_date',
+                       'end_date', 'location', 'attendees'])
+
+# filter of the event lists, shared by the list screens and the exports
+UNASSIGNED_EVENTS = Event.support_contact_id == None  # noqa: E711
+
+
+def client_events(user_id):
+    """ filter expression of the events of the clients followed by
+    a commercial user, the contract ids are selected by joining the
+    contracts to the clients on commercial_contact_id
+    """
+    return Event.contract_id.in_(
+        select(Contract.id)
+        .join(Client, Contract.client_id == Client.id)
+        .where(Client.commercial_contact_id == user_id))
+
+
+def owned_events(user_id):
+    """ filter expression of the events supported by a user
+    or linked to the clients he follows as commercial
+    """
+    return or_(Event.support_contact_id == user_id, client_events(user_id))
 
 
 def create_event(event_dict):
@@ -33,9 +87,10 @@ def create_event(event_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             session.add(event)
             session.commit()
+            entity_cache.invalidate_entity(Contract, event_dict['contract_id'])
             result['event_id'] = event.id
 
     except exc.SQLAlchemyError as e:
@@ -45,6 +100,55 @@ def create_event(event_dict):
     return result
 
 
+def bulk_create_events(event_dicts, batch_size=None):
+    """ create events in database by batches of batch_size rows,
+    one INSERT statement and one transaction by batch
+    parameters :
+    event_dicts : iterable of dictionnaries with data for events to be
+                 created, same keys as for create_event
+    batch_size : number of events by batch, BULK_BATCH_SIZE by default
+    returns result dictionnary with keys :
+    'status': ok or ko (ko if a batch failed)
+    'row_count': number of events created
+    'batches': one dictionnary per batch with keys 'status',
+               'row_count' and 'error' (if status == ko)
+    'error': error details of the first failed batch (if status == ko)
+    """
+    rows = ({field: event_dict[field] for field in EVENT_CREATE_FIELDS}
+            for event_dict in event_dicts)
+
+    result = bulk_insert(Event, rows, batch_size)
+    entity_cache.invalidate_model(Event, Contract)
+
+    return result
+
+
+def bulk_upsert_events(event_dicts, batch_size=None):
+    """ create or update events in database by batches of batch_size rows,
+    the events whose id is already in database are updated
+    parameters :
+    event_dicts : iterable of dictionnaries with data for events,
+                 same keys as for create_event
+                 and the 'id' key (the row is created with this id
+                 if it does not exist)
+    batch_size : number of events by batch, BULK_BATCH_SIZE by default
+    returns result dictionnary, same keys as for bulk_create_events
+    """
+    fields = ['id'] + EVENT_CREATE_FIELDS
+    rows = ({field: event_dict[field] for field in fields}
+            for event_dict in event_dicts)
+
+    result = bulk_insert(Event,
+                         rows,
+                         batch_size,
+                         key_columns=['id'],
+                         update_columns=EVENT_CREATE_FIELDS)
+    entity_cache.invalidate_model(Event, Contract)
+    ownership_index.invalidate()
+
+    return result
+
+
 def update_event(event_dict):
     """ update event in database
     parameters :
@@ -60,36 +164,25 @@ def update_event(event_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            event = (session.query(Event)
-                     .filter(Event.id == event_dict['id'])
-                     .first())
-
-            if event is not None:
-                if 'title' in event_dict:
-                    event.title = event_dict['title']
-                if 'contract_id' in event_dict:
-                    event.contract_id = event_dict['contract_id']
-                if 'start_date' in event_dict:
-                    event.start_date = event_dict['start_date']
-                if 'end_date' in event_dict:
-                    event.end_date = event_dict['end_date']
-                if 'support_contact_id' in event_dict:
-                    event.support_contact_id = event_dict['support_contact_id']
-                if 'location' in event_dict:
-                    event.location = event_dict['location']
-                if 'attendees' in event_dict:
-                    event.attendees = event_dict['attendees']
-                if 'notes' in event_dict:
-                    event.notes = event_dict['notes']
-
-                session.commit()
+            values = {field: event_dict[field]
+                      for field in EVENT_UPDATE_FIELDS
+                      if field in event_dict}
+            rows_affected = update_by_id(session, Event, event_dict['id'],
+                                         values)
 
-                result['event_id'] = event.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Event, event_dict['id'])
+                entity_cache.invalidate_model(Contract)
+                if ('support_contact_id' in values
+                        or 'contract_id' in values):
+                    ownership_index.invalidate()
+                result['event_id'] = event_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -110,18 +203,20 @@ def deactivate_event(event_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            event = (session.query(Event)
-                     .filter(Event.id == event_id)
-                     .first())
-            if event is not None:
-                event.deactivate()
-                session.commit()
-                result['event_id'] = event.id
-            else:
+            values = {'active': False}
+            rows_affected = update_by_id(session, Event, event_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Event, event_id)
+                entity_cache.invalidate_model(Contract)
+                result['event_id'] = event_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -141,18 +236,20 @@ def activate_event(event_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            event = (session.query(Event)
-                     .filter(Event.id == event_id)
-                     .first())
-            if event is not None:
-                event.activate()
-                session.commit()
-                result['event_id'] = event.id
-            else:
+            values = {'active': True}
+            rows_affected = update_by_id(session, Event, event_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Event, event_id)
+                entity_cache.invalidate_model(Contract)
+                result['event_id'] = event_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -160,6 +257,7 @@ def activate_event(event_id):
     return result
 
 
+@cached_by_id(Event, 'event')
 def get_event_by_id(event_id):
     """ retrieve a event in database by id
     parameters :
@@ -172,7 +270,7 @@ def get_event_by_id(event_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             event = (session.query(Event)
                      .filter(Event.id == event_id)
                      .first())
@@ -188,22 +286,60 @@ def get_event_by_id(event_id):
     return result
 
 
-def get_all_events():
-    """ retrieve all events in database
+def get_events_by_ids(event_ids):
+    """ retrieve events in database from a list of ids with one query
     parameters :
+    event_ids : list of event ids
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'events': dictionnary of event objects keyed by id (if status == ok),
+              ids not found in database are not in the dictionnary
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    ids = set(event_ids)
+    if not ids:
+        result['events'] = {}
+        return result
 
+    try:
+        with get_session() as session:
+            events = (session.query(Event)
+                      .filter(Event.id.in_(ids))
+                      .all())
+            result['events'] = {event.id: event for event in events}
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def get_all_events(page_size=None, after_id=None, before_id=None):
+    """ retrieve all events in database
+    parameters :
+    page_size : number of events in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
     returns result dictionnary with keys :
     'status': ok or ko
     'events': events objects (if status == ok)
+    'page': page cursor data (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            events = (session.query(Event).all())
+        with get_session() as session:
+            query = session.query(Event)
+            events, page = paginate(query,
+                                    Event.id,
+                                    page_size,
+                                    after_id,
+                                    before_id)
             if events is not None:
                 result['events'] = events
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -214,25 +350,36 @@ def get_all_events():
     return result
 
 
-def get_supported_event(user_id):
+def get_supported_event(user_id,
+                        page_size=None,
+                        after_id=None,
+                        before_id=None):
     """ retrieve events in database where
     the user is the support contact
     parameters :
     user_id
+    page_size : number of events in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
     returns result dictionnary with keys :
     'status': ok or ko
     'event': event object (if status == ok)
+    'page': page cursor data (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            event = (session.query(Event)
-                     .filter(Event.support_contact_id == user_id)
-                     .all())
+        with get_session() as session:
+            query = (session.query(Event)
+                     .filter(Event.support_contact_id == user_id))
+            event, page = paginate(query,
+                                   Event.id,
+                                   page_size,
+                                   after_id,
+                                   before_id)
             if event is not None:
                 result['events'] = event
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -243,24 +390,30 @@ def get_supported_event(user_id):
     return result
 
 
-def get_event_unassigned():
+def get_event_unassigned(page_size=None, after_id=None, before_id=None):
     """ retrieve events in database bwith no support user
     parameters :
-
+    page_size : number of events in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
     returns result dictionnary with keys :
     'status': ok or ko
     'event': event object (if status == ok)
+    'page': page cursor data (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            events = (session.query(Event)
-                      .filter(Event.support_contact_id == None)
-                      .all())
+        with get_session() as session:
+            query = session.query(Event).filter(UNASSIGNED_EVENTS)
+            events, page = paginate(query,
+                                    Event.id,
+                                    page_size,
+                                    after_id,
+                                    before_id)
             if events is not None:
                 result['events'] = events
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -271,6 +424,84 @@ def get_event_unassigned():
     return result
 
 
+def event_criteria(support_user_id=None, unassigned=False, owner_id=None):
+    """ filter expressions of the event lists
+    parameters :
+    support_user_id : id of a user, for the events he supports only
+    unassigned : True for the events without support user only
+    owner_id : id of a user, for the events he supports or whose client
+               he follows
+    returns list of filter expressions
+    """
+    criteria = []
+    if support_user_id is not None:
+        criteria.append(Event.support_contact_id == support_user_id)
+    if unassigned:
+        criteria.append(UNASSIGNED_EVENTS)
+    if owner_id is not None:
+        criteria.append(owned_events(owner_id))
+    return criteria
+
+
+def get_event_rows(support_user_id=None,
+                   unassigned=False,
+                   owner_id=None,
+                   page_size=None,
+                   after_id=None,
+                   before_id=None):
+    """ retrieve a page of an event list screen as EventRow tuples,
+    only the displayed columns are read
+    parameters :
+    support_user_id, unassigned, owner_id : filters (see event_criteria)
+    page_size : number of events in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'events': EventRow tuples (if status == ok)
+    'page': page cursor data (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            result['events'], result['page'] = paginate_rows(
+                session,
+                Event,
+                EventRow,
+                event_criteria(support_user_id, unassigned, owner_id),
+                page_size,
+                after_id,
+                before_id)
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
+def stream_events(support_user_id=None,
+                  unassigned=False,
+                  owner_id=None,
+                  batch_size=None):
+    """ read the events of the database as a stream of rows,
+    with the filters of get_supported_event / get_event_unassigned /
+    get_event_rows(owner_id), for exports of any size
+    (see dal_tools.stream_rows)
+    parameters :
+    support_user_id : id of a user, for the events he supports only
+    unassigned : True for the events without support user only
+    owner_id : id of a user, for the events he supports or whose client
+               he follows
+    batch_size : number of rows by fetch, BULK_BATCH_SIZE by default
+    yields rows with the EVENT_EXPORT_FIELDS columns, sorted on id
+    """
+    return stream_rows(Event,
+                       EVENT_EXPORT_FIELDS,
+                       event_criteria(support_user_id, unassigned, owner_id),
+                       batch_size)
+
+
 def delete_event(event_id):
     """ delete event in database
     parameters :
@@ -284,11 +515,14 @@ def delete_event(event_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             rows_affected = (session.query(Event)
                              .filter(Event.id == event_id)
                              .delete())
             session.commit()
+            entity_cache.invalidate_entity(Event, event_id)
+            entity_cache.invalidate_model(Contract)
+            ownership_index.invalidate()
 
             if rows_affected == 0:
                 result['status'] = "ko"
@@ -300,3 +534,6 @@ def delete_event(event_id):
         result['error'] = e
 
     return result
+
+
+instrument_module(__name__)
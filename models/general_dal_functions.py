@@ -1,10 +1,21 @@
-from .user_dal_functions import get_user_by_id
-from .team_dal_functions import get_team_by_id
-from .role_dal_functions import get_role_by_id
+from sqlalchemy import exc, literal, select, union_all
+
+from db import (get_session,
+                DB_RECORD_NOT_FOUND
+                )
+from models.dal_tools import ownership_index, user_role_cache
+from models.user_models import User, Team, Role
+from models.client_models import Client, Contract, Event
+from models.client_dal_functions import owned_clients
+from models.contract_dal_functions import owned_contracts
+from models.event_dal_functions import owned_events
+from models.dal_metrics import instrument_module
 
 
 def get_user_role(user_id):
     """ get role for the user
+    the role is read with one query joining user, team and role,
+    then kept in the user role cache
     parameters :
     user_id
     returns :
@@ -13,22 +24,130 @@ def get_user_role(user_id):
     'error': error details (if status == ko)
     """
     result = {}
-    result_user = get_user_by_id(user_id)
-    if result_user['status'] == 'ok':
-        result_team = get_team_by_id(result_user['user'].team_id)
-        if result_team['status'] == 'ok':
-            result_role = get_role_by_id(result_team['team'].role_id)
-            if result_role['status'] == 'ok':
-                result['status'] = 'ok'
-                result['user_role'] = result_role['role'].name
+    result['status'] = 'ok'
+
+    user_role = user_role_cache.get(user_id)
+    if user_role is not None:
+        result['user_role'] = user_role
+        return result
+
+    try:
+        with get_session() as session:
+            user_role = (session.query(Role.name)
+                         .join(Team, Team.role_id == Role.id)
+                         .join(User, User.team_id == Team.id)
+                         .filter(User.id == user_id)
+                         .scalar())
+
+            if user_role is not None:
+                user_role_cache.set(user_id, user_role)
+                result['user_role'] = user_role
             else:
                 result['status'] = 'ko'
-                result['error'] = result_role['error']
-        else:
-            result['status'] = 'ko'
-            result['error'] = result_team['error']
-    else:
+                result['error'] = DB_RECORD_NOT_FOUND
+
+    except exc.SQLAlchemyError as e:
         result['status'] = 'ko'
-        result['error'] = result_user['error']
+        result['error'] = e
 
     return result
+
+
+def to_ids(record_ids):
+    """ int ids of a list of ids given as numbers or strings,
+    the values which are not numbers are ignored
+    """
+    ids = set()
+    for record_id in record_ids:
+        try:
+            ids.add(int(record_id))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+def owned_rows_statement(user_id, client_ids, contract_ids, event_ids):
+    """ one statement reading the owned rows of the three lists of ids,
+    rows (kind, id), kind is the model name
+    (see the owned_clients, owned_contracts and owned_events filters)
+    """
+    statements = []
+    if client_ids:
+        statements.append(
+            select(literal(Client.__name__).label('kind'), Client.id)
+            .where(Client.id.in_(client_ids), owned_clients(user_id)))
+    if contract_ids:
+        statements.append(
+            select(literal(Contract.__name__).label('kind'), Contract.id)
+            .where(Contract.id.in_(contract_ids), owned_contracts(user_id)))
+    if event_ids:
+        statements.append(
+            select(literal(Event.__name__).label('kind'), Event.id)
+            .where(Event.id.in_(event_ids), owned_events(user_id)))
+
+    if len(statements) == 1:
+        return statements[0]
+    return union_all(*statements)
+
+
+def get_owned_ids(user_id, client_ids=(), contract_ids=(), event_ids=()):
+    """ get which clients, contracts and events are owned by a user
+    the answers of the ownership index are used, the other ids are
+    checked with one query joining events, contracts and clients,
+    then kept in the index
+    parameters :
+    user_id
+    client_ids, contract_ids, event_ids : lists of ids to be checked
+    returns :
+    'status': ok or ko
+    'client_ids': set of the owned client ids (if status == ok)
+    'contract_ids': set of the owned contract ids (if status == ok)
+    'event_ids': set of the owned event ids (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = 'ok'
+
+    requested = {'client_ids': (Client, to_ids(client_ids)),
+                 'contract_ids': (Contract, to_ids(contract_ids)),
+                 'event_ids': (Event, to_ids(event_ids))}
+    unknown = {}
+    for key, (model, ids) in requested.items():
+        result[key] = set()
+        unknown[key] = set()
+        for record_id in ids:
+            owned = ownership_index.get_owned(user_id, model, record_id)
+            if owned is None:
+                unknown[key].add(record_id)
+            elif owned:
+                result[key].add(record_id)
+
+    if not any(unknown.values()):
+        return result
+
+    try:
+        with get_session() as session:
+            rows = session.execute(
+                owned_rows_statement(user_id,
+                                     unknown['client_ids'],
+                                     unknown['contract_ids'],
+                                     unknown['event_ids'])).all()
+
+    except exc.SQLAlchemyError as e:
+        result = {}
+        result['status'] = 'ko'
+        result['error'] = e
+        return result
+
+    owned_rows = {(kind, record_id) for kind, record_id in rows}
+    for key, (model, ids) in requested.items():
+        for record_id in unknown[key]:
+            owned = (model.__name__, record_id) in owned_rows
+            ownership_index.set_owned(user_id, model, record_id, owned)
+            if owned:
+                result[key].add(record_id)
+
+    return result
+
+
+instrument_module(__name__)
@@ -3,10 +3,21 @@
 
 from sqlalchemy import exc
 
-from db import (session_maker,
+from db import (get_session,
                 DB_RECORD_NOT_FOUND
                 )
 from models.user_models import Role
+from models.dal_tools import (cached_by_id,
+                              entity_cache,
+                              update_by_id,
+                              user_role_cache,
+                              )
+from models.dal_metrics import instrument_module
+
+# columns modified by update_role, active is modified by
+# activate_role / deactivate_role
+ROLE_UPDATE_FIELDS = ['name',
+                      ]
 
 
 def create_role(role_dict):
@@ -26,7 +37,7 @@ def create_role(role_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             session.add(role)
             session.commit()
             result['role_id'] = role.id
@@ -51,22 +62,22 @@ def update_role(role_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-
-            role = (session.query(Role)
-                    .filter(Role.id == role_dict['id'])
-                    .first())
+        with get_session() as session:
 
-            if role is not None:
-                if 'name' in role_dict:
-                    role.name = role_dict['name']
-
-                session.commit()
+            values = {field: role_dict[field]
+                      for field in ROLE_UPDATE_FIELDS
+                      if field in role_dict}
+            rows_affected = update_by_id(session, Role, role_dict['id'],
+                                         values)
 
-                result['role_id'] = role.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Role, role_dict['id'])
+                user_role_cache.invalidate()
+                result['role_id'] = role_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -88,18 +99,20 @@ def activate_role(role_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            role = (session.query(Role)
-                    .filter(Role.id == role_id)
-                    .first())
-            if role is not None:
-                role.activate()
-                session.commit()
-                result['role_id'] = role.id
-            else:
+            values = {'active': True}
+            rows_affected = update_by_id(session, Role, role_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Role, role_id)
+                user_role_cache.invalidate()
+                result['role_id'] = role_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -120,18 +133,20 @@ def deactivate_role(role_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            role = (session.query(Role)
-                    .filter(Role.id == role_id)
-                    .first())
-            if role is not None:
-                role.deactivate()
-                session.commit()
-                result['role_id'] = role.id
-            else:
+            values = {'active': False}
+            rows_affected = update_by_id(session, Role, role_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Role, role_id)
+                user_role_cache.invalidate()
+                result['role_id'] = role_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -139,6 +154,7 @@ def deactivate_role(role_id):
     return result
 
 
+@cached_by_id(Role, 'role')
 def get_role_by_id(role_id):
     """
     parameters :
@@ -151,7 +167,7 @@ def get_role_by_id(role_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
             role = (session.query(Role)
                     .filter(Role.id == role_id)
@@ -168,6 +184,36 @@ def get_role_by_id(role_id):
     return result
 
 
+def get_roles_by_ids(role_ids):
+    """ retrieve roles in database from a list of ids with one query
+    parameters :
+    role_ids : list of role ids
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'roles': dictionnary of role objects keyed by id (if status == ok),
+              ids not found in database are not in the dictionnary
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    ids = set(role_ids)
+    if not ids:
+        result['roles'] = {}
+        return result
+
+    try:
+        with get_session() as session:
+            roles = (session.query(Role)
+                     .filter(Role.id.in_(ids))
+                     .all())
+            result['roles'] = {role.id: role for role in roles}
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
 def delete_role(role_id):
     """ delete role in database
     parameters :
@@ -181,12 +227,14 @@ def delete_role(role_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
             rows_affected = (session.query(Role)
                              .filter(Role.id == role_id)
                              .delete())
             session.commit()
+            entity_cache.invalidate_entity(Role, role_id)
+            user_role_cache.invalidate()
 
             if rows_affected == 0:
                 result['status'] = "ko"
@@ -198,3 +246,6 @@ def delete_role(role_id):
         result['error'] = e
 
     return result
+
+
+instrument_module(__name__)
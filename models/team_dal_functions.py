@@ -3,11 +3,23 @@
 
 from sqlalchemy import exc
 
-from db import (session_maker,
+from db import (get_session,
                 DB_RECORD_NOT_FOUND,
                 DB_TEAM_NOT_EMPTY,
                 )
 from models.user_models import Team
+from models.dal_tools import (cached_by_id,
+                              entity_cache,
+                              update_by_id,
+                              user_role_cache,
+                              )
+from models.dal_metrics import instrument_module
+
+# columns modified by update_team, active is modified by
+# activate_team / deactivate_team
+TEAM_UPDATE_FIELDS = ['name',
+                      'role_id',
+                      ]
 
 
 def create_team(team_dict):
@@ -28,7 +40,7 @@ def create_team(team_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             session.add(team)
             session.commit()
             result['team_id'] = team.id
@@ -55,24 +67,22 @@ def update_team(team_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-
-            team = (session.query(Team)
-                    .filter(Team.id == team_dict['id'])
-                    .first())
-
-            if team is not None:
-                if 'name' in team_dict:
-                    team.name = team_dict['name']
-                if 'role_id' in team_dict:
-                    team.role_id = team_dict['role_id']
+        with get_session() as session:
 
-                session.commit()
+            values = {field: team_dict[field]
+                      for field in TEAM_UPDATE_FIELDS
+                      if field in team_dict}
+            rows_affected = update_by_id(session, Team, team_dict['id'],
+                                         values)
 
-                result['team_id'] = team.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Team, team_dict['id'])
+                user_role_cache.invalidate()
+                result['team_id'] = team_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -93,18 +103,20 @@ def activate_team(team_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            team = (session.query(Team)
-                    .filter(Team.id == team_id)
-                    .first())
-            if team is not None:
-                team.activate()
-                session.commit()
-                result['team_id'] = team.id
-            else:
+            values = {'active': True}
+            rows_affected = update_by_id(session, Team, team_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Team, team_id)
+                user_role_cache.invalidate()
+                result['team_id'] = team_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -124,18 +136,20 @@ def deactivate_team(team_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            team = (session.query(Team)
-                    .filter(Team.id == team_id)
-                    .first())
-            if team is not None:
-                team.deactivate()
-                session.commit()
-                result['team_id'] = team.id
-            else:
+            values = {'active': False}
+            rows_affected = update_by_id(session, Team, team_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(Team, team_id)
+                user_role_cache.invalidate()
+                result['team_id'] = team_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -143,6 +157,7 @@ def deactivate_team(team_id):
     return result
 
 
+@cached_by_id(Team, 'team')
 def get_team_by_id(team_id):
     """
     parameters :
@@ -155,7 +170,7 @@ def get_team_by_id(team_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
             team = (session.query(Team)
                     .filter(Team.id == team_id)
@@ -172,6 +187,36 @@ def get_team_by_id(team_id):
     return result
 
 
+def get_teams_by_ids(team_ids):
+    """ retrieve teams in database from a list of ids with one query
+    parameters :
+    team_ids : list of team ids
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'teams': dictionnary of team objects keyed by id (if status == ok),
+              ids not found in database are not in the dictionnary
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    ids = set(team_ids)
+    if not ids:
+        result['teams'] = {}
+        return result
+
+    try:
+        with get_session() as session:
+            teams = (session.query(Team)
+                     .filter(Team.id.in_(ids))
+                     .all())
+            result['teams'] = {team.id: team for team in teams}
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
 def get_all_teams():
     """ retrieve all teams in database
     parameters :
@@ -183,7 +228,7 @@ def get_all_teams():
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             teams = session.query(Team).all()
             if teams is not None:
                 result['teams'] = teams
@@ -211,7 +256,7 @@ def delete_team(team_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
             team = (session.query(Team)
                     .filter(Team.id == team_id)
@@ -222,6 +267,8 @@ def delete_team(team_id):
                                  .filter(Team.id == team_id)
                                  .delete())
                 session.commit()
+                entity_cache.invalidate_entity(Team, team_id)
+                user_role_cache.invalidate()
 
                 if rows_affected == 0:
                     result['status'] = "ko"
@@ -237,3 +284,6 @@ def delete_team(team_id):
         result['error'] = e
 
     return result
+
+
+instrument_module(__name__)
@@ -1,13 +1,47 @@
 # define Data Layer Access functions for the User class
 # created in the user_models package
 
-from argon2 import PasswordHasher
-from sqlalchemy import exc
-
-from db import (session_maker,
-                DB_RECORD_NOT_FOUND
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import exc, or_, select
+
+from db import (get_session,
+                DB_RECORD_NOT_FOUND,
+                DB_DUPLICATE_USER,
+                DB_MISSING_USER_FIELD,
+                DB_TEAM_NOT_FOUND,
                 )
-from models.user_models import User
+from models.dal_tools import (cached_by_id,
+                              entity_cache,
+                              paginate,
+                              update_by_id,
+                              user_role_cache,
+                              )
+from models.user_models import User, Team, Role, hash_password
+from models.dal_metrics import instrument_module
+
+# under this number of users the passwords are hashed in the process,
+# starting the worker processes would cost more than the hashing
+BULK_HASH_MIN_USERS = 8
+
+# mandatory data of the users created by create_users,
+# team_id is optional
+USER_FIELDS = ['employee_number', 'first_name', 'last_name', 'email',
+               'password', 'active']
+
+# columns modified by update_user, active is modified by
+# activate_user / deactivate_user
+USER_UPDATE_FIELDS = ['employee_number',
+                      'first_name',
+                      'last_name',
+                      'email',
+                      'team_id',
+                      ]
+# row of the user administration screen, with the names of the team
+# and of the role of the user (None if the user has no team)
+UserRow = namedtuple('UserRow',
+                     ['id', 'employee_number', 'first_name', 'last_name',
+                      'email', 'team_name', 'role_name'])
 
 
 def create_user(user_dict):
@@ -33,7 +67,7 @@ def create_user(user_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             session.add(user)
             session.commit()
             result['user_id'] = user.id
@@ -45,6 +79,127 @@ def create_user(user_dict):
     return result
 
 
+def hash_passwords(passwords, max_workers=None):
+    """ hash a list of passwords
+    the hashing is spread over a pool of processes (one per core
+    by default) for long lists
+    parameters :
+    passwords : list of passwords
+    max_workers : number of processes, None for the number of cores
+    returns list of hashes in the order of the passwords
+    """
+    if len(passwords) < BULK_HASH_MIN_USERS or max_workers == 1:
+        return [hash_password(password) for password in passwords]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(hash_password, passwords))
+
+
+def create_users(user_dicts, max_workers=None):
+    """ create several users in database in one transaction
+    passwords are hashed in parallel before the insertion
+    parameters :
+    user_dicts : list of dictionnaries with data for users to be created,
+                 same keys as for create_user (team_id is optional)
+    max_workers : number of hashing processes, None for the number of cores
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'users': one dictionnary per user_dict, in the same order, with keys
+             'status', 'user_id' (if created), 'error' (if refused : missing
+             data, duplicate or unknown team, checked before the hashing)
+             (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    users_result = [{'status': "ok"} for user_dict in user_dicts]
+
+    # users with missing data are refused before the database is read
+    checked = []
+    for index, user_dict in enumerate(user_dicts):
+        missing = [field for field in USER_FIELDS
+                   if user_dict.get(field) is None]
+        if missing:
+            users_result[index]['status'] = "ko"
+            users_result[index]['error'] = (DB_MISSING_USER_FIELD
+                                            + ', '.join(missing))
+        else:
+            checked.append(index)
+
+    # users already in database or twice in the list are refused,
+    # as the users of an unknown team
+    emails = [user_dicts[index]['email'] for index in checked]
+    employee_numbers = [user_dicts[index]['employee_number']
+                        for index in checked]
+    team_ids = {user_dicts[index].get('team_id') for index in checked}
+    try:
+        with get_session() as session:
+            existing = (session.query(User.email, User.employee_number)
+                        .filter(or_(User.email.in_(emails),
+                                    User.employee_number.in_(
+                                        employee_numbers)))
+                        .all())
+            known_team_ids = set(session.scalars(
+                select(Team.id).where(Team.id.in_(team_ids))))
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+        return result
+
+    used_emails = {row.email for row in existing}
+    used_employee_numbers = {row.employee_number for row in existing}
+
+    accepted = []
+    for index in checked:
+        user_dict = user_dicts[index]
+        if (user_dict['email'] in used_emails
+                or user_dict['employee_number'] in used_employee_numbers):
+            users_result[index]['status'] = "ko"
+            users_result[index]['error'] = DB_DUPLICATE_USER
+        elif (user_dict.get('team_id') is not None
+              and user_dict['team_id'] not in known_team_ids):
+            users_result[index]['status'] = "ko"
+            users_result[index]['error'] = DB_TEAM_NOT_FOUND
+        else:
+            used_emails.add(user_dict['email'])
+            used_employee_numbers.add(user_dict['employee_number'])
+            accepted.append(index)
+
+    hashes = hash_passwords([user_dicts[index]['password']
+                             for index in accepted],
+                            max_workers)
+
+    users = []
+    for index, password_hash in zip(accepted, hashes):
+        user_dict = user_dicts[index]
+        users.append(User(employee_number=user_dict['employee_number'],
+                          first_name=user_dict['first_name'],
+                          last_name=user_dict['last_name'],
+                          email=user_dict['email'],
+                          password=password_hash,
+                          active=user_dict['active'],
+                          team_id=user_dict.get('team_id'),
+                          hashed=True
+                          ))
+
+    try:
+        with get_session() as session:
+            session.add_all(users)
+            # ids read before the commit expires the users
+            session.flush()
+            for index, user in zip(accepted, users):
+                users_result[index]['user_id'] = user.id
+            session.commit()
+
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+        return result
+
+    result['users'] = users_result
+    return result
+
+
 def update_user(user_dict):
     """ update user in database
     not to be used for the "active" or "password" fields
@@ -61,30 +216,22 @@ def update_user(user_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            user = (session.query(User)
-                    .filter(User.id == user_dict['id'])
-                    .first())
+            values = {field: user_dict[field]
+                      for field in USER_UPDATE_FIELDS
+                      if field in user_dict}
+            rows_affected = update_by_id(session, User, user_dict['id'],
+                                         values)
 
-            if user is not None:
-                if 'employee_number' in user_dict:
-                    user.employee_number = user_dict['employee_number']
-                if 'first_name' in user_dict:
-                    user.first_name = user_dict['first_name']
-                if 'last_name' in user_dict:
-                    user.last_name = user_dict['last_name']
-                if 'email' in user_dict:
-                    user.email = user_dict['email']
-                if 'team_id' in user_dict:
-                    user.team_id = user_dict['team_id']
-
-                session.commit()
-
-                result['user_id'] = user.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(User, user_dict['id'])
+                user_role_cache.invalidate(int(user_dict['id']))
+                result['user_id'] = user_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -105,18 +252,20 @@ def deactivate_user(user_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            user = (session.query(User)
-                    .filter(User.id == user_id)
-                    .first())
-            if user is not None:
-                user.deactivate()
-                session.commit()
-                result['user_id'] = user.id
-            else:
+            values = {'active': False}
+            rows_affected = update_by_id(session, User, user_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(User, user_id)
+                user_role_cache.invalidate(int(user_id))
+                result['user_id'] = user_id
+
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
         result['error'] = e
@@ -136,18 +285,19 @@ def activate_user(user_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
 
-            user = (session.query(User)
-                    .filter(User.id == user_id)
-                    .first())
-            if user is not None:
-                user.activate()
-                session.commit()
-                result['user_id'] = user.id
-            else:
+            values = {'active': True}
+            rows_affected = update_by_id(session, User, user_id, values)
+
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(User, user_id)
+                user_role_cache.invalidate(int(user_id))
+                result['user_id'] = user_id
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -168,22 +318,19 @@ def update_user_password(user_dict):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-
-            user = (session.query(User)
-                    .filter(User.id == user_dict['id'])
-                    .first())
+        with get_session() as session:
 
-            if user is not None:
-                ph = PasswordHasher()
-                hash_password = ph.hash(user_dict['password'])
-                user.password = hash_password
-                session.commit()
+            values = {'password': hash_password(user_dict['password'])}
+            rows_affected = update_by_id(session, User, user_dict['id'],
+                                         values)
 
-                result['user_id'] = user.id
-            else:
+            if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
+            else:
+                session.commit()
+                entity_cache.invalidate_entity(User, user_dict['id'])
+                result['user_id'] = user_dict['id']
 
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -204,7 +351,7 @@ def get_user_by_email(email):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             user = (session.query(User)
                     .filter(User.email == email)
                     .first())
@@ -220,6 +367,7 @@ def get_user_by_email(email):
     return result
 
 
+@cached_by_id(User, 'user')
 def get_user_by_id(user_id):
     """ retrieve a user in database by id
     parameters :
@@ -232,7 +380,7 @@ def get_user_by_id(user_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             user = (session.query(User)
                     .filter(User.id == user_id)
                     .first())
@@ -248,6 +396,36 @@ def get_user_by_id(user_id):
     return result
 
 
+def get_users_by_ids(user_ids):
+    """ retrieve users in database from a list of ids with one query
+    parameters :
+    user_ids : list of user ids
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'users': dictionnary of user objects keyed by id (if status == ok),
+              ids not found in database are not in the dictionnary
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    ids = set(user_ids)
+    if not ids:
+        result['users'] = {}
+        return result
+
+    try:
+        with get_session() as session:
+            users = (session.query(User)
+                     .filter(User.id.in_(ids))
+                     .all())
+            result['users'] = {user.id: user for user in users}
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
 def get_user_by_employee_id(employee_number):
     """ retrieve a user in database by employee number
     parameters :
@@ -260,7 +438,7 @@ def get_user_by_employee_id(employee_number):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             user = (session.query(User)
                     .filter(User.employee_number == employee_number)
                     .first())
@@ -276,21 +454,30 @@ def get_user_by_employee_id(employee_number):
     return result
 
 
-def get_all_users():
+def get_all_users(page_size=None, after_id=None, before_id=None):
     """ retrieve all user in database
     parameters :
+    page_size : number of users in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
     returns result dictionnary with keys :
     'status': ok or ko
     'users': list of users object (if status == ok)
+    'page': page cursor data (if status == ok)
     'error': error details (if status == ko)
     """
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
-            users = session.query(User).all()
+        with get_session() as session:
+            query = session.query(User)
+            users, page = paginate(query,
+                                   User.id,
+                                   page_size,
+                                   after_id,
+                                   before_id)
             if users is not None:
                 result['users'] = users
+                result['page'] = page
             else:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
@@ -301,6 +488,46 @@ def get_all_users():
     return result
 
 
+def get_user_rows(page_size=None, after_id=None, before_id=None):
+    """ retrieve a page of the user administration screen as UserRow
+    tuples, the users are read with their team and role names in one
+    query joining users, teams and roles
+    parameters :
+    page_size : number of users in a page, None for all
+    after_id, before_id : page cursor (see dal_tools.paginate)
+    returns result dictionnary with keys :
+    'status': ok or ko
+    'users': UserRow tuples (if status == ok)
+    'page': page cursor data (if status == ok)
+    'error': error details (if status == ko)
+    """
+    result = {}
+    result['status'] = "ok"
+    try:
+        with get_session() as session:
+            query = (session.query(User.id,
+                                   User.employee_number,
+                                   User.first_name,
+                                   User.last_name,
+                                   User.email,
+                                   Team.name,
+                                   Role.name)
+                     .outerjoin(Team, User.team_id == Team.id)
+                     .outerjoin(Role, Team.role_id == Role.id))
+            users, page = paginate(query,
+                                   User.id,
+                                   page_size,
+                                   after_id,
+                                   before_id)
+            result['users'] = [UserRow._make(user) for user in users]
+            result['page'] = page
+    except exc.SQLAlchemyError as e:
+        result['status'] = "ko"
+        result['error'] = e
+
+    return result
+
+
 def delete_user(user_id):
     """ delete user in database
     parameters :
@@ -314,16 +541,18 @@ def delete_user(user_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             rows_affected = (session.query(User)
                              .filter(User.id == user_id)
                              .delete())
             session.commit()
+            entity_cache.invalidate_entity(User, user_id)
 
             if rows_affected == 0:
                 result['status'] = "ko"
                 result['error'] = DB_RECORD_NOT_FOUND
             else:
+                user_role_cache.invalidate(int(user_id))
                 result['user_id'] = user_id
     except exc.SQLAlchemyError as e:
         result['status'] = "ko"
@@ -345,7 +574,7 @@ def get_client_list_for_user(user_id):
     result = {}
     result['status'] = "ok"
     try:
-        with session_maker() as session:
+        with get_session() as session:
             user = (session.query(User)
                     .filter(User.id == user_id)
                     .first())
@@ -364,3 +593,6 @@ def get_client_list_for_user(user_id):
         result['error'] = e
 
     return result
+
+
+instrument_module(__name__)
@@ -1,3 +1,5 @@
+from dotenv import load_dotenv
+import os
 from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
 from argon2 import PasswordHasher
@@ -5,6 +7,25 @@ from argon2.exceptions import VerifyMismatchError
 from db import Base
 from .client_models import Client
 
+load_dotenv()
+
+# argon2 cost parameters, default values are the argon2-cffi ones
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# shared by all the password hashing and checking
+password_hasher = PasswordHasher(time_cost=ARGON2_TIME_COST,
+                                 memory_cost=ARGON2_MEMORY_COST,
+                                 parallelism=ARGON2_PARALLELISM)
+
+
+def hash_password(password):
+    """ hash a password with the shared hasher
+    module level function so it can be run in a worker process
+    """
+    return password_hasher.hash(password)
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -31,15 +52,18 @@ class User(Base):
                  email,
                  password,
                  team_id=None,
-                 active=True):
-
-        ph = PasswordHasher()
+                 active=True,
+                 hashed=False):
+        """ hashed : True if the password passed is already hashed """
 
         self.employee_number = employee_number
         self.first_name = first_name
         self.last_name = last_name
         self.email = email
-        self.password = ph.hash(password)
+        if hashed:
+            self.password = password
+        else:
+            self.password = hash_password(password)
         self.team_id = team_id
         self.active = active
 
@@ -47,11 +71,11 @@ class User(Base):
 
     def is_password_correct(self, input_password):
 
-        ph = PasswordHasher()
         result = False
 
         try:
-            result_verify = ph.verify(self.password, input_password)
+            result_verify = password_hasher.verify(self.password,
+                                                   input_password)
             if result_verify:
                 self.is_authenticated = True
                 result = True
@@ -64,6 +88,12 @@ class User(Base):
 
         return result
 
+    def password_needs_rehash(self):
+        """ True if the password was hashed with other cost parameters
+        than the current ones
+        """
+        return password_hasher.check_needs_rehash(self.password)
+
     def deactivate(self):
         self.active = False
 
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from benchmarks.filter_indexes import fill_database
+from db import (engine,
+                Base,
+                )
+
+# numbers of contracts (one event each) of the generated databases,
+# with a client for 10 contracts and a user for 1000 contracts (10 minimum)
+BENCHMARK_SIZES = [int(size) for size in
+                   os.getenv("BENCHMARK_SIZES",
+                             "1000,10000,100000").split(',')]
+
+# ratio of the contracts unsigned, unpaid or without support
+BENCHMARK_RATIO = 0.1
+
+
+def pytest_collection_modifyitems(config, items):
+    # the benchmarks fill the test database with up to 100k rows,
+    # they only run when asked for
+    if config.getoption('benchmark_only', default=False):
+        return
+    skip = pytest.mark.skip(
+        reason="benchmarks run with pytest-benchmark --benchmark-only")
+    directory = os.path.dirname(__file__)
+    for item in items:
+        if str(item.path).startswith(directory):
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope='package', params=BENCHMARK_SIZES,
+                ids=lambda size: f"{size}")
+def dataset(request):
+    """ test database filled with request.param contracts and events
+    returns dictionnary with keys size, users and clients (counts),
+    the user 1 is a commercial
+    """
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    user_count, client_count = fill_database(engine, request.param,
+                                             BENCHMARK_RATIO)
+    yield {'size': request.param,
+           'users': user_count,
+           'clients': client_count}
+    Base.metadata.drop_all(engine)
@@ -0,0 +1,26 @@
+# stubs running the screen controllers without terminal
+
+from controllers.controllers_functions import MC_EXIT
+
+
+class HeadlessScreen():
+    """ screen stub : nothing is displayed, the view setup is kept
+    and the same menu choice is returned by every screen
+    """
+
+    def __init__(self, choice=None):
+        self.choice = choice or [MC_EXIT]
+        self.displayed = 0
+        self.view_setup = None
+
+    def general(self, view_setup, tokens):
+        self.displayed += 1
+        self.view_setup = view_setup
+        return self.choice, tokens['access']
+
+
+class HeadlessAuthentication():
+    """ authentication stub accepting every token """
+
+    def check_token(self, token):
+        return {'status': 'ok', 'user_id': None}
@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import or_, select
+
+from controllers.general_cont import MainController
+from controllers.authorization_functions import (COMMERCIAL_ROLE,
+                                                 MANAGEMENT_ROLE,
+                                                 SUPPORT_ROLE,
+                                                 is_client_update_authorized,
+                                                 is_contract_update_authorized,
+                                                 is_event_update_authorized,
+                                                 update_authorized_ids,
+                                                 )
+from models.client_models import Client, Contract, Event
+from models.dal_tools import LIST_PAGE_SIZE, ownership_index
+from models.user_dal_functions import get_user_by_id
+from db import engine, unit_of_work
+from tests.benchmarks.headless import HeadlessAuthentication, HeadlessScreen
+
+# update checks of one row, called by the details screens
+UPDATE_CHECKS = {
+    'is_client_update_authorized': is_client_update_authorized,
+    'is_contract_update_authorized': is_contract_update_authorized,
+    'is_event_update_authorized': is_event_update_authorized,
+}
+
+# rows owned by the user, the commercial of the client (or the support
+# of the event), read without the ownership index to check the answers
+OWNED_ROWS = {
+    'is_client_update_authorized': lambda user_id: (
+        select(Client.id)
+        .where(Client.commercial_contact_id == user_id)),
+    'is_contract_update_authorized': lambda user_id: (
+        select(Contract.id)
+        .join(Client)
+        .where(Client.commercial_contact_id == user_id)),
+    'is_event_update_authorized': lambda user_id: (
+        select(Event.id)
+        .join(Contract)
+        .join(Client)
+        .where(or_(Client.commercial_contact_id == user_id,
+                   Event.support_contact_id == user_id))),
+}
+
+
+def is_owned(name, user_id, record_id):
+    """ True if the record is owned by the user, for the check name """
+    with engine.connect() as connection:
+        owned = connection.scalars(OWNED_ROWS[name](user_id)).all()
+    return record_id in owned
+
+
+def screen_action(screen, *args):
+    """ run a screen controller as MainController.run does """
+    with unit_of_work():
+        return screen(*args)
+
+
+class TestBenchControllers():
+
+    @pytest.mark.parametrize('user_role', [COMMERCIAL_ROLE, SUPPORT_ROLE])
+    def test_control_start(self, benchmark, dataset, user_role):
+        """
+        GIVEN a database of dataset['size'] contracts and events
+        WHEN the home screen of the user 1 is built, without display
+        THEN the dashboard data is given to the screen once by round
+        """
+        benchmark.extra_info['size'] = dataset['size']
+        screen = HeadlessScreen()
+        controller = MainController(screen, HeadlessAuthentication())
+        user = get_user_by_id(1)['user']
+
+        benchmark(screen_action, controller.control_start, user, user_role)
+
+        assert screen.displayed >= 1
+        assert 'clients' in screen.view_setup['body']['data']
+
+    @pytest.mark.parametrize('name', list(UPDATE_CHECKS))
+    def test_update_check_uncached(self, benchmark, dataset, name):
+        """
+        GIVEN an empty ownership index
+        WHEN a commercial update check is done on a row of the last page
+        THEN the answer is read from the database, True if the user owns
+        the row
+        """
+        benchmark.extra_info['size'] = dataset['size']
+        record_id = (dataset['clients']
+                     if name == 'is_client_update_authorized'
+                     else dataset['size'])
+
+        result = benchmark.pedantic(UPDATE_CHECKS[name],
+                                    args=(1, COMMERCIAL_ROLE, record_id),
+                                    setup=ownership_index.invalidate,
+                                    rounds=50)
+
+        assert result is is_owned(name, 1, record_id)
+
+    @pytest.mark.parametrize('user_role', [MANAGEMENT_ROLE,
+                                           COMMERCIAL_ROLE,
+                                           SUPPORT_ROLE])
+    def test_update_authorized_ids(self, benchmark, dataset, user_role):
+        """
+        GIVEN an empty ownership index
+        WHEN the update rights of a list screen page are checked
+        THEN the ids the role can update are returned
+        """
+        benchmark.extra_info['size'] = dataset['size']
+        ids = list(range(1, LIST_PAGE_SIZE + 1))
+
+        result = benchmark.pedantic(update_authorized_ids,
+                                    args=(1, user_role, ids, ids, ids),
+                                    setup=ownership_index.invalidate,
+                                    rounds=50)
+
+        assert set(result) >= {'client_ids', 'contract_ids', 'event_ids'}
@@ -0,0 +1,106 @@
+import pytest
+
+from controllers.authorization_functions import COMMERCIAL_ROLE
+from models.dal_tools import LIST_PAGE_SIZE, user_role_cache
+from models.general_dal_functions import get_user_role
+from models.user_dal_functions import get_client_list_for_user
+import models.client_dal_functions as dalc
+import models.contract_dal_functions as dalo
+import models.event_dal_functions as dale
+import models.team_dal_functions as dalt
+import models.user_dal_functions as dalu
+
+# functions of the list screens : whole list and first page
+LIST_FUNCTIONS = {
+    'get_all_clients': dalc.get_all_clients,
+    'get_all_contracts': dalo.get_all_contracts,
+    'get_all_events': dale.get_all_events,
+    'get_all_users': dalu.get_all_users,
+    'get_client_rows': dalc.get_client_rows,
+    'get_contract_rows': dalo.get_contract_rows,
+    'get_event_rows': dale.get_event_rows,
+    'get_user_rows': dalu.get_user_rows,
+}
+
+
+class TestBenchDal():
+
+    @pytest.mark.parametrize('name', list(LIST_FUNCTIONS))
+    def test_list_whole(self, benchmark, dataset, name):
+        """
+        GIVEN a database of dataset['size'] contracts and events
+        WHEN a list function reads the whole list
+        THEN every row is returned
+        """
+        benchmark.group = f"{name} whole list"
+        benchmark.extra_info['size'] = dataset['size']
+
+        result = benchmark(LIST_FUNCTIONS[name])
+
+        assert result['status'] == "ok"
+
+    @pytest.mark.parametrize('name', list(LIST_FUNCTIONS))
+    def test_list_page(self, benchmark, dataset, name):
+        """
+        GIVEN a database of dataset['size'] contracts and events
+        WHEN a list function reads the first page of a list screen
+        THEN LIST_PAGE_SIZE rows at most are returned
+        """
+        benchmark.group = f"{name} first page"
+        benchmark.extra_info['size'] = dataset['size']
+
+        result = benchmark(LIST_FUNCTIONS[name], page_size=LIST_PAGE_SIZE)
+
+        assert result['status'] == "ok"
+        assert result['page']['first_id'] is not None
+
+    def test_get_all_teams(self, benchmark, dataset):
+        """
+        GIVEN a database of dataset['size'] contracts and events
+        WHEN you call get_all_teams
+        THEN the team of the generated users is returned
+        """
+        benchmark.extra_info['size'] = dataset['size']
+
+        result = benchmark(dalt.get_all_teams)
+
+        assert result['status'] == "ok"
+
+    def test_get_client_list_for_user(self, benchmark, dataset):
+        """
+        GIVEN a database of dataset['size'] contracts and events
+        WHEN you call get_client_list_for_user for the user 1
+        THEN the clients of the user are returned
+        """
+        benchmark.extra_info['size'] = dataset['size']
+
+        result = benchmark(get_client_list_for_user, 1)
+
+        assert result['status'] == "ok"
+
+    def test_get_user_role_uncached(self, benchmark, dataset):
+        """
+        GIVEN an empty user role cache
+        WHEN you call get_user_role for the user 1
+        THEN the role is read from the database
+        """
+        benchmark.extra_info['size'] = dataset['size']
+
+        result = benchmark.pedantic(get_user_role, args=(1,),
+                                    setup=user_role_cache.invalidate,
+                                    rounds=50)
+
+        assert result['user_role'] == COMMERCIAL_ROLE
+
+    def test_get_user_role_cached(self, benchmark, dataset):
+        """
+        GIVEN the role of the user 1 in the user role cache
+        WHEN you call get_user_role for the user 1
+        THEN the role is read from the cache
+        """
+        benchmark.extra_info['size'] = dataset['size']
+        get_user_role(1)
+
+        result = benchmark(get_user_role, 1)
+
+        assert result['user_role'] == COMMERCIAL_ROLE
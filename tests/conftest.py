@@ -1,7 +1,24 @@
+import os
 import pytest
 from datetime import datetime
 from models.client_models import CONTRACT_STATUS
 
+# regression beyond which a benchmark run with --benchmark-compare fails,
+# when --benchmark-compare-fail is not given (empty to disable)
+BENCHMARK_THRESHOLD = os.getenv("BENCHMARK_THRESHOLD", "mean:25%")
+
+
+def pytest_configure(config):
+    # loaded before the pytest-benchmark configuration, which reads
+    # the compare fail option when its session is created
+    if (config.getoption('benchmark_compare', default=None)
+            and not config.getoption('benchmark_compare_fail', default=None)
+            and BENCHMARK_THRESHOLD):
+        from pytest_benchmark.utils import parse_compare_fail
+        config.option.benchmark_compare_fail = [
+            parse_compare_fail(threshold)
+            for threshold in BENCHMARK_THRESHOLD.split(',')]
+
 
 class ValueStorage():
     user_id = None
@@ -1,3 +1,4 @@
+from argon2 import PasswordHasher
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import jwt
@@ -7,11 +8,15 @@ from sqlalchemy.orm import sessionmaker
 from ..conftest import ValueStorage
 
 from authentication.auth_models import (AuthenticationManager,
+                                        FileTokenStore,
+                                        MemoryTokenStore,
+                                        create_token_store,
                                         INVALID_TOKEN,
                                         INVALID_PASSWORD)
 from db import engine, Base
 from models.user_dal_functions import (create_user,
                                        get_user_by_id)
+from models.user_models import User
 
 load_dotenv()
 
@@ -105,6 +110,29 @@ class TestAuthentication():
         assert result['status'] == "ko"
         assert result['error'] == INVALID_PASSWORD
 
+    def test_password_authentication_rehash(self, user_fix):
+        """
+        GIVEN a password hashed with other cost parameters
+        WHEN you call password_authentication with the correct password
+        THEN the password is hashed again with the current parameters
+        """
+        old_hasher = PasswordHasher(time_cost=1, memory_cost=8192)
+        user = (self.session.query(User)
+                .filter(User.id == ValueStorage.user_id)
+                .first())
+        user.password = old_hasher.hash(user_fix['password'])
+        self.session.commit()
+
+        result = self.auth.password_authentication(user_fix['email'],
+                                                   user_fix['password'])
+
+        assert result['status'] == "ok"
+
+        user = get_user_by_id(ValueStorage.user_id)['user']
+
+        assert not user.password_needs_rehash()
+        assert user.is_password_correct(user_fix['password'])
+
     def test_request_token_with_refresh(self):
         """
         GIVEN a refresh_token
@@ -216,3 +244,80 @@ class TestAuthentication():
 
         assert result['status'] == 'ko'
         assert result['error'] == INVALID_TOKEN
+
+    def test_check_token_cached(self):
+        """
+        GIVEN an access_token already checked
+        WHEN you call check_token again
+        THEN the cached claims are used
+        """
+        user_id = 2
+
+        access_token = self.auth.create_tokens(user_id)['access']
+        self.auth.check_token(access_token)
+
+        assert access_token in self.auth.claims_cache
+
+        self.auth.claims_cache[access_token]['user_id'] = 3
+        result = self.auth.check_token(access_token)
+
+        assert result['status'] == 'ok'
+        assert result['user_id'] == 3
+
+    def test_check_token_cached_expired(self):
+        """
+        GIVEN an access_token cached with a past expiration
+        WHEN you call check_token
+        THEN the status ko and the error are returned
+        """
+        user_id = 2
+
+        access_payload = {
+            'user_id': user_id,
+            'type': 'access',
+            'exp': datetime.utcnow() - timedelta(minutes=5)
+            }
+
+        access_token = jwt.encode(payload=access_payload,
+                                  key=SECRET_KEY,
+                                  algorithm="HS256")
+        self.auth.claims_cache[access_token] = jwt.decode(
+            jwt=access_token,
+            key=SECRET_KEY,
+            algorithms=["HS256"],
+            options={'verify_exp': False})
+
+        result = self.auth.check_token(access_token)
+
+        assert result['status'] == 'ko'
+        assert result['error'] == INVALID_TOKEN
+        assert access_token not in self.auth.claims_cache
+
+    def test_memory_token_store(self):
+        """
+        GIVEN the default authentication manager
+        WHEN you save tokens
+        THEN they are read back from memory
+        """
+        auth = AuthenticationManager(create_token_store('memory'))
+        tokens = auth.create_tokens(2)
+
+        auth.save_tokens(tokens)
+
+        assert isinstance(auth.token_store, MemoryTokenStore)
+        assert auth.get_tokens() == tokens
+
+    def test_file_token_store(self, tmp_path):
+        """
+        GIVEN an authentication manager with a file token store
+        WHEN you save tokens
+        THEN they are read back from the file
+        """
+        filename = str(tmp_path / 'tokens' / 'tokens.json')
+        auth = AuthenticationManager(FileTokenStore(filename))
+        tokens = auth.create_tokens(2)
+
+        auth.save_tokens(tokens)
+
+        assert os.path.exists(filename)
+        assert auth.get_tokens() == tokens
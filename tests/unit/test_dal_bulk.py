@@ -0,0 +1,136 @@
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client, Contract, Event
+import models.client_dal_functions as dalc
+import models.contract_dal_functions as dalo
+import models.event_dal_functions as dale
+from db import (engine,
+                Base,
+                )
+
+
+class TestDalBulk():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        user = User(employee_number=1,
+                    first_name="first name",
+                    last_name="last name",
+                    email="bulk@email.com",
+                    password="password",
+                    active=True,
+                    team_id=None
+                    )
+        cls.session.add(user)
+        cls.session.commit()
+        cls.user_id = user.id
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def client_dicts(self, client_fix, count):
+        client_dicts = []
+        for number in range(count):
+            client_dict = dict(client_fix)
+            client_dict['email'] = f"client{number}@email.com"
+            client_dict['commercial_contact_id'] = self.user_id
+            client_dicts.append(client_dict)
+        return client_dicts
+
+    def test_bulk_create_clients(self, client_fix):
+        """
+        GIVEN 5 client dictionnaries
+        WHEN you call dal.bulk_create_clients by batches of 2 clients
+        THEN the 5 clients are created in 3 batches
+        """
+        client_dicts = self.client_dicts(client_fix, 5)
+
+        result = dalc.bulk_create_clients(iter(client_dicts), batch_size=2)
+
+        assert result['status'] == "ok"
+        assert result['row_count'] == 5
+        assert [batch['row_count'] for batch in result['batches']] == [2, 2, 1]
+        clients = (self.session.query(Client)
+                   .filter(Client.email.like('client%@email.com'))
+                   .all())
+        assert len(clients) == 5
+        assert all(client.creation_date for client in clients)
+
+    def test_bulk_create_clients_with_error(self, client_fix):
+        """
+        GIVEN 3 client dictionnaries, the last one with an email in database
+        WHEN you call dal.bulk_create_clients by batches of 2 clients
+        THEN the first batch is created and the second one is refused
+        """
+        client_dicts = self.client_dicts(client_fix, 3)
+        for number, client_dict in enumerate(client_dicts[:2]):
+            client_dict['email'] = f"new{number}@email.com"
+
+        result = dalc.bulk_create_clients(client_dicts, batch_size=2)
+
+        assert result['status'] == "ko"
+        assert result['error']
+        assert result['row_count'] == 2
+        assert result['batches'][0]['status'] == "ok"
+        assert result['batches'][1]['status'] == "ko"
+
+    def test_bulk_upsert_clients(self, client_fix):
+        """
+        GIVEN 2 client dictionnaries, one with an email in database
+        WHEN you call dal.bulk_upsert_clients
+        THEN the existing client is updated and the other one is created
+        """
+        client_dicts = self.client_dicts(client_fix, 1)
+        client_dicts[0]['enterprise'] = "upserted enterprise"
+        client_dicts.append(dict(client_dicts[0],
+                                 email="upsert@email.com"))
+
+        result = dalc.bulk_upsert_clients(client_dicts)
+
+        assert result['status'] == "ok"
+        self.session.expire_all()
+        clients = (self.session.query(Client)
+                   .filter(Client.enterprise == "upserted enterprise")
+                   .order_by(Client.id)
+                   .all())
+        assert [client.email for client in clients] == ["client0@email.com",
+                                                        "upsert@email.com"]
+        assert clients[0].last_update is not None
+        assert clients[1].last_update is None
+
+    def test_bulk_contracts_and_events(self, contract_fix, event_fix):
+        """
+        GIVEN contract and event dictionnaries
+        WHEN you call dal.bulk_create_* then dal.bulk_upsert_* with their id
+        THEN the rows are created then updated
+        """
+        client = self.session.query(Client).first()
+        contract_fix['client_id'] = client.id
+
+        result = dalo.bulk_create_contracts([contract_fix] * 3)
+        assert result['status'] == "ok"
+        contract = self.session.query(Contract).first()
+
+        event_fix['contract_id'] = contract.id
+        result = dale.bulk_create_events([event_fix] * 3)
+        assert result['status'] == "ok"
+        event = self.session.query(Event).first()
+
+        result = dalo.bulk_upsert_contracts([dict(contract_fix,
+                                                  id=contract.id,
+                                                  amount_unpaid=0)])
+        assert result['status'] == "ok"
+        result = dale.bulk_upsert_events([dict(event_fix,
+                                               id=event.id,
+                                               title="upserted event")])
+        assert result['status'] == "ok"
+
+        self.session.expire_all()
+        assert self.session.get(Contract, contract.id).amount_unpaid == 0
+        assert self.session.get(Event, event.id).title == "upserted event"
+        assert self.session.query(Contract).count() == 3
+        assert self.session.query(Event).count() == 3
@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 
 from models.user_models import User
@@ -91,6 +92,39 @@ class TestDalClient():
 
         assert client.first_name == new_name
 
+    def test_update_client_single_statement(self, client_fix):
+        """
+        GIVEN an existing client
+        WHEN you call dal.update_client
+        THEN only one UPDATE statement is run, without SELECT,
+             and the last_update column is set
+        """
+        statements = []
+
+        def count_statements(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        client_dict = {'id': ValueStorage.client_id,
+                       'enterprise': client_fix['enterprise'] + " mod"}
+
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            result = dal.update_client(client_dict)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        assert result['status'] == "ok"
+        assert len(statements) == 1
+        assert statements[0].startswith('UPDATE')
+
+        self.session.commit()
+        client = (self.session.query(Client)
+                  .filter(Client.id == ValueStorage.client_id)
+                  .first())
+
+        assert client.enterprise == client_dict['enterprise']
+        assert client.last_update is not None
+
     def test_update_client_with_error(self, client_fix):
         """
         GIVEN a dictionnary with the needed data
@@ -211,6 +245,32 @@ class TestDalClient():
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
 
+    def test_get_clients_by_ids(self):
+        """
+        GIVEN a list of client ids
+        WHEN you call dal.get_clients_by_ids using the list
+        THEN the status and the clients keyed by id are returned
+             unknown ids are ignored
+        """
+        client_id = ValueStorage.client_id
+
+        result = dal.get_clients_by_ids([client_id, 999])
+
+        assert result['status'] == "ok"
+        assert list(result['clients']) == [client_id]
+        assert result['clients'][client_id].id == client_id
+
+    def test_get_clients_by_ids_empty(self):
+        """
+        GIVEN an empty list of ids
+        WHEN you call dal.get_clients_by_ids using the list
+        THEN the status ok and an empty dictionnary are returned
+        """
+        result = dal.get_clients_by_ids([])
+
+        assert result['status'] == "ok"
+        assert result['clients'] == {}
+
     def test_get_all_clients(self):
         """
         GIVEN a client_id
@@ -227,3 +287,16 @@ class TestDalClient():
 
         assert result['clients'][0].id == client.id
         assert result['clients'][0].first_name == client.first_name
+
+    def test_get_all_clients_paginated(self):
+        """
+        GIVEN a page size
+        WHEN you call dal.get_all_clients using the page size
+        THEN the status, clients and page information are returned
+        """
+        result = dal.get_all_clients(page_size=1)
+
+        assert result['status'] == "ok"
+        assert len(result['clients']) == 1
+        assert result['page']['has_previous'] is False
+        assert result['page']['last_id'] == result['clients'][0].id
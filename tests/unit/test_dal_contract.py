@@ -219,6 +219,32 @@ class TestDalContract():
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
 
+    def test_get_contracts_by_ids(self):
+        """
+        GIVEN a list of contract ids
+        WHEN you call dal.get_contracts_by_ids using the list
+        THEN the status and the contracts keyed by id are returned
+             unknown ids are ignored
+        """
+        contract_id = ValueStorage.contract_id
+
+        result = dal.get_contracts_by_ids([contract_id, 999])
+
+        assert result['status'] == "ok"
+        assert list(result['contracts']) == [contract_id]
+        assert result['contracts'][contract_id].id == contract_id
+
+    def test_get_contracts_by_ids_empty(self):
+        """
+        GIVEN an empty list of ids
+        WHEN you call dal.get_contracts_by_ids using the list
+        THEN the status ok and an empty dictionnary are returned
+        """
+        result = dal.get_contracts_by_ids([])
+
+        assert result['status'] == "ok"
+        assert result['contracts'] == {}
+
     def test_get_all_contracts(self):
         """
         GIVEN
@@ -0,0 +1,151 @@
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client, Contract, Event
+import models.dashboard_dal_functions as dal
+
+from db import (engine,
+                Base,
+                )
+from ..conftest import ValueStorage
+
+
+class QueryCounter():
+    """ count the statements sent to the database by the engine """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(engine, 'before_cursor_execute', self)
+        return self
+
+    def __exit__(self, *args):
+        event.remove(engine, 'before_cursor_execute', self)
+
+
+class TestDalDashboard():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def add_client_with_contracts(self, index, user_id, nb_contracts):
+        client = Client(first_name='first name ' + str(index),
+                        last_name='last name ' + str(index),
+                        email='client' + str(index) + '@email.com',
+                        telephone='0612345678',
+                        enterprise='enterprise',
+                        commercial_contact_id=user_id,
+                        active=True)
+        self.session.add(client)
+        self.session.flush()
+        for _ in range(nb_contracts):
+            contract = Contract(client_id=client.id,
+                                total_amount=1000,
+                                amount_unpaid=100,
+                                status='signé',
+                                active=True)
+            self.session.add(contract)
+            self.session.flush()
+            event_db = Event(title='event',
+                             contract_id=contract.id,
+                             start_date=client.creation_date,
+                             end_date=client.creation_date,
+                             support_contact_id=user_id,
+                             location='somewhere',
+                             attendees=10,
+                             active=True)
+            self.session.add(event_db)
+        self.session.commit()
+
+    def test_initialisation(self, user_fix):
+        """
+        Create a user with one client, contract and event
+        """
+        user = User(employee_number=user_fix['employee_number'],
+                    first_name=user_fix['first_name'],
+                    last_name=user_fix['last_name'],
+                    email=user_fix['email'],
+                    password=user_fix['password'],
+                    active=user_fix['active'],
+                    team_id=user_fix['team_id']
+                    )
+        self.session.add(user)
+        self.session.commit()
+        ValueStorage.user_id = user.id
+
+        self.add_client_with_contracts(0, user.id, 1)
+
+    def test_get_dashboard_data(self):
+        """
+        GIVEN a user id
+        WHEN you call dal.get_dashboard_data using the id
+        THEN the clients, contracts and events of the user are returned
+             and the status ok is returned
+        """
+        result = dal.get_dashboard_data(ValueStorage.user_id)
+
+        assert result['status'] == "ok"
+        assert len(result['clients']) == 1
+        assert len(result['contracts']) == 1
+        assert len(result['events']) == 1
+        assert result['contracts'][0].client_id == result['clients'][0].id
+        assert result['events'][0].contract_id == result['contracts'][0].id
+
+    def test_get_dashboard_data_supported_events(self):
+        """
+        GIVEN a user id
+        WHEN you call dal.get_dashboard_data for supported events
+        THEN the events supported by the user are returned
+        """
+        result = dal.get_dashboard_data(ValueStorage.user_id,
+                                        supported_events=True)
+
+        assert result['status'] == "ok"
+        assert len(result['events']) == 1
+
+    def test_get_dashboard_data_query_count(self):
+        """
+        GIVEN a user id
+        WHEN the number of clients, contracts and events grows
+        THEN dal.get_dashboard_data issues the same number of queries
+        """
+        with QueryCounter() as counter:
+            dal.get_dashboard_data(ValueStorage.user_id)
+        small_count = counter.count
+
+        for index in range(1, 21):
+            self.add_client_with_contracts(index, ValueStorage.user_id, 3)
+
+        with QueryCounter() as counter:
+            result = dal.get_dashboard_data(ValueStorage.user_id)
+        large_count = counter.count
+
+        assert len(result['clients']) == 21
+        assert len(result['contracts']) == 61
+        assert len(result['events']) == 61
+        assert small_count == large_count
+        assert large_count <= 3
+
+    def test_get_dashboard_data_unknown_user(self):
+        """
+        GIVEN a user id not in database
+        WHEN you call dal.get_dashboard_data using the id
+        THEN empty lists are returned and the status ok is returned
+        """
+        result = dal.get_dashboard_data(999)
+
+        assert result['status'] == "ok"
+        assert result['clients'] == []
+        assert result['contracts'] == []
+        assert result['events'] == []
@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 
 from models.user_models import User
@@ -123,6 +124,8 @@ class TestDalDelete():
 
         assert result['status'] == "ok"
         assert result['contract_id'] == ValueStorage.contract_id
+        # event deleted in test_delete_event
+        assert result['events_deleted'] == 0
 
         self.session.commit()
 
@@ -249,6 +252,8 @@ class TestDalDelete():
 
         assert result['status'] == "ok"
         assert result['client_id'] == ValueStorage.client_id
+        assert result['contracts_deleted'] == 1
+        assert result['events_deleted'] == 1
 
         self.session.commit()
 
@@ -272,3 +277,43 @@ class TestDalDelete():
                  .first())
 
         assert event is None
+
+    def test_client_large_delete(self,
+                                 event_fix,
+                                 client_fix,
+                                 contract_fix):
+        """
+        GIVEN a client with several contracts and events
+        WHEN you call dal.delete_client using the id
+        THEN everything is deleted with one statement per table
+             and the counts are returned
+        """
+        client_fix['commercial_contact_id'] = ValueStorage.user_id
+        client_id = dalc.create_client(client_fix)['client_id']
+        contract_fix['client_id'] = client_id
+        for contract_number in range(3):
+            contract_id = dalo.create_contract(contract_fix)['contract_id']
+            event_fix['contract_id'] = contract_id
+            for event_number in range(2):
+                dale.create_event(event_fix)
+
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            result = dalc.delete_client(client_id)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+
+        assert result['status'] == "ok"
+        assert result['contracts_deleted'] == 3
+        assert result['events_deleted'] == 6
+        assert len([statement for statement in statements
+                    if statement.startswith('DELETE')]) == 3
+        assert (self.session.query(Event)
+                .join(Contract)
+                .filter(Contract.client_id == client_id)
+                .count()) == 0
@@ -227,6 +227,32 @@ class TestDalEvent():
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
 
+    def test_get_events_by_ids(self):
+        """
+        GIVEN a list of event ids
+        WHEN you call dal.get_events_by_ids using the list
+        THEN the status and the events keyed by id are returned
+             unknown ids are ignored
+        """
+        event_id = ValueStorage.event_id
+
+        result = dal.get_events_by_ids([event_id, 999])
+
+        assert result['status'] == "ok"
+        assert list(result['events']) == [event_id]
+        assert result['events'][event_id].id == event_id
+
+    def test_get_events_by_ids_empty(self):
+        """
+        GIVEN an empty list of ids
+        WHEN you call dal.get_events_by_ids using the list
+        THEN the status ok and an empty dictionnary are returned
+        """
+        result = dal.get_events_by_ids([])
+
+        assert result['status'] == "ok"
+        assert result['events'] == {}
+
     def test_get_all_events(self):
         """
         GIVEN
@@ -1,7 +1,11 @@
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 
 from models.user_models import User, Role, Team
+from models.dal_tools import user_role_cache
 import models.general_dal_functions as dal
+import models.role_dal_functions as dalr
+import models.user_dal_functions as dalu
 
 from db import (engine,
                 Base,
@@ -16,6 +20,7 @@ class TestDalDelete():
         Base.metadata.create_all(engine)
         Session = sessionmaker(bind=engine)
         cls.session = Session()
+        user_role_cache.invalidate()
 
     def teardown_class(self):
         self.session.close()
@@ -82,3 +87,61 @@ class TestDalDelete():
 
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
+
+    def test_get_user_role_cached(self, role_fix):
+        """
+        GIVEN a user_id whose role was already read
+        WHEN you call dal.get_user_role using the id
+        THEN the role is returned without any query
+        """
+        user_id = ValueStorage.user_id
+        dal.get_user_role(user_id)
+
+        statements = []
+
+        def count(*args):
+            statements.append(args)
+
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            result = dal.get_user_role(user_id)
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+
+        assert result['status'] == "ok"
+        assert result['user_role'] == role_fix['name']
+        assert statements == []
+
+    def test_get_user_role_invalidated(self):
+        """
+        GIVEN a user_id whose role was already read
+        WHEN the role name is updated
+        THEN dal.get_user_role returns the new role name
+        """
+        user_id = ValueStorage.user_id
+        dal.get_user_role(user_id)
+
+        user = (self.session.query(User)
+                .filter(User.id == user_id)
+                .first())
+        team = (self.session.query(Team)
+                .filter(Team.id == user.team_id)
+                .first())
+        dalr.update_role({'id': team.role_id, 'name': "new role"})
+
+        result = dal.get_user_role(user_id)
+
+        assert result['user_role'] == "new role"
+
+    def test_get_user_role_invalidated_by_user_update(self):
+        """
+        GIVEN a user_id whose role was already read
+        WHEN the user is updated
+        THEN the user role is removed from the cache
+        """
+        user_id = ValueStorage.user_id
+        dal.get_user_role(user_id)
+
+        dalu.update_user({'id': str(user_id), 'first_name': "new name"})
+
+        assert user_role_cache.get(user_id) is None
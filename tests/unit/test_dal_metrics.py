@@ -0,0 +1,135 @@
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client
+from models.dal_metrics import action, dal_metrics, Histogram
+import models.client_dal_functions as dalc
+from db import (engine,
+                Base,
+                )
+
+
+class TestDalMetrics():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        user = User(employee_number=1,
+                    first_name="first name",
+                    last_name="last name",
+                    email="metrics@email.com",
+                    password="password",
+                    active=True,
+                    team_id=None)
+        cls.session.add(user)
+        cls.session.commit()
+        for number in range(3):
+            cls.session.add(Client(first_name="client",
+                                   last_name="metrics",
+                                   email=f"client.metrics{number}@email.com",
+                                   telephone="0102030405",
+                                   enterprise="enterprise",
+                                   commercial_contact_id=user.id,
+                                   active=True))
+        cls.session.commit()
+
+    def teardown_class(self):
+        dal_metrics.reset()
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def setup_method(self, method):
+        dal_metrics.reset()
+
+    def test_function_statistics(self):
+        """
+        GIVEN 3 clients in database
+        WHEN you call get_all_clients twice and get_client_by_id on an
+             unknown id
+        THEN each function has its calls, queries, rows and errors
+        """
+        dalc.get_all_clients()
+        dalc.get_all_clients()
+        dalc.get_client_by_id(999)
+
+        functions = dal_metrics.snapshot()['functions']
+
+        all_clients = functions['client_dal_functions.get_all_clients']
+        assert all_clients['calls'] == 2
+        assert all_clients['queries'] == 2
+        assert all_clients['rows_read'] == 6
+        assert all_clients['errors'] == 0
+        assert all_clients['latency']['count'] == 2
+        by_id = functions['client_dal_functions.get_client_by_id']
+        assert by_id['errors'] == 1
+
+    def test_stream_statistics(self):
+        """
+        GIVEN 3 clients in database
+        WHEN you read stream_clients to the end
+        THEN the query and the 3 rows are recorded for stream_clients
+        """
+        rows = list(dalc.stream_clients(batch_size=2))
+
+        statistics = dal_metrics.snapshot()['functions'][
+            'client_dal_functions.stream_clients']
+        assert len(rows) == 3
+        assert statistics['calls'] == 1
+        assert statistics['queries'] == 1
+        assert statistics['rows_read'] == 3
+
+    def test_action_statistics(self):
+        """
+        GIVEN a controller action
+        WHEN the action updates a client and reads the client list
+        THEN the action has its queries, rows read and rows written
+        """
+        client_id = dalc.get_all_clients()['clients'][0].id
+
+        with action('control_client_list'):
+            dalc.update_client({'id': client_id,
+                                'telephone': "0607080910"})
+            dalc.get_all_clients()
+
+        statistics = dal_metrics.snapshot()['actions']['control_client_list']
+        assert statistics['calls'] == 1
+        assert statistics['queries'] >= 2
+        assert statistics['rows_written'] == 1
+        assert statistics['rows_read'] == 3
+
+    def test_dump(self, tmp_path):
+        """
+        GIVEN recorded statistics
+        WHEN you dump them
+        THEN the json file holds the statistics by function and by action
+        """
+        path = tmp_path / 'metrics.json'
+        dalc.get_all_clients()
+
+        dal_metrics.dump(str(path))
+
+        with open(path, encoding='utf-8') as file:
+            snapshot = json.load(file)
+        assert snapshot == dal_metrics.snapshot()
+        assert 'client_dal_functions.get_all_clients' in snapshot['functions']
+
+    def test_histogram(self):
+        """
+        GIVEN a latency histogram
+        WHEN you add durations on and over the bucket bounds
+        THEN each duration is counted in its bucket
+        """
+        histogram = Histogram()
+
+        for duration in [0.5, 1, 3, 10000]:
+            histogram.observe(duration)
+
+        result = histogram.as_dict()
+        assert result['count'] == 4
+        assert result['buckets']['<=1'] == 2
+        assert result['buckets']['<=5'] == 1
+        assert result['buckets']['>5000'] == 1
+        assert result['max_ms'] == 10000
@@ -194,6 +194,32 @@ class TestDalRole():
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
 
+    def test_get_roles_by_ids(self):
+        """
+        GIVEN a list of role ids
+        WHEN you call dal.get_roles_by_ids using the list
+        THEN the status and the roles keyed by id are returned
+             unknown ids are ignored
+        """
+        role_id = ValueStorage.role_id
+
+        result = dal.get_roles_by_ids([role_id, 999])
+
+        assert result['status'] == "ok"
+        assert list(result['roles']) == [role_id]
+        assert result['roles'][role_id].id == role_id
+
+    def test_get_roles_by_ids_empty(self):
+        """
+        GIVEN an empty list of ids
+        WHEN you call dal.get_roles_by_ids using the list
+        THEN the status ok and an empty dictionnary are returned
+        """
+        result = dal.get_roles_by_ids([])
+
+        assert result['status'] == "ok"
+        assert result['roles'] == {}
+
     def test_delete_role(self):
         """
         GIVEN a role id
@@ -209,6 +209,32 @@ class TestDalTeam():
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
 
+    def test_get_teams_by_ids(self):
+        """
+        GIVEN a list of team ids
+        WHEN you call dal.get_teams_by_ids using the list
+        THEN the status and the teams keyed by id are returned
+             unknown ids are ignored
+        """
+        team_id = ValueStorage.team_id
+
+        result = dal.get_teams_by_ids([team_id, 999])
+
+        assert result['status'] == "ok"
+        assert list(result['teams']) == [team_id]
+        assert result['teams'][team_id].id == team_id
+
+    def test_get_teams_by_ids_empty(self):
+        """
+        GIVEN an empty list of ids
+        WHEN you call dal.get_teams_by_ids using the list
+        THEN the status ok and an empty dictionnary are returned
+        """
+        result = dal.get_teams_by_ids([])
+
+        assert result['status'] == "ok"
+        assert result['teams'] == {}
+
     def test_get_all_teams(self):
         """
         GIVEN
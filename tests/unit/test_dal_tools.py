@@ -0,0 +1,163 @@
+from collections import namedtuple
+
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import Role
+from models.dal_tools import paginate, paginate_rows, TTLCache
+from db import (engine,
+                Base,
+                )
+
+
+class TestDalTools():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        for number in range(5):
+            cls.session.add(Role(name=f"role {number}", active=True))
+        cls.session.commit()
+        cls.role_ids = [role.id for role in
+                        cls.session.query(Role).order_by(Role.id).all()]
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def test_paginate_all(self):
+        """
+        GIVEN a query on 5 roles
+        WHEN you call paginate without page size
+        THEN all the roles are returned and no other page exists
+        """
+        rows, page = paginate(self.session.query(Role), Role.id)
+
+        assert [row.id for row in rows] == self.role_ids
+        assert page['has_previous'] is False
+        assert page['has_next'] is False
+
+    def test_paginate_first_page(self):
+        """
+        GIVEN a query on 5 roles
+        WHEN you call paginate with a page size of 2
+        THEN the 2 first roles are returned and a next page exists
+        """
+        rows, page = paginate(self.session.query(Role), Role.id, 2)
+
+        assert [row.id for row in rows] == self.role_ids[:2]
+        assert page['has_previous'] is False
+        assert page['has_next'] is True
+        assert page['first_id'] == self.role_ids[0]
+        assert page['last_id'] == self.role_ids[1]
+
+    def test_paginate_next_page(self):
+        """
+        GIVEN a query on 5 roles
+        WHEN you call paginate after the 4th role
+        THEN the last role is returned and no next page exists
+        """
+        rows, page = paginate(self.session.query(Role),
+                              Role.id,
+                              2,
+                              after_id=self.role_ids[3])
+
+        assert [row.id for row in rows] == self.role_ids[4:]
+        assert page['has_previous'] is True
+        assert page['has_next'] is False
+
+    def test_paginate_previous_page(self):
+        """
+        GIVEN a query on 5 roles
+        WHEN you call paginate before the 3rd role
+        THEN the 2 first roles are returned in id order
+             and no previous page exists
+        """
+        rows, page = paginate(self.session.query(Role),
+                              Role.id,
+                              2,
+                              before_id=self.role_ids[2])
+
+        assert [row.id for row in rows] == self.role_ids[:2]
+        assert page['has_previous'] is False
+        assert page['has_next'] is True
+
+    def test_paginate_empty(self):
+        """
+        GIVEN a query returning no role
+        WHEN you call paginate
+        THEN an empty page is returned
+        """
+        query = self.session.query(Role).filter(Role.id < 0)
+
+        rows, page = paginate(query, Role.id, 2)
+
+        assert rows == []
+        assert page['first_id'] is None
+        assert page['last_id'] is None
+        assert page['has_next'] is False
+
+    def test_paginate_rows(self):
+        """
+        GIVEN 5 roles
+        WHEN you call paginate_rows with a row type of two columns
+             and a page size of 2
+        THEN the 2 first roles are returned as row type tuples
+        """
+        RoleRow = namedtuple('RoleRow', ['id', 'name'])
+
+        rows, page = paginate_rows(self.session, Role, RoleRow,
+                                   [Role.active == True],  # noqa: E712
+                                   2)
+
+        assert rows == [RoleRow(self.role_ids[0], "role 0"),
+                        RoleRow(self.role_ids[1], "role 1")]
+        assert isinstance(rows[0], RoleRow)
+        assert page['has_next'] is True
+        assert page['last_id'] == self.role_ids[1]
+
+    def test_ttl_cache_lru(self):
+        """
+        GIVEN a cache of 2 entries
+        WHEN a third entry is stored
+        THEN the least recently used entry is dropped
+        """
+        cache = TTLCache(2, 60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.get(1)
+        cache.set(3, 'c')
+
+        assert cache.get(1) == 'a'
+        assert cache.get(2) is None
+        assert cache.get(3) == 'c'
+
+    def test_ttl_cache_expired(self):
+        """
+        GIVEN a cache with a lifetime of 0 second
+        WHEN an entry is read
+        THEN it is expired
+        """
+        cache = TTLCache(2, 0)
+        cache.set(1, 'a')
+
+        assert cache.get(1) is None
+
+    def test_ttl_cache_invalidate(self):
+        """
+        GIVEN a cache with entries
+        WHEN you invalidate a key then all the keys
+        THEN the entries are removed
+        """
+        cache = TTLCache(3, 60)
+        cache.set(1, 'a')
+        cache.set(2, 'b')
+        cache.set(3, 'c')
+
+        cache.invalidate(1)
+        assert cache.get(1) is None
+        assert cache.get(2) == 'b'
+
+        cache.invalidate()
+        assert cache.get(2) is None
+        assert cache.get(3) is None
@@ -1,12 +1,16 @@
 from argon2 import PasswordHasher
+from sqlalchemy import event
 from sqlalchemy.orm import sessionmaker
 
-from models.user_models import User
+from models.user_models import User, Team, Role
 from models.client_models import Client
 import models.user_dal_functions as dal
 from db import (engine,
                 Base,
-                DB_RECORD_NOT_FOUND
+                DB_RECORD_NOT_FOUND,
+                DB_DUPLICATE_USER,
+                DB_MISSING_USER_FIELD,
+                DB_TEAM_NOT_FOUND,
                 )
 from ..conftest import ValueStorage
 
@@ -247,6 +251,32 @@ class TestDalUser():
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
 
+    def test_get_users_by_ids(self):
+        """
+        GIVEN a list of user ids
+        WHEN you call dal.get_users_by_ids using the list
+        THEN the status and the users keyed by id are returned
+             unknown ids are ignored
+        """
+        user_id = ValueStorage.user_id
+
+        result = dal.get_users_by_ids([user_id, 999])
+
+        assert result['status'] == "ok"
+        assert list(result['users']) == [user_id]
+        assert result['users'][user_id].id == user_id
+
+    def test_get_users_by_ids_empty(self):
+        """
+        GIVEN an empty list of ids
+        WHEN you call dal.get_users_by_ids using the list
+        THEN the status ok and an empty dictionnary are returned
+        """
+        result = dal.get_users_by_ids([])
+
+        assert result['status'] == "ok"
+        assert result['users'] == {}
+
     def test_get_user_by_email(self, user_fix):
         """
         GIVEN an existing user email
@@ -330,6 +360,52 @@ class TestDalUser():
         assert result['users'][0].first_name == user.first_name
         assert result['users'][0].last_name == user.last_name
 
+    def test_get_user_rows(self):
+        """
+        GIVEN a user in a team, and a user without team
+        WHEN you call get_user_rows
+        THEN the users are returned with their team and role names
+             with one query
+        """
+        role = Role(name="rows role", active=True)
+        self.session.add(role)
+        self.session.commit()
+        team = Team(name="rows team", role_id=role.id, active=True)
+        self.session.add(team)
+        self.session.commit()
+        user = User(employee_number=900,
+                    first_name="rows",
+                    last_name="user",
+                    email="rows.user@email.com",
+                    password="password",
+                    active=True,
+                    team_id=team.id)
+        self.session.add(user)
+        self.session.commit()
+
+        statements = []
+
+        def count(*args):
+            statements.append(args)
+
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            result = dal.get_user_rows()
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+
+        rows = {row.id: row for row in result['users']}
+        assert result['status'] == "ok"
+        assert len(statements) == 1
+        assert rows[user.id].team_name == "rows team"
+        assert rows[user.id].role_name == "rows role"
+        assert rows[ValueStorage.user_id].team_name is None
+
+        self.session.delete(user)
+        self.session.delete(team)
+        self.session.delete(role)
+        self.session.commit()
+
     def test_get_client_list_for_user(self, client_fix):
         """
         GIVEN an existing user employee_number
@@ -409,3 +485,88 @@ class TestDalUser():
 
         assert result['status'] == "ko"
         assert result['error'] == DB_RECORD_NOT_FOUND
+
+    def test_create_users(self, user_fix):
+        """
+        GIVEN a list of dictionnaries with the needed data
+              including a duplicated email
+        WHEN you call dal.create_users using the list
+        THEN the users are created in the database, the duplicate is refused
+             and the status of each user is returned
+        """
+        user_dicts = []
+        for number in range(dal.BULK_HASH_MIN_USERS + 1):
+            user_dict = dict(user_fix)
+            user_dict['employee_number'] = 1000 + number
+            user_dict['email'] = f"bulk{number}@email.com"
+            user_dicts.append(user_dict)
+        duplicate = dict(user_dicts[0])
+        duplicate['employee_number'] = 2000
+        user_dicts.append(duplicate)
+
+        result = dal.create_users(user_dicts, max_workers=2)
+
+        assert result['status'] == "ok"
+        assert result['users'][-1]['status'] == "ko"
+        assert result['users'][-1]['error'] == DB_DUPLICATE_USER
+
+        user_ids = [user_result['user_id']
+                    for user_result in result['users'][:-1]]
+        users = (self.session.query(User)
+                 .filter(User.id.in_(user_ids))
+                 .all())
+
+        assert len(users) == len(user_ids)
+        assert users[0].is_password_correct(user_fix['password'])
+
+    def test_create_users_existing(self):
+        """
+        GIVEN a dictionnary of a user already in database
+        WHEN you call dal.create_users using the dictionnary
+        THEN the user is refused
+        """
+        user = (self.session.query(User)
+                .filter(User.email == "bulk0@email.com")
+                .first())
+        user_dict = {'employee_number': 3000,
+                     'first_name': user.first_name,
+                     'last_name': user.last_name,
+                     'email': user.email,
+                     'password': "password",
+                     'active': True,
+                     'team_id': None}
+
+        result = dal.create_users([user_dict])
+
+        assert result['status'] == "ok"
+        assert result['users'][0]['status'] == "ko"
+        assert result['users'][0]['error'] == DB_DUPLICATE_USER
+
+    def test_create_users_refused(self, user_fix):
+        """
+        GIVEN a list with a user without password, a user of an unknown
+              team and a valid user
+        WHEN you call dal.create_users using the list
+        THEN the first two users are refused with their error
+             and the valid user is created
+        """
+        missing = dict(user_fix, employee_number=4000,
+                       email="missing@email.com")
+        del missing['password']
+        unknown_team = dict(user_fix, employee_number=4001,
+                            email="unknown.team@email.com", team_id=999)
+        valid = dict(user_fix, employee_number=4002,
+                     email="valid@email.com")
+
+        result = dal.create_users([missing, unknown_team, valid])
+
+        assert result['status'] == "ok"
+        assert result['users'][0]['status'] == "ko"
+        assert result['users'][0]['error'] == (DB_MISSING_USER_FIELD
+                                               + 'password')
+        assert result['users'][1]['status'] == "ko"
+        assert result['users'][1]['error'] == DB_TEAM_NOT_FOUND
+        assert result['users'][2]['status'] == "ok"
+        assert (self.session.query(User)
+                .filter(User.email == "valid@email.com")
+                .count()) == 1
@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import text
+
+import db
+from db import (engine,
+                engine_options,
+                get_pool_statistics,
+                session_maker,
+                )
+
+
+class TestDb():
+
+    def test_engine_options_server(self):
+        """
+        GIVEN a server database engine
+        WHEN you call engine_options
+        THEN the pool is sized, recycled and pre-pinged
+        """
+        options = engine_options('mysql')
+
+        assert options['pool_size'] == db.DB_POOL_SIZE
+        assert options['max_overflow'] == db.DB_MAX_OVERFLOW
+        assert options['pool_timeout'] == db.DB_POOL_TIMEOUT
+        assert options['pool_recycle'] == db.DB_POOL_RECYCLE
+        assert options['pool_pre_ping'] == db.DB_POOL_PRE_PING
+
+    def test_engine_options_sqlite(self):
+        """
+        GIVEN a sqlite database engine
+        WHEN you call engine_options
+        THEN no recycle nor pre-ping is done
+        """
+        options = engine_options('test')
+
+        assert options['pool_recycle'] == -1
+        assert options['pool_pre_ping'] is False
+
+    def test_sqlite_pragma(self):
+        """
+        GIVEN the test sqlite engine
+        WHEN a connection is opened
+        THEN the journal mode and cache size pragmas are applied
+        """
+        with engine.connect() as connection:
+            journal_mode = connection.execute(
+                text("PRAGMA journal_mode")).scalar()
+            cache_size = connection.execute(
+                text("PRAGMA cache_size")).scalar()
+
+        assert journal_mode.upper() == db.DB_SQLITE_JOURNAL_MODE
+        assert cache_size == db.DB_SQLITE_CACHE_SIZE
+
+    def test_invalid_sqlite_pragma(self):
+        """
+        GIVEN an unknown sqlite journal mode in the environment
+        WHEN the db module is imported
+        THEN a ValueError is raised before any connection is opened
+        """
+        environment = dict(os.environ, DB_SQLITE_JOURNAL_MODE="fast")
+
+        process = subprocess.run([sys.executable, '-c', 'import db'],
+                                 env=environment,
+                                 capture_output=True,
+                                 text=True)
+
+        assert process.returncode != 0
+        assert "ValueError: Invalid sqlite journal mode FAST" in (
+            process.stderr)
+
+    def test_get_pool_statistics(self):
+        """
+        GIVEN the engine pool
+        WHEN a session runs a query
+        THEN one more checkout and checkin are reported
+        """
+        before = get_pool_statistics()
+
+        with session_maker() as session:
+            session.execute(text("SELECT 1"))
+            during = get_pool_statistics()
+
+        after = get_pool_statistics()
+
+        assert during['checkouts'] == before['checkouts'] + 1
+        assert during['checked_out'] == before['checked_out'] + 1
+        assert after['checkins'] == before['checkins'] + 1
+        assert after['checked_out'] == before['checked_out']
+        assert after['pool_size'] == db.DB_POOL_SIZE
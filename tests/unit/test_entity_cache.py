@@ -0,0 +1,138 @@
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client, CONTRACT_STATUS
+from models.dal_tools import entity_cache, EntityCache
+import models.client_dal_functions as dalc
+import models.contract_dal_functions as dalo
+from db import (engine,
+                Base,
+                )
+
+
+class TestEntityCache():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        user = User(employee_number=1,
+                    first_name="first name",
+                    last_name="last name",
+                    email="cache@email.com",
+                    password="password",
+                    active=True,
+                    team_id=None)
+        cls.session.add(user)
+        cls.session.commit()
+        client = Client(first_name="client",
+                        last_name="cache",
+                        email="client.cache@email.com",
+                        telephone="0102030405",
+                        enterprise="enterprise",
+                        commercial_contact_id=user.id,
+                        active=True)
+        cls.session.add(client)
+        cls.session.commit()
+        cls.client_id = client.id
+        # the cache is disabled by default
+        cls.cache_size = entity_cache.max_size
+        entity_cache.max_size = 100
+
+    def teardown_class(self):
+        entity_cache.max_size = self.cache_size
+        entity_cache.invalidate()
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def setup_method(self, method):
+        entity_cache.invalidate()
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self.count_select)
+
+    def teardown_method(self, method):
+        event.remove(engine, 'before_cursor_execute', self.count_select)
+
+    def count_select(self, conn, cursor, statement, *args):
+        if statement.startswith('SELECT'):
+            self.statements.append(statement)
+
+    def test_get_client_by_id_cached(self):
+        """
+        GIVEN an enabled entity cache
+        WHEN you call get_client_by_id three times, with a string id
+             as given by the screens for the last one
+        THEN the client is read once from the database
+        """
+        hits = entity_cache.hits
+
+        results = [dalc.get_client_by_id(self.client_id),
+                   dalc.get_client_by_id(self.client_id),
+                   dalc.get_client_by_id(str(self.client_id))]
+
+        assert all(result['status'] == "ok" for result in results)
+        assert results[2]['client'].id == self.client_id
+        # client and its contracts (subqueryload)
+        assert len(self.statements) == 2
+        assert entity_cache.hits == hits + 2
+
+    def test_update_client_invalidates(self):
+        """
+        GIVEN a client in the entity cache
+        WHEN you update the client
+        THEN the next get_client_by_id reads the new values
+        """
+        dalc.get_client_by_id(self.client_id)
+
+        dalc.update_client({'id': self.client_id,
+                            'enterprise': "new enterprise"})
+        result = dalc.get_client_by_id(self.client_id)
+
+        assert result['client'].enterprise == "new enterprise"
+
+    def test_create_contract_invalidates_client(self):
+        """
+        GIVEN a client in the entity cache
+        WHEN you create a contract for the client
+        THEN the next get_client_by_id returns the client with the contract
+        """
+        dalc.get_client_by_id(self.client_id)
+
+        dalo.create_contract({'client_id': self.client_id,
+                              'total_amount': 100,
+                              'amount_unpaid': 100,
+                              'status': CONTRACT_STATUS[1],
+                              'active': True})
+        result = dalc.get_client_by_id(self.client_id)
+
+        assert len(result['client'].contracts) == 1
+
+    def test_not_found_not_cached(self):
+        """
+        GIVEN an enabled entity cache
+        WHEN you call get_client_by_id on an unknown id twice
+        THEN the database is read twice
+        """
+        dalc.get_client_by_id(999)
+        result = dalc.get_client_by_id(999)
+
+        assert result['status'] == "ko"
+        assert len(self.statements) == 2
+
+    def test_entity_cache_invalidate_model(self):
+        """
+        GIVEN an entity cache with clients and users
+        WHEN you invalidate the clients
+        THEN only the users remain
+        """
+        cache = EntityCache(10, 60)
+        cache.set_entity(Client, 1, 'client 1')
+        cache.set_entity(Client, 2, 'client 2')
+        cache.set_entity(User, 1, 'user 1')
+
+        cache.invalidate_model(Client)
+
+        assert cache.get_entity(Client, 1) is None
+        assert cache.get_entity(User, '1') == 'user 1'
+        assert cache.statistics() == {'hits': 1, 'misses': 1, 'entries': 1}
@@ -0,0 +1,166 @@
+import csv
+import json
+
+import pytest
+
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client, Contract, Event, CONTRACT_STATUS
+from models.contract_dal_functions import stream_contracts
+from controllers.export_functions import export_list
+from controllers.import_functions import import_file
+from controllers.controllers_functions import (MC_CLIENT_LIST,
+                                               MC_CONTRACT_LIST,
+                                               MC_CONTRACT_OWNED_FILTER,
+                                               MC_CONTRACT_UNPAID_FILTER,
+                                               MC_EVENT_FOLLOWED_FILTER,
+                                               MC_EVENT_OWNED_FILTER,
+                                               )
+from db import (engine,
+                Base,
+                )
+
+
+class TestExport():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        user = User(employee_number=1,
+                    first_name="first name",
+                    last_name="last name",
+                    email="export@email.com",
+                    password="password",
+                    active=True,
+                    team_id=None)
+        cls.session.add(user)
+        cls.session.commit()
+        cls.user_id = user.id
+        client = Client(first_name="client",
+                        last_name="export",
+                        email="client.export@email.com",
+                        telephone="0102030405",
+                        enterprise="enterprise",
+                        commercial_contact_id=user.id,
+                        active=True)
+        cls.session.add(client)
+        cls.session.commit()
+        for number in range(6):
+            contract = Contract(client_id=client.id,
+                                total_amount=1000,
+                                amount_unpaid=number % 2 * 500,
+                                status=CONTRACT_STATUS[0],
+                                active=True)
+            cls.session.add(contract)
+            cls.session.commit()
+            event = Event(title=f"event {number}",
+                          contract_id=contract.id,
+                          start_date=contract.creation_date,
+                          end_date=contract.creation_date,
+                          support_contact_id=(user.id if number < 2
+                                              else None),
+                          location="Paris",
+                          attendees=number,
+                          active=True)
+            cls.session.add(event)
+        cls.session.commit()
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def test_stream_contracts(self):
+        """
+        GIVEN 6 contracts, 3 of them unpaid
+        WHEN you read the unpaid contracts with stream_contracts
+             by batches of 2 rows
+        THEN the 3 unpaid contracts are returned as tuples sorted on id
+        """
+        rows = list(stream_contracts(unpaid=True, batch_size=2))
+
+        assert len(rows) == 3
+        assert all(not isinstance(row, Contract) for row in rows)
+        assert [row.id for row in rows] == sorted(row.id for row in rows)
+        assert all(row.amount_unpaid == 500 for row in rows)
+
+    def test_export_unpaid_contracts_csv(self, tmp_path):
+        """
+        GIVEN 6 contracts, 3 of them unpaid
+        WHEN you call export_list on the unpaid contracts list
+        THEN the csv file holds a header and the 3 unpaid contracts
+        """
+        path = str(tmp_path / 'contracts.csv')
+
+        result = export_list(MC_CONTRACT_UNPAID_FILTER, path)
+
+        assert result['status'] == "ok"
+        assert result['written'] == 3
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        assert len(rows) == 3
+        assert rows[0]['status'] == CONTRACT_STATUS[0]
+        assert all(float(row['amount_unpaid']) == 500 for row in rows)
+
+    def test_export_supported_events_jsonl(self, tmp_path):
+        """
+        GIVEN 6 events, 2 of them supported by the user
+        WHEN you call export_list on the user supported events
+        THEN the jsonl file holds the 2 events
+        """
+        path = str(tmp_path / 'events.jsonl')
+
+        result = export_list(MC_EVENT_OWNED_FILTER, path, user_id=self.user_id)
+
+        assert result['written'] == 2
+        with open(path, encoding='utf-8') as file:
+            events = [json.loads(line) for line in file]
+        assert [event['title'] for event in events] == ['event 0', 'event 1']
+        assert events[0]['support_contact_id'] == self.user_id
+
+    def test_export_then_import(self, tmp_path):
+        """
+        GIVEN an exported contract list
+        WHEN you import the file with upsert
+        THEN every contract is accepted and updated with the same values
+        """
+        path = str(tmp_path / 'contracts.jsonl')
+        export_list(MC_CONTRACT_LIST, path)
+
+        result = import_file('contracts', path, upsert=True)
+
+        assert result['status'] == "ok"
+        assert result['read'] == 6
+        assert result['written'] == 6
+        assert self.session.query(Contract).count() == 6
+
+    def test_export_wrong_format(self, tmp_path):
+        """
+        GIVEN a file with an unknown extension
+        WHEN you call export_list
+        THEN the status ko is returned and no file is written
+        """
+        path = tmp_path / 'clients.txt'
+
+        result = export_list(MC_CLIENT_LIST, str(path))
+
+        assert result['status'] == "ko"
+        assert not path.exists()
+
+    @pytest.mark.parametrize('list_type', [MC_CONTRACT_OWNED_FILTER,
+                                           MC_EVENT_OWNED_FILTER,
+                                           MC_EVENT_FOLLOWED_FILTER])
+    def test_export_user_list_without_user(self, tmp_path, list_type):
+        """
+        GIVEN a list filtered on the connected user
+        WHEN you call export_list without user_id
+        THEN the status ko is returned and no file is written
+        """
+        path = tmp_path / 'rows.jsonl'
+
+        result = export_list(list_type, str(path))
+
+        assert result['status'] == "ko"
+        assert isinstance(result['error'], ValueError)
+        assert not path.exists()
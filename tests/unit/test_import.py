@@ -0,0 +1,325 @@
+import json
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User, Team, Role
+from models.client_models import Client, Contract, Event
+from controllers.import_functions import (check_contract,
+                                          import_file,
+                                          MSG_IMPORT_WRONG_LINE,
+                                          )
+from controllers.controllers_functions import (COMMERCIAL_TEAM_ID,
+                                               SUPPORT_TEAM_ID,
+                                               )
+from db import (engine,
+                Base,
+                )
+
+CLIENT_HEADER = ("first_name,last_name,email,telephone,enterprise,"
+                 "commercial_contact_id,active\n")
+
+# valid rows of each entity, the checked fields are replaced by wrong
+# json values (the referenced ids are not checked before these fields)
+VALID_ROWS = {
+    'clients': {'first_name': "first", 'last_name': "last",
+                'email': "wrong.value@email.com", 'telephone': "0102030405",
+                'enterprise': "enterprise", 'commercial_contact_id': 1},
+    'contracts': {'client_id': 1, 'total_amount': 100, 'amount_unpaid': 0,
+                  'status': 'signé'},
+    'events': {'title': "event", 'contract_id': 1,
+               'start_date': '24/12/2024 20:00',
+               'end_date': '25/12/2024 02:00', 'support_contact_id': 2,
+               'location': 'Paris', 'attendees': 12},
+}
+
+# null is valid for the optional fields
+OPTIONAL_FIELDS = ['id', 'support_contact_id', 'attendees']
+
+# checked fields and their wrong values
+WRONG_VALUES = [
+    (entity, field, value)
+    for entity, fields in [
+        ('clients', ['email', 'commercial_contact_id', 'id']),
+        ('contracts', ['total_amount', 'amount_unpaid', 'client_id', 'id']),
+        ('events', ['start_date', 'end_date', 'contract_id',
+                    'support_contact_id', 'attendees', 'id'])]
+    for field in fields
+    for value in [None, [1], {'value': 1}]
+    if value is not None or field not in OPTIONAL_FIELDS
+]
+
+
+class TestImport():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        for number, name in enumerate(['gestion', 'commercial', 'support'],
+                                      start=1):
+            cls.session.add(Role(id=number, name=name, active=True))
+            cls.session.add(Team(id=number, name=name, role_id=number,
+                                 active=True))
+        commercial = User(employee_number=1,
+                          first_name="commercial",
+                          last_name="user",
+                          email="commercial@email.com",
+                          password="password",
+                          active=True,
+                          team_id=COMMERCIAL_TEAM_ID)
+        support = User(employee_number=2,
+                       first_name="support",
+                       last_name="user",
+                       email="support@email.com",
+                       password="password",
+                       active=True,
+                       team_id=SUPPORT_TEAM_ID)
+        cls.session.add_all([commercial, support])
+        cls.session.commit()
+        cls.commercial_id = commercial.id
+        cls.support_id = support.id
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def test_import_clients_csv(self, tmp_path):
+        """
+        GIVEN a csv file of 10 clients, 2 of them invalid
+        WHEN you call import_file by chunks of 4 rows
+        THEN the 8 valid clients are created, the 2 others are reported
+             and the commercial users are read once by chunk
+        """
+        path = tmp_path / 'clients.csv'
+        lines = [CLIENT_HEADER]
+        for number in range(10):
+            email = f"import{number}@email.com"
+            contact_id = self.commercial_id
+            if number == 3:
+                email = "wrong email"
+            if number == 7:
+                contact_id = self.support_id
+            lines.append(f"first {number},last {number},{email},0102030405,"
+                         f"enterprise,{contact_id},true\n")
+        path.write_text(''.join(lines), encoding='utf-8')
+
+        refused = []
+        statements = []
+
+        def count_statements(conn, cursor, statement, *args):
+            if statement.startswith('SELECT') and 'FROM users' in statement:
+                statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            result = import_file('clients',
+                                 str(path),
+                                 chunk_size=4,
+                                 report=lambda line, errors: refused.append(
+                                     line))
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        assert result['status'] == "ok"
+        assert result['read'] == 10
+        assert result['written'] == 8
+        assert result['refused'] == 2
+        # header on line 1
+        assert refused == [5, 9]
+        assert len(statements) == 3
+        assert (self.session.query(Client)
+                .filter(Client.email.like('import%'))
+                .count()) == 8
+
+    def test_import_contracts_and_events_jsonl(self, tmp_path):
+        """
+        GIVEN jsonl files of contracts and events
+        WHEN you call import_file
+        THEN the rows are created, a row with an unknown client is refused
+        """
+        client = self.session.query(Client).first()
+        contracts_path = tmp_path / 'contracts.jsonl'
+        contracts = [{'client_id': client.id, 'total_amount': 100,
+                      'amount_unpaid': '50.5', 'status': 'signé'},
+                     {'client_id': 9999, 'total_amount': 100,
+                      'amount_unpaid': 0, 'status': 'signé'}]
+        contracts_path.write_text(
+            '\n'.join(json.dumps(contract) for contract in contracts),
+            encoding='utf-8')
+
+        result = import_file('contracts', str(contracts_path))
+
+        assert result['written'] == 1
+        assert result['refused'] == 1
+        contract = self.session.query(Contract).first()
+        assert contract.amount_unpaid == 50.5
+
+        events_path = tmp_path / 'events.jsonl'
+        events = [{'title': 'imported event', 'contract_id': contract.id,
+                   'start_date': '24/12/2024 20:00',
+                   'end_date': '25/12/2024 02:00',
+                   'support_contact_id': self.support_id,
+                   'location': 'Paris', 'attendees': 12}]
+        events_path.write_text(json.dumps(events[0]) + '\n',
+                               encoding='utf-8')
+
+        result = import_file('events', str(events_path))
+
+        assert result['status'] == "ok"
+        assert result['written'] == 1
+        assert self.session.query(Event).first().attendees == 12
+
+    def test_import_clients_upsert(self, tmp_path):
+        """
+        GIVEN a csv file with a client already in database
+        WHEN you call import_file with upsert
+        THEN the client is updated
+        """
+        path = tmp_path / 'clients.csv'
+        path.write_text(CLIENT_HEADER
+                        + "first 0,last 0,import0@email.com,0102030405,"
+                        f"new enterprise,{self.commercial_id},\n",
+                        encoding='utf-8')
+
+        result = import_file('clients', str(path), upsert=True)
+
+        assert result['written'] == 1
+        self.session.expire_all()
+        client = (self.session.query(Client)
+                  .filter(Client.email == 'import0@email.com')
+                  .first())
+        assert client.enterprise == "new enterprise"
+
+    def client_lines(self, first_number, count):
+        return [json.dumps({'first_name': f"first {number}",
+                            'last_name': f"last {number}",
+                            'email': f"jsonl{number}@email.com",
+                            'telephone': "0102030405",
+                            'enterprise': "enterprise",
+                            'commercial_contact_id': self.commercial_id})
+                for number in range(first_number, first_number + count)]
+
+    def test_import_malformed_json_line(self, tmp_path):
+        """
+        GIVEN a jsonl file of clients with a malformed line
+        WHEN you call import_file by chunks of 2 rows
+        THEN the line is refused and the next lines are still imported
+        """
+        path = tmp_path / 'clients.jsonl'
+        lines = (self.client_lines(100, 2) + ['{"first_name": "broken'] +
+                 self.client_lines(102, 2))
+        path.write_text('\n'.join(lines), encoding='utf-8')
+        refused = []
+
+        result = import_file('clients', str(path), chunk_size=2,
+                             report=lambda line, errors: refused.append(
+                                 (line, errors)))
+
+        assert result['status'] == "ok"
+        assert result['read'] == 5
+        assert result['written'] == 4
+        assert result['refused'] == 1
+        assert refused == [(3, [MSG_IMPORT_WRONG_LINE])]
+
+    def test_import_not_object_json_line(self, tmp_path):
+        """
+        GIVEN a jsonl file of clients with a json array line
+        WHEN you call import_file
+        THEN the line is refused and the other lines are imported
+        """
+        path = tmp_path / 'clients.jsonl'
+        lines = (self.client_lines(200, 1) + ['[1, 2]'] +
+                 self.client_lines(201, 1))
+        path.write_text('\n'.join(lines), encoding='utf-8')
+        refused = []
+
+        result = import_file('clients', str(path),
+                             report=lambda line, errors: refused.append(
+                                 (line, errors)))
+
+        assert result['written'] == 2
+        assert refused == [(2, [MSG_IMPORT_WRONG_LINE])]
+
+    def test_import_contracts_client_check(self, tmp_path):
+        """
+        GIVEN a client with a contract
+        WHEN you import a contract of the client
+        THEN the client is checked without reading its contracts
+        """
+        client = self.session.query(Client).first()
+        path = tmp_path / 'contracts.jsonl'
+        path.write_text(json.dumps({'client_id': client.id,
+                                    'total_amount': 100,
+                                    'amount_unpaid': 0,
+                                    'status': 'signé'}),
+                        encoding='utf-8')
+        statements = []
+
+        def count_statements(conn, cursor, statement, *args):
+            if (statement.startswith('SELECT')
+                    and 'contracts.' in statement):
+                statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', count_statements)
+        try:
+            result = import_file('contracts', str(path))
+        finally:
+            event.remove(engine, 'before_cursor_execute', count_statements)
+
+        assert result['written'] == 1
+        assert statements == []
+
+    @pytest.mark.parametrize('entity, field, value', WRONG_VALUES)
+    def test_import_wrong_json_value(self, tmp_path, entity, field, value):
+        """
+        GIVEN a jsonl line with a null, list or object value in a checked
+              field, between two lines with the wrong value as string
+        WHEN you call import_file
+        THEN the three lines are refused and the import ends with its report
+        """
+        path = tmp_path / f"{entity}.jsonl"
+        row = dict(VALID_ROWS[entity], **{field: value})
+        text_row = dict(VALID_ROWS[entity], **{field: "wrong"})
+        path.write_text('\n'.join(json.dumps(line)
+                                  for line in [text_row, row, text_row]),
+                        encoding='utf-8')
+        refused = []
+
+        result = import_file(entity, str(path),
+                             report=lambda line, errors: refused.append(
+                                 line))
+
+        assert result['status'] == "ok"
+        assert result['written'] == 0
+        assert refused == [1, 2, 3]
+
+    def test_check_contract_null_amount(self):
+        """
+        GIVEN a contract row with a null total amount
+        WHEN you call check_contract
+        THEN an error is returned for the amount
+        """
+        errors = check_contract({'client_id': 1, 'total_amount': None,
+                                 'amount_unpaid': 1, 'status': 'signé'})
+
+        assert len(errors) == 1
+        assert 'total_amount' in errors[0]
+
+    @pytest.mark.parametrize('name', ['missing.csv', 'clients.txt'])
+    def test_import_file_not_readable(self, tmp_path, name):
+        """
+        GIVEN a path which does not exist or with an unknown extension
+        WHEN you call import_file
+        THEN a ko result is returned with the error
+        """
+        path = tmp_path / name
+        if name.endswith('.txt'):
+            path.write_text(CLIENT_HEADER, encoding='utf-8')
+
+        result = import_file('clients', str(path))
+
+        assert result['status'] == "ko"
+        assert result['read'] == 0
+        assert isinstance(result['error'], (OSError, ValueError))
@@ -0,0 +1,64 @@
+from sqlalchemy import select, text
+
+from models.client_models import Client, Contract, Event, CONTRACT_STATUS
+from db import (engine,
+                Base,
+                )
+
+
+def query_plan(query):
+    """ sqlite plan of the query """
+    with engine.connect() as connection:
+        compiled = query.compile(connection,
+                                 compile_kwargs={'literal_binds': True})
+        rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))
+        return ' / '.join(row[-1] for row in rows)
+
+
+class TestIndexes():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+
+    def teardown_class(self):
+        Base.metadata.drop_all(engine)
+
+    def test_foreign_key_indexes(self):
+        """
+        GIVEN the queries filtering on a foreign key
+        WHEN their plan is computed
+        THEN the foreign key index is used
+        """
+        plan = query_plan(select(Client)
+                          .where(Client.commercial_contact_id == 1))
+        assert 'ix_clients_commercial_contact_id' in plan
+
+        plan = query_plan(select(Contract).where(Contract.client_id == 1))
+        assert 'ix_contracts_client_id' in plan
+
+        plan = query_plan(select(Event).where(Event.contract_id == 1))
+        assert 'ix_events_contract_id' in plan
+
+    def test_filter_indexes(self):
+        """
+        GIVEN the paginated list filters
+        WHEN their plan is computed
+        THEN the filter indexes are used
+        """
+        plan = query_plan(select(Event)
+                          .where(Event.support_contact_id == None)  # noqa
+                          .order_by(Event.id)
+                          .limit(51))
+        assert 'ix_events_support_contact_id' in plan
+
+        plan = query_plan(select(Contract)
+                          .where(Contract.status == CONTRACT_STATUS[1])
+                          .order_by(Contract.id)
+                          .limit(51))
+        assert 'ix_contracts_unsigned' in plan
+
+        plan = query_plan(select(Contract)
+                          .where(Contract.amount_unpaid != 0)
+                          .order_by(Contract.id)
+                          .limit(51))
+        assert 'ix_contracts_unpaid' in plan
@@ -0,0 +1,66 @@
+import sys
+
+from controllers.general_cont import MainController
+from controllers.controllers_functions import (navigation_handler,
+                                               MC_CLIENT_DETAILS,
+                                               MC_EXIT,
+                                               MC_RETURN,
+                                               )
+
+
+class LoopController(MainController):
+    """ controller whose login screen is displayed a given number of times
+    before exiting
+    """
+
+    def __init__(self, screen_count):
+        super().__init__(None, None)
+        self.screen_count = screen_count
+        self.displayed = 0
+
+    def login(self):
+        self.displayed += 1
+        if self.displayed < self.screen_count:
+            return navigation_handler(self, [MC_RETURN], None, None, None)
+        return navigation_handler(self, [MC_EXIT], None, None, None)
+
+    def control_start(self, connected_user, connected_user_role):
+        return self.login()
+
+    def exit(self):
+        pass
+
+
+class TestNavigation():
+
+    def test_navigation_handler_returns_next_screen(self):
+        """
+        GIVEN a client details menu choice
+        WHEN you call navigation_handler
+        THEN the client details controller is returned with its arguments
+             but not called
+        """
+        controller = MainController(None, None)
+
+        next_screen = navigation_handler(controller,
+                                         [MC_CLIENT_DETAILS, '12'],
+                                         'user',
+                                         'role',
+                                         None)
+
+        assert next_screen.func == controller.control_client_details
+        assert next_screen.args == ('12', 'user', 'role')
+
+    def test_run_long_session(self):
+        """
+        GIVEN a session with more screens than the recursion limit
+        WHEN you call run
+        THEN every screen is displayed without RecursionError
+        """
+        screen_count = sys.getrecursionlimit() * 2
+        controller = LoopController(screen_count)
+
+        controller.run()
+
+        assert controller.displayed == screen_count
+        assert controller.last_transition['screen'] == 'exit'
@@ -0,0 +1,225 @@
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client, Contract, Event, CONTRACT_STATUS
+from models.dal_tools import ownership_index
+from models.general_dal_functions import get_owned_ids
+import models.client_dal_functions as dalc
+import models.contract_dal_functions as dalo
+import models.event_dal_functions as dale
+from controllers.authorization_functions import (COMMERCIAL_ROLE,
+                                                 MANAGEMENT_ROLE,
+                                                 SUPPORT_ROLE,
+                                                 is_event_update_authorized,
+                                                 update_authorized_ids,
+                                                 )
+from db import (engine,
+                Base,
+                )
+
+
+class TestOwnership():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        users = [User(employee_number=number,
+                      first_name="first name",
+                      last_name="last name",
+                      email=f"owner{number}@email.com",
+                      password="password",
+                      active=True,
+                      team_id=None)
+                 for number in range(3)]
+        cls.session.add_all(users)
+        cls.session.commit()
+        cls.commercial_id, cls.other_id, cls.support_id = [
+            user.id for user in users]
+
+        cls.client_ids = []
+        cls.contract_ids = []
+        cls.event_ids = []
+        for number, commercial_id in enumerate([cls.commercial_id,
+                                                cls.other_id]):
+            client = Client(first_name="client",
+                            last_name="owned",
+                            email=f"client.owned{number}@email.com",
+                            telephone="0102030405",
+                            enterprise="enterprise",
+                            commercial_contact_id=commercial_id,
+                            active=True)
+            cls.session.add(client)
+            cls.session.commit()
+            contract = Contract(client_id=client.id,
+                                total_amount=100,
+                                amount_unpaid=0,
+                                status=CONTRACT_STATUS[0],
+                                active=True)
+            cls.session.add(contract)
+            cls.session.commit()
+            event = Event(title=f"event {number}",
+                          contract_id=contract.id,
+                          start_date=contract.creation_date,
+                          end_date=contract.creation_date,
+                          support_contact_id=None,
+                          location="Paris",
+                          attendees=10,
+                          active=True)
+            cls.session.add(event)
+            cls.session.commit()
+            cls.client_ids.append(client.id)
+            cls.contract_ids.append(contract.id)
+            cls.event_ids.append(event.id)
+
+    def teardown_class(self):
+        ownership_index.invalidate()
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def setup_method(self, method):
+        ownership_index.invalidate()
+        self.statements = []
+        event.listen(engine, 'before_cursor_execute', self.count_select)
+
+    def teardown_method(self, method):
+        event.remove(engine, 'before_cursor_execute', self.count_select)
+
+    def count_select(self, conn, cursor, statement, *args):
+        if statement.startswith('SELECT'):
+            self.statements.append(statement)
+
+    def test_get_owned_ids_one_query(self):
+        """
+        GIVEN two clients with a contract and an event each,
+              the first one followed by the commercial
+        WHEN you call get_owned_ids on all the ids twice
+        THEN the rows of the first client are returned,
+             with one query for both calls
+        """
+        results = [get_owned_ids(self.commercial_id,
+                                 self.client_ids,
+                                 self.contract_ids,
+                                 [str(event_id)
+                                  for event_id in self.event_ids])
+                   for number in range(2)]
+
+        for result in results:
+            assert result['status'] == 'ok'
+            assert result['client_ids'] == {self.client_ids[0]}
+            assert result['contract_ids'] == {self.contract_ids[0]}
+            assert result['event_ids'] == {self.event_ids[0]}
+        assert len(self.statements) == 1
+
+    def test_update_client_invalidates(self):
+        """
+        GIVEN the ownership of the second client in the index
+        WHEN the commercial of the client is changed
+        THEN the client, its contract and its event are owned
+             by the new commercial
+        """
+        get_owned_ids(self.commercial_id, client_ids=self.client_ids)
+
+        dalc.update_client({'id': self.client_ids[1],
+                            'commercial_contact_id': self.commercial_id})
+        result = get_owned_ids(self.commercial_id,
+                               self.client_ids,
+                               self.contract_ids,
+                               self.event_ids)
+        dalc.update_client({'id': self.client_ids[1],
+                            'commercial_contact_id': self.other_id})
+
+        assert result['client_ids'] == set(self.client_ids)
+        assert result['contract_ids'] == set(self.contract_ids)
+        assert result['event_ids'] == set(self.event_ids)
+
+    def test_update_event_invalidates(self):
+        """
+        GIVEN a support user owning no event
+        WHEN the user becomes the support of the second event
+        THEN the user is authorized to update the event
+        """
+        assert not is_event_update_authorized(self.support_id,
+                                              SUPPORT_ROLE,
+                                              self.event_ids[1])
+
+        dale.update_event({'id': self.event_ids[1],
+                           'support_contact_id': self.support_id})
+
+        assert is_event_update_authorized(self.support_id,
+                                          SUPPORT_ROLE,
+                                          self.event_ids[1])
+        dale.update_event({'id': self.event_ids[1],
+                           'support_contact_id': None})
+
+    def test_update_authorized_ids(self):
+        """
+        GIVEN the rows of a list screen
+        WHEN you call update_authorized_ids for each role
+        THEN management updates every contract and event,
+             a commercial only the rows of the clients followed
+        """
+        management = update_authorized_ids(self.other_id,
+                                           MANAGEMENT_ROLE,
+                                           self.client_ids,
+                                           self.contract_ids,
+                                           self.event_ids)
+        commercial = update_authorized_ids(self.commercial_id,
+                                           COMMERCIAL_ROLE,
+                                           self.client_ids,
+                                           self.contract_ids,
+                                           self.event_ids)
+
+        assert management['client_ids'] == set()
+        assert management['contract_ids'] == set(self.contract_ids)
+        assert management['event_ids'] == set(self.event_ids)
+        assert commercial['client_ids'] == {self.client_ids[0]}
+        assert commercial['event_ids'] == {self.event_ids[0]}
+
+    def test_get_contract_rows_owned(self):
+        """
+        GIVEN two clients with a contract each
+        WHEN you call get_contract_rows with the commercial of the first one
+             as owner
+        THEN its contract is returned with one query
+        """
+        result = dalo.get_contract_rows(owner_id=self.commercial_id,
+                                        page_size=10)
+
+        assert result['status'] == "ok"
+        assert [contract.id for contract in result['contracts']] == [
+            self.contract_ids[0]]
+        assert len(self.statements) == 1
+
+    def test_get_event_rows_supported(self):
+        """
+        GIVEN a support user of the second event
+        WHEN you call get_event_rows with the support user as owner
+        THEN the supported event is returned
+        """
+        dale.update_event({'id': self.event_ids[1],
+                           'support_contact_id': self.support_id})
+
+        supported = dale.get_event_rows(owner_id=self.support_id)
+        dale.update_event({'id': self.event_ids[1],
+                           'support_contact_id': None})
+
+        assert [event.id for event in supported['events']] == [
+            self.event_ids[1]]
+
+    def test_get_event_rows_owned(self):
+        """
+        GIVEN two clients with an event each
+        WHEN you call get_event_rows with the commercial of the first one
+             as owner
+        THEN the event of the first client is returned as an EventRow
+        """
+        result = dale.get_event_rows(owner_id=self.commercial_id)
+
+        assert result['status'] == "ok"
+        assert result['events'] == [
+            dale.EventRow(self.event_ids[0], "event 0", self.contract_ids[0],
+                          result['events'][0].start_date,
+                          result['events'][0].end_date, "Paris", 10)]
+        assert result['page']['has_next'] is False
@@ -0,0 +1,136 @@
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client
+import models.client_dal_functions as dalc
+from db import (engine,
+                Base,
+                SlowQueryRecorder,
+                )
+
+
+class TestSlowQueries():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        user = User(employee_number=1,
+                    first_name="first name",
+                    last_name="last name",
+                    email="slow@email.com",
+                    password="password",
+                    active=True,
+                    team_id=None)
+        cls.session.add(user)
+        cls.session.commit()
+        client = Client(first_name="client",
+                        last_name="slow",
+                        email="client.slow@email.com",
+                        telephone="0102030405",
+                        enterprise="enterprise",
+                        commercial_contact_id=user.id,
+                        active=True)
+        cls.session.add(client)
+        cls.session.commit()
+        cls.client_id = client.id
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def record(self, path, threshold, **options):
+        """ read the client list with a recorder attached to the engine
+        returns list of the recorded statements
+        """
+        recorder = SlowQueryRecorder(str(path), threshold, **options)
+        recorder.attach(engine)
+        try:
+            dalc.get_all_clients()
+        finally:
+            recorder.detach(engine)
+        if not path.exists():
+            return []
+        with open(path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+
+    def test_slow_query_with_plan(self, tmp_path):
+        """
+        GIVEN a recorder with a threshold of 0 ms
+        WHEN you read the client list
+        THEN the select is recorded with its DAL function and its plan
+        """
+        records = self.record(tmp_path / 'slow.jsonl', 0)
+
+        assert len(records) == 1
+        assert records[0]['function'] == (
+            'client_dal_functions.get_all_clients')
+        assert records[0]['statement'].startswith('SELECT')
+        assert records[0]['duration_ms'] >= 0
+        assert 'parameters' in records[0]
+        assert any('clients' in str(row) for row in records[0]['plan'])
+
+    def test_options(self, tmp_path):
+        """
+        GIVEN a recorder without explain and parameters
+        WHEN you read the client list
+        THEN the select is recorded without plan and parameters
+        """
+        records = self.record(tmp_path / 'slow.jsonl', 0,
+                              explain=False, parameters=False)
+
+        assert 'plan' not in records[0]
+        assert 'parameters' not in records[0]
+
+    def test_fast_query_not_recorded(self, tmp_path):
+        """
+        GIVEN a recorder with a threshold of one minute
+        WHEN you read the client list
+        THEN no statement is recorded and no file is created
+        """
+        path = tmp_path / 'slow.jsonl'
+
+        records = self.record(path, 60000)
+
+        assert records == []
+        assert not path.exists()
+
+    def test_rotation(self, tmp_path):
+        """
+        GIVEN a recorder with a file limited to 100 bytes
+        WHEN two statements are recorded
+        THEN the first one is moved to the backup file
+        """
+        path = tmp_path / 'slow.jsonl'
+        recorder = SlowQueryRecorder(str(path), 0, max_bytes=100,
+                                     backup_count=1)
+        recorder.attach(engine)
+        try:
+            dalc.get_all_clients()
+            dalc.get_all_clients()
+        finally:
+            recorder.detach(engine)
+
+        assert (tmp_path / 'slow.jsonl.1').exists()
+
+    def test_streamed_query_not_explained(self, tmp_path):
+        """
+        GIVEN a recorder with a threshold of 0 ms
+        WHEN you read the clients with stream_clients
+        THEN the select is recorded without plan and every row is read
+        """
+        path = tmp_path / 'slow.jsonl'
+        recorder = SlowQueryRecorder(str(path), 0)
+        recorder.attach(engine)
+        try:
+            rows = list(dalc.stream_clients(batch_size=1))
+        finally:
+            recorder.detach(engine)
+
+        with open(path, encoding='utf-8') as file:
+            records = [json.loads(line) for line in file]
+        assert len(rows) == 1
+        assert records[0]['statement'].startswith('SELECT')
+        assert 'plan' not in records[0]
@@ -0,0 +1,126 @@
+import json
+import time
+
+from sentry_sdk import Client, Hub, start_transaction
+
+import models.client_dal_functions as dalc
+from tracing import (LocalTraceTransport,
+                     ScreenTrace,
+                     TraceSampler,
+                     screen_trace_paused,
+                     )
+from db import (engine,
+                Base,
+                )
+
+
+def transaction_context(name, parent_sampled=None):
+    return {'transaction_context': {'name': name},
+            'parent_sampled': parent_sampled}
+
+
+class TestTraceSampler():
+
+    def test_rate(self):
+        """
+        GIVEN a sampler with a rate of 0.1
+        WHEN a screen never observed starts
+        THEN the rate is returned, or the parent decision if any
+        """
+        sampler = TraceSampler(0.1, 500, 600)
+
+        assert sampler(transaction_context('control_client_list')) == 0.1
+        assert sampler(transaction_context('control_client_list',
+                                           True)) is True
+
+    def test_slow_and_failed_screens(self):
+        """
+        GIVEN a sampler with a slow threshold of 500 ms
+        WHEN screens end fast, slow or with an error
+        THEN the slow and failed screens are all traced
+        """
+        sampler = TraceSampler(0.1, 500, 600)
+
+        sampler.observe('control_client_list', 20)
+        sampler.observe('control_contract_list', 800)
+        sampler.observe('control_event_list', 20, errors=1)
+
+        assert sampler(transaction_context('control_client_list')) == 0.1
+        assert sampler(transaction_context('control_contract_list')) == 1.0
+        assert sampler(transaction_context('control_event_list')) == 1.0
+
+    def test_watch_expires(self):
+        """
+        GIVEN a screen observed slow
+        WHEN the watch lifetime is over
+        THEN the rate is returned again
+        """
+        sampler = TraceSampler(0.1, 500, -1)
+
+        sampler.observe('control_contract_list', 800)
+
+        assert sampler(transaction_context('control_contract_list')) == 0.1
+        assert sampler.watched == {}
+
+
+class TestLocalTraceTransport():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+
+    def teardown_class(self):
+        Base.metadata.drop_all(engine)
+
+    def test_export_transaction(self, tmp_path):
+        """
+        GIVEN a sentry client exporting the traces in a local file
+        WHEN a traced screen action calls a DAL function
+        THEN the transaction is written with the span of the DAL function
+        """
+        path = tmp_path / 'traces.jsonl'
+        client = Client(transport=LocalTraceTransport(str(path)),
+                        traces_sampler=lambda context: 1.0,
+                        default_integrations=False)
+
+        with Hub(client):
+            with start_transaction(op='screen', name='control_client_list'):
+                dalc.get_all_clients()
+        client.close()
+
+        with open(path, encoding='utf-8') as file:
+            traces = [json.loads(line) for line in file]
+        assert len(traces) == 1
+        assert traces[0]['type'] == 'transaction'
+        assert traces[0]['name'] == 'control_client_list'
+        assert traces[0]['duration_ms'] >= 0
+        assert traces[0]['spans'][0]['op'] == 'db.dal'
+        assert traces[0]['spans'][0]['description'] == (
+            'client_dal_functions.get_all_clients')
+
+    def test_screen_trace_paused(self, tmp_path):
+        """
+        GIVEN a screen action traced with a pause of 200 ms between
+              two DAL functions
+        WHEN the traces are exported
+        THEN the action is written as two transactions of the screen,
+             without the pause
+        """
+        path = tmp_path / 'traces.jsonl'
+        client = Client(transport=LocalTraceTransport(str(path)),
+                        traces_sampler=lambda context: 1.0,
+                        default_integrations=False)
+
+        with Hub(client):
+            with ScreenTrace('control_client_list'):
+                dalc.get_all_clients()
+                with screen_trace_paused():
+                    time.sleep(0.2)
+                dalc.get_all_clients()
+        client.close()
+
+        with open(path, encoding='utf-8') as file:
+            traces = [json.loads(line) for line in file]
+        assert [trace['name'] for trace in traces] == (
+            ['control_client_list'] * 2)
+        assert all(trace['duration_ms'] < 200 for trace in traces)
+        assert all(len(trace['spans']) >= 1 for trace in traces)
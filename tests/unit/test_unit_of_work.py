@@ -0,0 +1,159 @@
+from sqlalchemy.orm import sessionmaker
+
+from models.user_models import User
+from models.client_models import Client
+import models.client_dal_functions as dalc
+from db import (engine,
+                Base,
+                current_session,
+                get_pool_statistics,
+                unit_of_work,
+                unit_of_work_paused,
+                )
+from controllers.general_cont import PausedScreen
+
+
+class TestUnitOfWork():
+
+    def setup_class(cls):
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        cls.session = Session()
+        user = User(employee_number=1,
+                    first_name="first name",
+                    last_name="last name",
+                    email="unit@email.com",
+                    password="password",
+                    active=True,
+                    team_id=None)
+        cls.session.add(user)
+        cls.session.commit()
+        client = Client(first_name="client",
+                        last_name="unit",
+                        email="client.unit@email.com",
+                        telephone="0102030405",
+                        enterprise="enterprise",
+                        commercial_contact_id=user.id,
+                        active=True)
+        cls.session.add(client)
+        cls.session.commit()
+        cls.client_id = client.id
+
+    def teardown_class(self):
+        self.session.close()
+        Base.metadata.drop_all(engine)
+
+    def test_one_checkout_by_unit_of_work(self):
+        """
+        GIVEN an active unit of work
+        WHEN you call several DAL functions
+        THEN one connection is checked out, the same client object
+             is returned and the connection is given back at the end
+        """
+        before = get_pool_statistics()
+
+        with unit_of_work():
+            first = dalc.get_client_by_id(self.client_id)
+            dalc.get_all_clients()
+            second = dalc.get_client_by_id(self.client_id)
+            during = get_pool_statistics()
+
+        after = get_pool_statistics()
+
+        assert first['client'] is second['client']
+        assert during['checkouts'] == before['checkouts'] + 1
+        assert after['checked_out'] == before['checked_out']
+        assert current_session.get() is None
+
+    def test_without_unit_of_work(self):
+        """
+        GIVEN no active unit of work
+        WHEN you call get_client_by_id twice
+        THEN each call checks out its own connection
+        """
+        before = get_pool_statistics()
+
+        first = dalc.get_client_by_id(self.client_id)
+        second = dalc.get_client_by_id(self.client_id)
+
+        assert first['client'] is not second['client']
+        assert (get_pool_statistics()['checkouts']
+                == before['checkouts'] + 2)
+
+    def test_update_in_unit_of_work(self):
+        """
+        GIVEN a client read in a unit of work
+        WHEN you update the client in the same unit of work
+        THEN the next read returns the new values and the first object
+             is still readable after the end of the unit of work
+        """
+        with unit_of_work():
+            first = dalc.get_client_by_id(self.client_id)['client']
+            dalc.update_client({'id': self.client_id,
+                                'telephone': "0607080910"})
+            second = dalc.get_client_by_id(self.client_id)['client']
+
+        assert second.telephone == "0607080910"
+        assert first.enterprise == "enterprise"
+
+    def test_error_in_unit_of_work(self):
+        """
+        GIVEN an active unit of work
+        WHEN a DAL function fails on a duplicate email
+        THEN the error is returned and the next DAL functions still work
+        """
+        with unit_of_work():
+            result = dalc.create_client({'first_name': "client",
+                                         'last_name': "duplicate",
+                                         'email': "client.unit@email.com",
+                                         'telephone': "0102030405",
+                                         'enterprise': "enterprise",
+                                         'commercial_contact_id': None,
+                                         'active': True})
+            after_error = dalc.get_client_by_id(self.client_id)
+
+        assert result['status'] == "ko"
+        assert after_error['status'] == "ok"
+
+    def test_paused_unit_of_work(self):
+        """
+        GIVEN an active unit of work
+        WHEN it is paused between two reads
+        THEN no connection is held during the pause and the read after it
+             returns a new client object
+        """
+        before = get_pool_statistics()
+
+        with unit_of_work():
+            first = dalc.get_client_by_id(self.client_id)
+            with unit_of_work_paused():
+                paused = get_pool_statistics()
+                paused_session = current_session.get()
+            second = dalc.get_client_by_id(self.client_id)
+
+        assert paused['checked_out'] == before['checked_out']
+        assert paused_session is None
+        assert first['client'] is not second['client']
+        assert (get_pool_statistics()['checked_out']
+                == before['checked_out'])
+
+    def test_paused_screen(self):
+        """
+        GIVEN a view wrapped in a PausedScreen
+        WHEN a method of the view is called in a unit of work
+        THEN the method runs without unit of work and returns its result
+        """
+        class View():
+            title = "view"
+
+            def general(self, view_setup, tokens):
+                return current_session.get(), tokens
+
+        screen = PausedScreen(View())
+
+        with unit_of_work():
+            session, tokens = screen.general({}, "tokens")
+
+        assert session is None
+        assert tokens == "tokens"
+        assert screen.title == "view"
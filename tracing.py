@@ -0,0 +1,207 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from dotenv import load_dotenv
+import json
+import os
+import sys
+import time
+
+from sentry_sdk import start_transaction
+from sentry_sdk.transport import Transport
+
+load_dotenv()
+
+# rate of the screen actions traced, the screens which were slow or in
+# error during the last SENTRY_SLOW_TRANSACTION_TTL seconds are all traced
+SENTRY_TRACES_SAMPLE_RATE = float(
+    os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.1"))
+# database time in ms over which a screen action is slow
+SENTRY_SLOW_TRANSACTION = int(os.getenv("SENTRY_SLOW_TRANSACTION", "500"))
+SENTRY_SLOW_TRANSACTION_TTL = int(
+    os.getenv("SENTRY_SLOW_TRANSACTION_TTL", "600"))
+# local export of the traces : stdout or a jsonl file, empty to send them
+# to the sentry project of SENTRY_DSN
+SENTRY_TRACES_EXPORT = os.getenv("SENTRY_TRACES_EXPORT", "")
+
+
+class TraceSampler():
+    """ sentry traces_sampler keeping every transaction of the screens
+    observed slow or in error, and rate of the other transactions
+    the decision is taken at the start of a transaction, so the slow
+    or failed action itself is kept at the rate only, the decision
+    applies to the next transactions of the screen
+    """
+
+    def __init__(self, rate, slow, ttl):
+        self.rate = rate
+        self.slow = slow
+        self.ttl = ttl
+        # transaction name : end of the full sampling (monotonic time)
+        self.watched = {}
+
+    def __call__(self, sampling_context):
+        if sampling_context.get('parent_sampled') is not None:
+            return sampling_context['parent_sampled']
+        name = sampling_context['transaction_context'].get('name')
+        if self.is_watched(name):
+            return 1.0
+        return self.rate
+
+    def is_watched(self, name):
+        until = self.watched.get(name)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del self.watched[name]
+            return False
+        return True
+
+    def observe(self, name, duration, errors=0):
+        """ record the end of a transaction
+        parameters :
+        name : transaction name
+        duration : database time of the transaction in ms
+        errors : number of DAL functions in error
+        """
+        if errors or duration >= self.slow:
+            self.watched[name] = time.monotonic() + self.ttl
+
+
+trace_sampler = TraceSampler(SENTRY_TRACES_SAMPLE_RATE,
+                             SENTRY_SLOW_TRANSACTION,
+                             SENTRY_SLOW_TRANSACTION_TTL)
+
+# screen trace of the running controller action
+current_screen_trace = ContextVar('current_screen_trace', default=None)
+
+
+class ScreenTrace():
+    """ sentry transactions of a screen action, without the waits for the
+    user inputs : the transaction is ended when the screen is paused and
+    a new transaction of the same screen is started after the input
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.transaction = None
+
+    def __enter__(self):
+        self.token = current_screen_trace.set(self)
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        current_screen_trace.reset(self.token)
+        self.transaction.__exit__(*exc_info)
+
+    def start(self):
+        self.transaction = start_transaction(op='screen', name=self.name)
+        self.transaction.__enter__()
+
+    def stop(self):
+        self.transaction.__exit__(None, None, None)
+
+
+@contextmanager
+def screen_trace_paused():
+    """ end the transaction of the running screen action during the block
+    (waiting for a user input), a new one is started after the block
+    """
+    trace = current_screen_trace.get()
+    if trace is None:
+        yield
+        return
+
+    trace.stop()
+    try:
+        yield
+    finally:
+        trace.start()
+
+
+def duration_ms(item):
+    """ duration in ms of a serialized transaction or span """
+    start = datetime.fromisoformat(item['start_timestamp'])
+    end = datetime.fromisoformat(item['timestamp'])
+    return round((end - start).total_seconds() * 1000, 3)
+
+
+def transaction_summary(transaction):
+    """ transaction event to the exported dictionnary with keys :
+    'type': transaction
+    'name', 'op', 'status': of the transaction
+    'start': start of the transaction (iso format)
+    'duration_ms': duration of the transaction
+    'spans': list of the spans with keys op, description and duration_ms,
+             sorted on start
+    """
+    trace = transaction.get('contexts', {}).get('trace', {})
+    spans = sorted(transaction.get('spans', []),
+                   key=lambda span: span['start_timestamp'])
+    return {'type': 'transaction',
+            'name': transaction.get('transaction'),
+            'op': trace.get('op'),
+            'status': trace.get('status'),
+            'start': transaction['start_timestamp'],
+            'duration_ms': duration_ms(transaction),
+            'spans': [{'op': span.get('op'),
+                       'description': span.get('description'),
+                       'duration_ms': duration_ms(span)}
+                      for span in spans]}
+
+
+def error_summary(event):
+    """ error event to the exported dictionnary with keys type (error),
+    level, message and exceptions ('type: value' strings)
+    """
+    return {'type': 'error',
+            'level': event.get('level'),
+            'message': event.get('message'),
+            'exceptions': [f"{value.get('type')}: {value.get('value')}"
+                           for value in event.get('exception', {})
+                           .get('values', [])]}
+
+
+class LocalTraceTransport(Transport):
+    """ sentry transport writing the transactions and errors as json lines
+    on stdout or in a file instead of sending them to sentry
+    """
+
+    def __init__(self, target):
+        Transport.__init__(self)
+        self.target = target
+
+    def write(self, summary):
+        line = json.dumps(summary, default=str)
+        if self.target == 'stdout':
+            print(line, file=sys.stdout, flush=True)
+            return
+        with open(self.target, 'a', encoding='utf-8') as file:
+            file.write(line + '\n')
+
+    def capture_event(self, event):
+        self.write(error_summary(event))
+
+    def capture_envelope(self, envelope):
+        transaction = envelope.get_transaction_event()
+        if transaction is not None:
+            self.write(transaction_summary(transaction))
+            return
+        event = envelope.get_event()
+        if event is not None:
+            self.write(error_summary(event))
+
+
+def sentry_options(sentry_dsn):
+    """ tracing options of sentry_sdk.init
+    no trace is built without SENTRY_DSN and SENTRY_TRACES_EXPORT
+    returns dictionnary with keys dsn, traces_sampler and transport
+    """
+    transport = None
+    if SENTRY_TRACES_EXPORT:
+        transport = LocalTraceTransport(SENTRY_TRACES_EXPORT)
+    traced = bool(sentry_dsn or transport)
+    return {'dsn': sentry_dsn,
+            'traces_sampler': trace_sampler if traced else None,
+            'transport': transport}
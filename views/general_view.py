@@ -59,11 +59,11 @@ class Screen:
 
             tokens = args[1]
             if tokens['access'] is not None:
-                self.auth.save_tokens_to_file(tokens)
+                self.auth.save_tokens(tokens)
 
             result = func(self, args[0])
 
-            stored_tokens = self.auth.get_tokens_from_file()
+            stored_tokens = self.auth.get_tokens()
 
             check_access = self.auth.check_token(stored_tokens['access'])
             if check_access['status'] == 'ok':
@@ -74,6 +74,8 @@ class Screen:
                     get_refresh = self.auth.request_token_with_refresh(
                         stored_tokens['refresh'])
                     if get_refresh['status'] == 'ok':
+                        # the new tokens are used by the next screens
+                        self.auth.save_tokens(get_refresh)
                         token = get_refresh['access']
                     else:
                         token = stored_tokens['access']
@@ -889,17 +891,20 @@ class Screen:
                          justify="left",
                          no_wrap=True,
                          style="white")
+        table.add_column("Rôle",
+                         justify="left",
+                         no_wrap=True,
+                         style="white")
 
-        for user_data in users_data:
-            user = user_data[0]
-            team_name = user_data[1]
+        for user in users_data:
             table.add_row(
                 str(user.id),
                 str(user.employee_number),
                 user.first_name,
                 user.last_name,
                 user.email,
-                team_name
+                user.team_name or ' ',
+                user.role_name or ' '
             )
         centered_table = Align.center(table)
         list_disp = Panel(
@@ -19,16 +19,21 @@ from controllers.controllers_functions import (MC_CLIENT_LIST,
                                                MC_CONTRACT_CREATE,
                                                MC_CONTRACT_UNPAID_FILTER,
                                                MC_CONTRACT_UNSIGNED_FILTER,
+                                               MC_CONTRACT_OWNED_FILTER,
                                                MC_EVENT_LIST,
                                                MC_EVENT_DETAILS,
                                                MC_EVENT_UPDATE,
                                                MC_EVENT_CREATE,
                                                MC_EVENT_OWNED_FILTER,
                                                MC_EVENT_UNASSIGNED_FILTER,
+                                               MC_EVENT_FOLLOWED_FILTER,
                                                MC_ADMINISTRATION,
                                                MC_USER_DETAILS,
                                                MC_USER_UPDATE,
                                                MC_USER_CREATE,
+                                               MC_NEXT_PAGE,
+                                               MC_PREVIOUS_PAGE,
+                                               MC_EXPORT,
                                                MC_EXIT,
                                                MC_RETURN,
                                                )
@@ -42,18 +47,24 @@ from controllers.constants import (MENU_CLIENTS_LIST_KEYS,
                                    MENU_CONTRACT_CREATE_KEYS,
                                    MENU_CONTRACT_FILTER_UNSIGNED_KEYS,
                                    MENU_CONTRACT_FILTER_UNPAID_KEYS,
+                                   MENU_CONTRACT_FILTER_OWNED_KEYS,
                                    MENU_EVENTS_LIST_KEYS,
                                    MENU_EVENTS_DETAILS_KEYS,
                                    MENU_EVENT_UPDATE_KEYS,
                                    MENU_EVENT_CREATE_KEYS,
                                    MENU_EVENT_FILTER_OWNED_KEYS,
                                    MENU_EVENT_FILTER_UNASSIGNED_KEYS,
+                                   MENU_EVENT_FILTER_FOLLOWED_KEYS,
                                    MENU_ADMINISTRATION_KEYS,
                                    MENU_USER_DETAILS_KEYS,
                                    MENU_USER_UPDATE_KEYS,
                                    MENU_USER_CREATE_KEYS,
+                                   MENU_NEXT_PAGE_KEYS,
+                                   MENU_PREVIOUS_PAGE_KEYS,
+                                   MENU_EXPORT_KEYS,
                                    DATE_FORMAT,
-                                   PRPT_NEW_DATA
+                                   PRPT_NEW_DATA,
+                                   PRPT_EXPORT_PATH
                                    )
 
 load_dotenv()
@@ -215,6 +226,8 @@ def prompt_choice_decode(choice1):
         return [MC_CONTRACT_UNPAID_FILTER]
     elif choice1 == MENU_CONTRACT_FILTER_UNSIGNED_KEYS:
         return [MC_CONTRACT_UNSIGNED_FILTER]
+    elif choice1 == MENU_CONTRACT_FILTER_OWNED_KEYS:
+        return [MC_CONTRACT_OWNED_FILTER]
 
     elif choice1 == MENU_EVENTS_LIST_KEYS:
         return [MC_EVENT_LIST]
@@ -232,6 +245,8 @@ def prompt_choice_decode(choice1):
         return [MC_EVENT_OWNED_FILTER]
     elif choice1 == MENU_EVENT_FILTER_UNASSIGNED_KEYS:
         return [MC_EVENT_UNASSIGNED_FILTER]
+    elif choice1 == MENU_EVENT_FILTER_FOLLOWED_KEYS:
+        return [MC_EVENT_FOLLOWED_FILTER]
 
     elif choice1 == MENU_ADMINISTRATION_KEYS:
         return [MC_ADMINISTRATION]
@@ -246,6 +261,14 @@ def prompt_choice_decode(choice1):
     elif choice1 == MENU_USER_CREATE_KEYS:
         return [MC_USER_CREATE]
 
+    elif choice1 == MENU_NEXT_PAGE_KEYS:
+        return [MC_NEXT_PAGE]
+    elif choice1 == MENU_PREVIOUS_PAGE_KEYS:
+        return [MC_PREVIOUS_PAGE]
+    elif choice1 == MENU_EXPORT_KEYS:
+        choice2 = Prompt.ask(PRPT_EXPORT_PATH)
+        return [MC_EXPORT, choice2]
+
     elif choice1 == "r":
         return [MC_RETURN]
     elif choice1 == "s":